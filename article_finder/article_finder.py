@@ -122,7 +122,7 @@ def run_article_finder(input_arguments):
     logger = utils.get_default_logger()
     logger.info("Reading wiki articles...")
     wiki_articles = articles.read_wiki_articles()
-    article_embeddings = get_article_embeddings(input_arguments, wiki_articles, logger)
+    article_embeddings = get_article_embeddings(input_arguments, articles.WikiArticlesFile(), logger)
     logger.info("Creating n-grams...")
     ids_wiki_articles = {x.id: x for x in wiki_articles}
     trigrams_article_ids = create_trigrams_article_ids(wiki_articles)
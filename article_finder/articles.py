@@ -9,18 +9,37 @@ class WikiArticle(object):
     content = attr.ib()
 
 
-def _create_wiki_article(article_id, parsed_article):
-    article_parts = parsed_article.split("\n\n")
-    title = re.search("TITLE: (.*)", article_parts[0].strip()).group(1)
-    content = "\n".join(article_parts[1:])
+def _create_wiki_article(article_id, article_lines, is_last_article):
+    title = re.search("TITLE: (.*)", article_lines[0].strip()).group(1)
+    content = "".join(article_lines[1:])
+    if not is_last_article:
+        content = content[:-1]
     return WikiArticle(id=article_id, title=title, content=content)
 
 
-def read_wiki_articles(path="data/wiki_slice.txt"):
+def iter_wiki_articles(path="data/wiki_slice.txt"):
+    article_id = 1
+    article_lines = []
     with open(path) as stream:
-        merged_lines = "\n".join(stream.readlines())
-        parsed_articles = merged_lines.split("\n\n\n")
-        return list(map(
-            lambda index_x: _create_wiki_article(index_x[0] + 1, index_x[1]),
-            enumerate(parsed_articles)
-        ))
+        for line in stream:
+            if line != "\n":
+                article_lines.append(line)
+                continue
+            if len(article_lines) > 0:
+                yield _create_wiki_article(article_id, article_lines, is_last_article=False)
+                article_id += 1
+            article_lines = []
+    if len(article_lines) > 0:
+        yield _create_wiki_article(article_id, article_lines, is_last_article=True)
+
+
+@attr.s(frozen=True)
+class WikiArticlesFile(object):
+    path = attr.ib(default="data/wiki_slice.txt")
+
+    def __iter__(self):
+        return iter_wiki_articles(self.path)
+
+
+def read_wiki_articles(path="data/wiki_slice.txt"):
+    return list(iter_wiki_articles(path))
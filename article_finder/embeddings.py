@@ -1,10 +1,12 @@
 import re
-from collections import defaultdict, Counter
+from collections import Counter
 
 import attr
 import numpy as np
 import scipy.sparse
 
+import base_forms_dictionary
+
 
 @attr.s
 class ArticleEmbeddings(object):
@@ -14,12 +16,7 @@ class ArticleEmbeddings(object):
 
 
 def read_words_base_forms(path="data/base_forms.txt"):
-    words_base_forms = defaultdict(lambda: [])
-    with open(path, "r") as file_stream:
-        bases_words = map(lambda x: x.split(";")[0:2], file_stream.readlines())
-        for base, word in bases_words:
-            words_base_forms[word].append(base)
-    return words_base_forms
+    return base_forms_dictionary.load_base_forms_dictionary(path)
 
 
 def get_word_base_forms(words_base_forms, word, add_missing_forms):
@@ -57,7 +54,9 @@ def create_tf_matrix(words_base_forms, wiki_articles, ids_rows, terms_indexes, a
 
 def create_idf_vector(words_base_forms, wiki_articles, terms_indexes, add_missing_forms=True):
     terms_documents_counts = Counter()
+    articles_count = 0
     for wiki_article in wiki_articles:
+        articles_count += 1
         article_terms = set()
         for word in wiki_article.content.split(" "):
             for term in get_word_base_forms(words_base_forms, word, add_missing_forms):
@@ -67,7 +66,7 @@ def create_idf_vector(words_base_forms, wiki_articles, terms_indexes, add_missin
                 terms_documents_counts[term] += 1
     idf_vector = np.zeros(shape=(len(terms_indexes), 1))
     for term, index_of_term in terms_indexes.items():
-        idf_vector[index_of_term] = np.log2(len(wiki_articles) / terms_documents_counts[term])
+        idf_vector[index_of_term] = np.log2(articles_count / terms_documents_counts[term])
     return idf_vector
 
 
@@ -96,7 +95,7 @@ def save_embeddings(embeddings, save_path):
 
 
 def get_rows_ids(wiki_articles):
-    return dict(enumerate([x.id for x in sorted(wiki_articles, key=lambda x: x.id)]))
+    return dict(enumerate(sorted(x.id for x in wiki_articles)))
 
 
 def get_articles_embeddings(wiki_articles, load_path=None, save_path=None):
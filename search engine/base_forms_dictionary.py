@@ -0,0 +1,124 @@
+import argparse
+import array
+import functools
+import os
+
+from mapped_arrays import EMPTY_SLOT, create_hash_slots, get_offsets, get_string_hash, load_arrays, write_arrays
+
+DICTIONARY_FILE_EXTENSION = ".dict"
+DICTIONARY_MAGIC = b"BFDICT01"
+LOOKUP_CACHE_SIZE = 2 ** 16
+
+_loaded_dictionaries = {}
+
+
+def _read_words_base_forms_lines(base_forms_path):
+    words_base_forms = {}
+    with open(base_forms_path, "r") as stream:
+        for line in stream:
+            base, word = line.split(";")[0:2]
+            words_base_forms.setdefault(word, []).append(base)
+    return words_base_forms
+
+
+def compile_base_forms_dictionary(base_forms_path, dictionary_path=None):
+    dictionary_path = dictionary_path if dictionary_path is not None else get_dictionary_path(base_forms_path)
+    words_base_forms = _read_words_base_forms_lines(base_forms_path)
+    words = sorted(words_base_forms)
+    strings = sorted(set(words).union(*words_base_forms.values()))
+    strings_ids = {string: string_id for string_id, string in enumerate(strings)}
+    encoded_strings = [string.encode("utf-8") for string in strings]
+    write_arrays(dictionary_path, DICTIONARY_MAGIC, {
+        "strings_offsets": get_offsets(len(x) for x in encoded_strings),
+        "strings_bytes": array.array("B", b"".join(encoded_strings)),
+        "words_strings_ids": array.array("i", (strings_ids[word] for word in words)),
+        "base_forms_offsets": get_offsets(len(words_base_forms[word]) for word in words),
+        "base_forms_strings_ids": array.array(
+            "i", (strings_ids[base] for word in words for base in words_base_forms[word])
+        ),
+        "hash_slots": create_hash_slots([encoded_strings[strings_ids[word]] for word in words]),
+    })
+
+
+class BaseFormsDictionary(object):
+    def __init__(self, path):
+        arrays = load_arrays(path, DICTIONARY_MAGIC)
+        self._strings_offsets = arrays["strings_offsets"]
+        self._strings_bytes = arrays["strings_bytes"]
+        self._words_strings_ids = arrays["words_strings_ids"]
+        self._base_forms_offsets = arrays["base_forms_offsets"]
+        self._base_forms_strings_ids = arrays["base_forms_strings_ids"]
+        self._hash_slots = arrays["hash_slots"]
+        self._slots_mask = len(self._hash_slots) - 1
+        self._get_word_base_forms = functools.lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._find_word_base_forms)
+
+    def _get_string_bytes(self, string_id):
+        return self._strings_bytes[self._strings_offsets[string_id]:self._strings_offsets[string_id + 1]]
+
+    def _get_string(self, string_id):
+        return str(self._get_string_bytes(string_id), "utf-8")
+
+    def _find_word_index(self, word_bytes):
+        slot = get_string_hash(word_bytes) & self._slots_mask
+        while True:
+            word_index = self._hash_slots[slot]
+            if word_index == EMPTY_SLOT or self._get_string_bytes(self._words_strings_ids[word_index]) == word_bytes:
+                return word_index
+            slot = (slot + 1) & self._slots_mask
+
+    def _get_base_forms(self, word_index):
+        return tuple(
+            self._get_string(self._base_forms_strings_ids[base_form_index])
+            for base_form_index in range(self._base_forms_offsets[word_index], self._base_forms_offsets[word_index + 1])
+        )
+
+    def _find_word_base_forms(self, word):
+        word_index = self._find_word_index(word.encode("utf-8"))
+        return self._get_base_forms(word_index) if word_index != EMPTY_SLOT else None
+
+    def __len__(self):
+        return len(self._words_strings_ids)
+
+    def __contains__(self, word):
+        return self._get_word_base_forms(word) is not None
+
+    def __getitem__(self, word):
+        base_forms = self._get_word_base_forms(word)
+        return base_forms if base_forms is not None else ()
+
+    def __iter__(self):
+        return (self._get_string(word_string_id) for word_string_id in self._words_strings_ids)
+
+    def get(self, word, default=None):
+        base_forms = self._get_word_base_forms(word)
+        return base_forms if base_forms is not None else default
+
+    def items(self):
+        return (
+            (self._get_string(word_string_id), self._get_base_forms(word_index))
+            for word_index, word_string_id in enumerate(self._words_strings_ids)
+        )
+
+
+def get_dictionary_path(base_forms_path):
+    return os.path.splitext(base_forms_path)[0] + DICTIONARY_FILE_EXTENSION
+
+
+def load_base_forms_dictionary(base_forms_path):
+    dictionary_path = get_dictionary_path(base_forms_path)
+    if not os.path.exists(dictionary_path) or os.path.getmtime(dictionary_path) < os.path.getmtime(base_forms_path):
+        compile_base_forms_dictionary(base_forms_path, dictionary_path)
+    dictionary_key = (os.path.abspath(dictionary_path), os.stat(dictionary_path).st_mtime_ns)
+    if dictionary_key not in _loaded_dictionaries:
+        _loaded_dictionaries[dictionary_key] = BaseFormsDictionary(dictionary_path)
+    return _loaded_dictionaries[dictionary_key]
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base_forms_path", type=str, default="base_forms.txt")
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    compile_base_forms_dictionary(**_parse_input_arguments())
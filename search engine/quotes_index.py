@@ -1,5 +1,12 @@
+import array
+import functools
 import string
-from collections import defaultdict
+
+from quotes_query import OPERATORS, AndNode, TermNode, bitmap_to_indexes, indexes_to_bitmap, parse_query, tokenize_query
+
+PLAN_CACHE_SIZE = 2 ** 14
+BITMAP_CACHE_SIZE = 2 ** 12
+WORDS_BITMAPS_CACHE_SIZE = 2 ** 12
 
 
 class QuotesIndex(object):
@@ -7,19 +14,42 @@ class QuotesIndex(object):
     def __init__(self, words_base_forms, quotes):
         self.words_base_forms = words_base_forms
         self.quotes = quotes
-        self.index_of_quotes = self._generate_index_of_quotes()
+        self.quotes_count = len(quotes)
+        self.all_quotes_bitmap = (1 << self.quotes_count) - 1
+        self.quotes_postings = self._generate_quotes_postings()
+        self.get_base_form_bitmap = functools.lru_cache(maxsize=BITMAP_CACHE_SIZE)(self._create_base_form_bitmap)
+        self.get_base_forms_bitmap = functools.lru_cache(maxsize=WORDS_BITMAPS_CACHE_SIZE)(
+            self._create_base_forms_bitmap
+        )
+        self._get_word_term = functools.lru_cache(maxsize=WORDS_BITMAPS_CACHE_SIZE)(self._create_term)
+        self._get_compiled_query = functools.lru_cache(maxsize=PLAN_CACHE_SIZE)(self._compile_query)
 
     @staticmethod
     def _clear_punctuation(word):
         return ''.join(filter(lambda x: x not in string.punctuation, word))
 
-    def _generate_index_of_quotes(self):
-        index_of_quotes = defaultdict(lambda: set())
+    def _generate_quotes_postings(self):
+        quotes_postings = {}
         for index, quote in enumerate(self.quotes):
             base_forms = self.generate_base_forms(quote)
             for base_form in base_forms:
-                index_of_quotes[base_form].add(index)
-        return index_of_quotes
+                quotes_postings.setdefault(base_form, array.array("i")).append(index)
+        return quotes_postings
+
+    def _create_base_form_bitmap(self, base_form):
+        return indexes_to_bitmap(self.quotes_postings.get(base_form, ()))
+
+    def _create_base_forms_bitmap(self, base_forms):
+        bitmap = 0
+        for base_form in base_forms:
+            bitmap |= self.get_base_form_bitmap(base_form)
+        return bitmap
+
+    def _create_term(self, word):
+        return TermNode(word, {self._clear_punctuation(x) for x in self.generate_base_forms(word)})
+
+    def _compile_query(self, query):
+        return parse_query(query, self._get_word_term).compile(self)
 
     def generate_base_forms(self, sentence):
         words = sentence.split(' ')
@@ -31,19 +61,34 @@ class QuotesIndex(object):
                 base_forms.append(word)
         return set(base_forms)
 
-    def generate_matching_quotes_indexes(self, query):
-        words = query.split(" ")
-        word_base_forms = {x: self.generate_base_forms(x) for x in words}
-        query_parts = []
-        for word, base_forms in word_base_forms.items():
-            formatted_forms = map(
-                lambda x: f"index['{self._clear_punctuation(x)}']",
-                base_forms
+    def generate_query_base_forms(self, query):
+        query_words = " ".join(x.strip('"') for x in tokenize_query(query) if x not in OPERATORS + ("(", ")"))
+        return self.generate_base_forms(query_words)
+
+    def get_base_form_count(self, base_form):
+        return len(self.quotes_postings.get(base_form, ()))
+
+    def has_phrase(self, quote_index, phrase_base_forms):
+        quote_words_base_forms = [self.generate_base_forms(x) for x in self.quotes[quote_index].split(" ")]
+        return any(
+            all(
+                len(quote_words_base_forms[start + offset] & base_forms) > 0
+                for offset, base_forms in enumerate(phrase_base_forms)
             )
-            joined_base_forms = " | ".join(formatted_forms)
-            query_parts.append(f"({joined_base_forms})")
-        generated_query = " & ".join(query_parts)
-        return eval(generated_query, {"index": self.index_of_quotes})
+            for start in range(len(quote_words_base_forms) - len(phrase_base_forms) + 1)
+        )
+
+    def compile_query(self, query):
+        return self._get_compiled_query(" ".join(query.split()))
+
+    def generate_matching_quotes_bitmap(self, query):
+        return self.compile_query(query).evaluate(self)
+
+    def generate_matching_words_bitmap(self, words):
+        return AndNode([self._get_word_term(word) for word in set(words)]).compile(self).evaluate(self)
+
+    def generate_matching_quotes_indexes(self, query):
+        return bitmap_to_indexes(self.generate_matching_quotes_bitmap(query))
 
     def query_index(self, query):
         matching_indexes = self.generate_matching_quotes_indexes(query)
@@ -0,0 +1,265 @@
+import hashlib
+import re
+
+QUERY_TOKEN_PATTERN = re.compile(r'\(|\)|"[^"]*"?|[^\s()"]+')
+AND_OPERATOR = "AND"
+OR_OPERATOR = "OR"
+NOT_OPERATOR = "NOT"
+OPERATORS = (AND_OPERATOR, OR_OPERATOR, NOT_OPERATOR)
+OPENING_PARENTHESIS = "("
+CLOSING_PARENTHESIS = ")"
+BITMAP_FINGERPRINT_SIZE = 16
+
+
+def indexes_to_bitmap(indexes):
+    if len(indexes) == 0:
+        return 0
+    bitmap_bytes = bytearray(indexes[-1] // 8 + 1)
+    for index in indexes:
+        bitmap_bytes[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bitmap_bytes, "little")
+
+
+def get_bitmap_fingerprint(bitmap):
+    bitmap_bytes = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    return hashlib.blake2b(bitmap_bytes, digest_size=BITMAP_FINGERPRINT_SIZE).digest()
+
+
+def bitmap_to_indexes(bitmap):
+    bits = bin(bitmap)[:1:-1]
+    indexes = []
+    index = bits.find("1")
+    while index != -1:
+        indexes.append(index)
+        index = bits.find("1", index + 1)
+    return indexes
+
+
+class TermNode(object):
+    def __init__(self, word, base_forms):
+        self.word = word
+        self.base_forms = tuple(sorted(base_forms))
+        self._estimate = None
+
+    def estimate(self, quotes_index):
+        if self._estimate is None:
+            self._estimate = min(
+                sum(quotes_index.get_base_form_count(x) for x in self.base_forms), quotes_index.quotes_count
+            )
+        return self._estimate
+
+    def compile(self, quotes_index):
+        return self
+
+    def evaluate(self, quotes_index):
+        return quotes_index.get_base_forms_bitmap(self.base_forms)
+
+    def __repr__(self):
+        return f"Term({self.word})"
+
+
+class NotNode(object):
+    def __init__(self, child):
+        self.child = child
+
+    def estimate(self, quotes_index):
+        return quotes_index.quotes_count - self.child.estimate(quotes_index)
+
+    def compile(self, quotes_index):
+        return NotNode(self.child.compile(quotes_index))
+
+    def evaluate(self, quotes_index):
+        return quotes_index.all_quotes_bitmap & ~self.child.evaluate(quotes_index)
+
+    def __repr__(self):
+        return f"Not({self.child})"
+
+
+class OrNode(object):
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, quotes_index):
+        return min(sum(x.estimate(quotes_index) for x in self.children), quotes_index.quotes_count)
+
+    def compile(self, quotes_index):
+        children = [x.compile(quotes_index) for x in self.children]
+        return OrNode(sorted(children, key=lambda x: -x.estimate(quotes_index)))
+
+    def evaluate(self, quotes_index):
+        bitmap = 0
+        for child in self.children:
+            bitmap |= child.evaluate(quotes_index)
+            if bitmap == quotes_index.all_quotes_bitmap:
+                break
+        return bitmap
+
+    def __repr__(self):
+        return f"Or({', '.join(map(repr, self.children))})"
+
+
+class AndNode(object):
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, quotes_index):
+        return min([x.estimate(quotes_index) for x in self.children], default=quotes_index.quotes_count)
+
+    def compile(self, quotes_index):
+        children = [x.compile(quotes_index) for x in self.children]
+        including_children = sorted(
+            [x for x in children if not isinstance(x, NotNode)], key=lambda x: x.estimate(quotes_index)
+        )
+        excluding_children = sorted(
+            [x for x in children if isinstance(x, NotNode)], key=lambda x: x.estimate(quotes_index)
+        )
+        return AndNode(including_children + excluding_children)
+
+    def evaluate(self, quotes_index):
+        bitmap = quotes_index.all_quotes_bitmap
+        for child in self.children:
+            if isinstance(child, NotNode):
+                bitmap &= ~child.child.evaluate(quotes_index)
+            else:
+                bitmap &= child.evaluate(quotes_index)
+            if bitmap == 0:
+                break
+        return bitmap
+
+    def __repr__(self):
+        return f"And({', '.join(map(repr, self.children))})"
+
+
+class PhraseNode(object):
+    def __init__(self, terms):
+        self.terms = terms
+
+    def estimate(self, quotes_index):
+        return min([x.estimate(quotes_index) for x in self.terms], default=0)
+
+    def compile(self, quotes_index):
+        return self
+
+    def evaluate(self, quotes_index):
+        if len(self.terms) == 0:
+            return 0
+        candidates_bitmap = AndNode(self.terms).compile(quotes_index).evaluate(quotes_index)
+        if len(self.terms) == 1:
+            return candidates_bitmap
+        phrase_base_forms = [set(x.base_forms) for x in self.terms]
+        return indexes_to_bitmap([
+            quote_index for quote_index in bitmap_to_indexes(candidates_bitmap)
+            if quotes_index.has_phrase(quote_index, phrase_base_forms)
+        ])
+
+    def __repr__(self):
+        return f"Phrase({' '.join(x.word for x in self.terms)})"
+
+
+def _get_unmatched_parentheses_indexes(tokens):
+    unmatched_indexes = set()
+    opening_indexes = []
+    for index, token in enumerate(tokens):
+        if token == OPENING_PARENTHESIS:
+            opening_indexes.append(index)
+        elif token == CLOSING_PARENTHESIS and len(opening_indexes) > 0:
+            opening_indexes.pop()
+        elif token == CLOSING_PARENTHESIS:
+            unmatched_indexes.add(index)
+    return unmatched_indexes.union(opening_indexes)
+
+
+def _is_word_token(token):
+    return token not in (OPENING_PARENTHESIS, CLOSING_PARENTHESIS) and not token.startswith('"')
+
+
+class _QueryParser(object):
+    def __init__(self, tokens, create_term):
+        self.tokens = tokens
+        self.create_term = create_term
+        self.position = 0
+        self.literal_indexes = _get_unmatched_parentheses_indexes(tokens)
+
+    def _is_closing_group(self):
+        return self._peek() == CLOSING_PARENTHESIS and self.position not in self.literal_indexes
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self._parse_or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected query token: {self._peek()}")
+        return node
+
+    def _parse_or(self):
+        children = [self._parse_and()]
+        while self._peek() == OR_OPERATOR:
+            self._next()
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else OrNode(children)
+
+    def _parse_and(self):
+        children = [self._parse_unary()]
+        while self._peek() not in (None, OR_OPERATOR) and not self._is_closing_group():
+            if self._peek() == AND_OPERATOR:
+                self._next()
+            children.append(self._parse_unary())
+        return children[0] if len(children) == 1 else AndNode(children)
+
+    def _parse_unary(self):
+        if self._peek() == NOT_OPERATOR:
+            self._next()
+            return NotNode(self._parse_unary())
+        return self._parse_primary()
+
+    def _parse_primary(self):
+        is_literal = self.position in self.literal_indexes
+        token = self._next()
+        if is_literal:
+            return self.create_term(token)
+        if token is None or token in OPERATORS or token == CLOSING_PARENTHESIS:
+            raise ValueError(f"Unexpected query token: {token}")
+        if token == OPENING_PARENTHESIS:
+            node = self._parse_or()
+            if self._next() != CLOSING_PARENTHESIS:
+                raise ValueError("Missing closing parenthesis in query")
+            return node
+        if token.startswith('"'):
+            return PhraseNode([self.create_term(x) for x in token.strip('"').split(" ") if len(x) > 0])
+        return self.create_term(token)
+
+
+def _is_touching(matches, first_index, second_index):
+    return 0 <= first_index and second_index < len(matches) and (
+        matches[first_index].end() == matches[second_index].start()
+    )
+
+
+def tokenize_query(query):
+    matches = list(QUERY_TOKEN_PATTERN.finditer(query))
+    literal_indexes = _get_unmatched_parentheses_indexes([x.group() for x in matches])
+    is_literal = [index in literal_indexes or _is_word_token(x.group()) for index, x in enumerate(matches)]
+    tokens = []
+    for index, match in enumerate(matches):
+        if is_literal[index] and index > 0 and is_literal[index - 1] and _is_touching(matches, index - 1, index):
+            tokens[-1] += match.group()
+        elif index not in literal_indexes:
+            tokens.append(match.group())
+        elif not _is_touching(matches, index - 1, index) and not _is_touching(matches, index, index + 1):
+            tokens.append(match.group())
+        elif index + 1 < len(matches) and is_literal[index + 1] and _is_touching(matches, index, index + 1):
+            tokens.append(match.group())
+    return tokens
+
+
+def parse_query(query, create_term):
+    tokens = tokenize_query(query)
+    if len(tokens) == 0:
+        return OrNode([])
+    return _QueryParser(tokens, create_term).parse()
@@ -4,7 +4,7 @@ import termcolor
 
 
 def _print_matching_quote(quotes_index, query, quote):
-    base_forms = quotes_index.generate_base_forms(query)
+    base_forms = quotes_index.generate_query_base_forms(query)
     for word in quote.split(" "):
         word_base_forms = quotes_index.generate_base_forms(word)
         if len(word_base_forms & base_forms) > 0:
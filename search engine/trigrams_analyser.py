@@ -1,20 +1,54 @@
+import argparse
+import multiprocessing
 from collections import defaultdict
 from quotes_index import QuotesIndex
+from quotes_query import get_bitmap_fingerprint
 import utils
 
+TRIGRAMS_PER_TASK = 2048
 
-def run_trigrams_analyser():
-    words_base_forms = utils.read_words_base_forms()
-    quotes = utils.read_quotes()
-    quotes_index = QuotesIndex(words_base_forms, quotes)
-    trigrams = utils.read_trigrams()
-    trigram_quotes_indexes = {
-        x: tuple(sorted(quotes_index.generate_matching_quotes_indexes(x)))
-        for x in trigrams
-    }
+_worker_data = {}
+
+
+def _initialize_worker():
+    _worker_data["quotes_index"] = QuotesIndex(utils.read_words_base_forms(), utils.read_quotes())
+
+
+def _fingerprint_trigram_in_worker(trigram):
+    return trigram, get_bitmap_fingerprint(
+        _worker_data["quotes_index"].generate_matching_words_bitmap(trigram.split(" "))
+    )
+
+
+def _iterate_unique_trigrams(trigrams):
+    seen_trigrams = set()
+    for trigram in trigrams:
+        if trigram not in seen_trigrams:
+            seen_trigrams.add(trigram)
+            yield trigram
+
+
+def _iterate_trigrams_fingerprints(trigrams, workers):
+    if workers == 1:
+        _initialize_worker()
+        yield from map(_fingerprint_trigram_in_worker, trigrams)
+        return
+    with multiprocessing.Pool(workers, initializer=_initialize_worker) as pool:
+        yield from pool.imap(_fingerprint_trigram_in_worker, trigrams, chunksize=TRIGRAMS_PER_TASK)
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trigrams_path", type=str, default="trigrams.txt")
+    parser.add_argument("--workers", type=int, default=1)
+    return vars(parser.parse_args())
+
+
+def run_trigrams_analyser(trigrams_path="trigrams.txt", workers=1):
     equivalence_classes = defaultdict(lambda: [])
-    for trigram, quotes_indexes in trigram_quotes_indexes.items():
-        equivalence_classes[quotes_indexes].append(trigram)
+    unique_trigrams = _iterate_unique_trigrams(utils.iter_trigrams(trigrams_path))
+    for trigram, fingerprint in _iterate_trigrams_fingerprints(unique_trigrams, workers):
+        equivalence_classes[fingerprint].append(trigram)
     for equivalence_class, trigrams in equivalence_classes.items():
         for trigram in trigrams:
             print(trigram)
@@ -22,4 +56,4 @@ def run_trigrams_analyser():
 
 
 if __name__ == '__main__':
-    run_trigrams_analyser()
+    run_trigrams_analyser(**_parse_input_arguments())
@@ -1,13 +1,8 @@
-from collections import defaultdict
+import base_forms_dictionary
 
 
 def read_words_base_forms():
-    words_base_forms = defaultdict(lambda: [])
-    with open("base_forms.txt", "r") as file_stream:
-        bases_words = map(lambda x: x.split(";")[0:2], file_stream.readlines())
-        for base, word in bases_words:
-            words_base_forms[word].append(base)
-    return dict(words_base_forms)
+    return base_forms_dictionary.load_base_forms_dictionary("base_forms.txt")
 
 
 def read_quotes():
@@ -15,6 +10,7 @@ def read_quotes():
         return list(map(lambda x: x.strip(), file_stream.readlines()))
 
 
-def read_trigrams():
-    with open("trigrams.txt", "r") as file_stream:
-        return list(map(lambda x: x.strip(), file_stream.readlines()))
+def iter_trigrams(trigrams_path="trigrams.txt"):
+    with open(trigrams_path, "r") as file_stream:
+        for line in file_stream:
+            yield line.strip()
@@ -0,0 +1,146 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+import query_profiler
+import utils
+from caching_index_storage import CachingIndexStorage, get_index_storage_class, open_caching_index_storages
+from code_profiler import CodeProfiler
+from index_query import parse_query, search
+from index_type import IndexType
+from storage_backend import StorageBackend
+
+QUERIES_PER_TASK = 4
+LATENCY_PERCENTILES = [50, 95, 99]
+
+_worker_data = {}
+
+
+def _initialize_worker(index_type, use_terms_clusters, storage_backend, max_results, cache_size_bytes, profile):
+    index_storage_class = get_index_storage_class(storage_backend)
+    _worker_data["index_type"] = index_type
+    _worker_data["max_results"] = max_results
+    _worker_data["profile"] = profile
+    _worker_data["traditional_index_storage"], _worker_data["positional_index_storage"] = open_caching_index_storages(
+        index_storage_class, use_terms_clusters, cache_size_bytes
+    )
+    _worker_data["terms_identifiers"] = utils.get_terms_identifiers(use_terms_clusters)
+
+
+def _evaluate_query_in_worker(raw_query):
+    start_time = time.perf_counter()
+    with query_profiler.profile_query(_worker_data["profile"]) as profiler:
+        search_results = search(
+            parse_query(raw_query, _worker_data["index_type"]), _worker_data["index_type"],
+            _worker_data["traditional_index_storage"], _worker_data["positional_index_storage"],
+            _worker_data["terms_identifiers"], _worker_data["max_results"]
+        )
+    latency_seconds = time.perf_counter() - start_time
+    query_results = {
+        "query": raw_query,
+        "results": [
+            {"id": wiki_article.id, "rating": float(rating)}
+            for wiki_article, rating in zip(search_results.wiki_articles, search_results.ratings)
+        ],
+        "latency_ms": latency_seconds * 1000,
+    }
+    if profiler is not None:
+        query_results["profile"] = profiler.get_report()
+    return query_results
+
+
+def _iterate_queries(stream):
+    for line in stream:
+        raw_query = line.rstrip("\n")
+        if len(raw_query.strip()) > 0:
+            yield raw_query
+
+
+@contextlib.contextmanager
+def _open_or_default(path, mode, default_stream):
+    if path == "-":
+        yield default_stream
+        return
+    with open(path, mode) as stream:
+        yield stream
+
+
+def _iterate_queries_results(raw_queries, initializer_args, workers):
+    if workers == 1:
+        _initialize_worker(*initializer_args)
+        yield from map(_evaluate_query_in_worker, raw_queries)
+        return
+    with multiprocessing.Pool(workers, initializer=_initialize_worker, initargs=initializer_args) as pool:
+        yield from pool.imap(_evaluate_query_in_worker, raw_queries, chunksize=QUERIES_PER_TASK)
+
+
+def get_throughput_summary(latencies_ms, total_seconds):
+    summary = {
+        "queries": len(latencies_ms),
+        "total_seconds": total_seconds,
+        "queries_per_second": len(latencies_ms) / total_seconds if total_seconds > 0 else 0.0,
+    }
+    for percentile in LATENCY_PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(latencies_ms, percentile)) if len(latencies_ms) > 0 else 0.0
+    return summary
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-index_type", type=IndexType, choices=list(IndexType.__dict__.values()))
+    parser.add_argument("--use_terms_clusters", type=bool, default=False)
+    parser.add_argument(
+        "--storage_backend", type=StorageBackend, choices=list(StorageBackend), default=StorageBackend.SQLITE
+    )
+    parser.add_argument("--max_results", type=int, default=10)
+    parser.add_argument("--cache_size_mb", type=int, default=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20)
+    parser.add_argument("--queries_path", type=str, default="-")
+    parser.add_argument("--results_path", type=str, default="-")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--profile", type=bool, default=False)
+    parser.add_argument("--code_profiler", type=CodeProfiler, choices=list(CodeProfiler), default=CodeProfiler.NONE)
+    parser.add_argument("--code_profile_path", type=str, default="data/batch_query_profile.out")
+    return vars(parser.parse_args())
+
+
+def run_batch_query(index_type, use_terms_clusters, storage_backend=StorageBackend.SQLITE, max_results=10,
+                    cache_size_mb=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20, queries_path="-",
+                    results_path="-", workers=1, profile=False, code_profiler=CodeProfiler.NONE,
+                    code_profile_path="data/batch_query_profile.out"):
+    if code_profiler != CodeProfiler.NONE and workers != 1:
+        raise ValueError("Code profiling is only supported with a single worker")
+    logger = utils.get_default_logger()
+    initializer_args = (
+        index_type, use_terms_clusters, storage_backend, max_results, cache_size_mb * 2 ** 20, profile
+    )
+    latencies_ms = []
+    profile_summary = query_profiler.ProfileSummary()
+    with _open_or_default(queries_path, "r", sys.stdin) as queries_stream, \
+            _open_or_default(results_path, "w", sys.stdout) as results_stream, \
+            query_profiler.code_profiling(code_profiler, code_profile_path):
+        start_time = time.perf_counter()
+        raw_queries = _iterate_queries(queries_stream)
+        for query_results in _iterate_queries_results(raw_queries, initializer_args, workers):
+            latencies_ms.append(query_results["latency_ms"])
+            if profile:
+                profile_summary.add_report(query_results["profile"])
+            results_stream.write(json.dumps(query_results) + "\n")
+        total_seconds = time.perf_counter() - start_time
+    summary = get_throughput_summary(latencies_ms, total_seconds)
+    logger.info(
+        f"Evaluated {summary['queries']} queries in {summary['total_seconds']:.2f} s with {workers} workers: "
+        f"{summary['queries_per_second']:.1f} queries/s, p50 {summary['p50_ms']:.2f} ms, "
+        f"p95 {summary['p95_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms"
+    )
+    if profile:
+        query_profiler.log_profile_summary(logger, profile_summary.get_summary())
+    return summary
+
+
+if __name__ == "__main__":
+    run_batch_query(**_parse_input_arguments())
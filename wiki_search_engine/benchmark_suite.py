@@ -0,0 +1,332 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+
+import numpy as np
+
+import utils
+from benchmark_utils import benchmark_working_directory, create_random_words, measure_seconds
+from caching_index_storage import CachingIndexStorage
+from index_creator import run_index_creator
+from index_query import get_words_terms_identifiers, parse_query, search
+from index_storage import IndexStorage
+from index_type import IndexType
+from ordered_list import OrderedList
+from posting_list import PostingList
+from roaring_bitmap import RoaringBitmap
+from search_result_rater import SearchResultRater
+from wiki_article import WikiArticle
+
+BASE_FORMS_PER_WORD = 2
+ARTICLE_TITLE_WORDS = 3
+ARTICLE_CONTENT_WORDS = 200
+LATENCY_PERCENTILES = [50, 95]
+RATED_CANDIDATES_COUNT = 1_000
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+
+def _create_zipf_words(random_generator, vocabulary, words_count):
+    words_weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return random_generator.choices(vocabulary, weights=words_weights, k=words_count)
+
+
+def _write_benchmark_corpus(articles_count, vocabulary_size, seed):
+    random_generator = random.Random(seed)
+    vocabulary = create_random_words(random_generator, vocabulary_size)
+    random_generator.shuffle(vocabulary)
+    wiki_articles = [
+        WikiArticle(
+            id=article_id,
+            title=" ".join(_create_zipf_words(random_generator, vocabulary, ARTICLE_TITLE_WORDS)),
+            content=" ".join(_create_zipf_words(random_generator, vocabulary, ARTICLE_CONTENT_WORDS))
+        )
+        for article_id in range(1, articles_count + 1)
+    ]
+    with open("data/wiki_slice.txt", "w") as stream:
+        stream.write("\n\n".join(f"TITLE: {x.title}\n{x.content}" for x in wiki_articles) + "\n")
+    with open("data/base_forms.txt", "w") as stream:
+        for word in vocabulary:
+            for base_form in random_generator.sample(vocabulary, random_generator.randint(1, BASE_FORMS_PER_WORD)):
+                stream.write(f"{base_form};{word};subst\n")
+    return wiki_articles
+
+
+def _create_benchmark_queries(random_generator, wiki_articles, queries_count):
+    queries = {IndexType.TRADITIONAL: [], IndexType.POSITIONAL: [], IndexType.MIXED: []}
+    for wiki_article in random_generator.sample(wiki_articles, queries_count):
+        content_words = wiki_article.content.split(" ")
+        phrase_start = random_generator.randrange(len(content_words) - 1)
+        phrase = " ".join(content_words[phrase_start:phrase_start + 2])
+        queries[IndexType.TRADITIONAL].append(" ".join(random_generator.sample(content_words, 2)))
+        queries[IndexType.POSITIONAL].append(phrase)
+        queries[IndexType.MIXED].append(f'"{phrase}" {random_generator.choice(content_words)}')
+    return queries
+
+
+def _measure_best_seconds(repeats, func, *args):
+    return min(measure_seconds(func, *args) for _ in range(repeats))
+
+
+def _get_latency_percentiles(latencies_seconds):
+    return {
+        f"p{percentile}_ms": float(np.percentile(latencies_seconds, percentile)) * 1000
+        for percentile in LATENCY_PERCENTILES
+    }
+
+
+def _create_random_posting_lists_values(random_generator, articles_count, lists_count):
+    return [
+        sorted(random_generator.sample(range(1, articles_count + 1), random_generator.randint(1, articles_count)))
+        for _ in range(lists_count)
+    ]
+
+
+def _benchmark_posting_list(random_generator, articles_count, repeats):
+    posting_lists_values = _create_random_posting_lists_values(random_generator, articles_count, 64)
+    posting_lists = [PostingList.from_values(values) for values in posting_lists_values]
+    values_count = sum(len(values) for values in posting_lists_values)
+    encode_seconds = _measure_best_seconds(
+        repeats, lambda: [PostingList.from_values(values) for values in posting_lists_values]
+    )
+    decode_seconds = _measure_best_seconds(
+        repeats, lambda: [posting_list.decode_to_array() for posting_list in posting_lists]
+    )
+    return {
+        "posting_list_encode_ns_per_value": encode_seconds / values_count * 1e9,
+        "posting_list_decode_ns_per_value": decode_seconds / values_count * 1e9,
+    }
+
+
+def _benchmark_ordered_list(random_generator, articles_count, repeats):
+    ordered_lists = [
+        OrderedList(values) for values in _create_random_posting_lists_values(random_generator, articles_count, 64)
+    ]
+    ordered_lists_pairs = list(zip(ordered_lists[::2], ordered_lists[1::2]))
+    values_count = sum(len(x.items) + len(y.items) for x, y in ordered_lists_pairs)
+    intersection_seconds = _measure_best_seconds(repeats, lambda: [x & y for x, y in ordered_lists_pairs])
+    union_seconds = _measure_best_seconds(repeats, lambda: [x | y for x, y in ordered_lists_pairs])
+    return {
+        "ordered_list_intersection_ns_per_value": intersection_seconds / values_count * 1e9,
+        "ordered_list_union_ns_per_value": union_seconds / values_count * 1e9,
+    }
+
+
+def _benchmark_roaring_bitmap(random_generator, articles_count, repeats):
+    bitmaps = [
+        RoaringBitmap.from_values(values)
+        for values in _create_random_posting_lists_values(random_generator, articles_count, 64)
+    ]
+    bitmaps_pairs = list(zip(bitmaps[::2], bitmaps[1::2]))
+    values_count = sum(len(x) + len(y) for x, y in bitmaps_pairs)
+    intersection_seconds = _measure_best_seconds(repeats, lambda: [x & y for x, y in bitmaps_pairs])
+    union_seconds = _measure_best_seconds(repeats, lambda: [x | y for x, y in bitmaps_pairs])
+    return {
+        "roaring_bitmap_intersection_ns_per_value": intersection_seconds / values_count * 1e9,
+        "roaring_bitmap_union_ns_per_value": union_seconds / values_count * 1e9,
+    }
+
+
+def _benchmark_index_build(articles_count):
+    results = {}
+    for index_type in [IndexType.TRADITIONAL, IndexType.POSITIONAL]:
+        build_seconds = measure_seconds(run_index_creator, index_type, False)
+        results[f"index_build_{index_type.value.lower()}_seconds_per_1k_articles"] = (
+            build_seconds / articles_count * 1000
+        )
+    return results
+
+
+def _load_storage_in_bulk(wiki_articles, terms_posting_lists):
+    with IndexStorage(
+        IndexType.TRADITIONAL, False, truncate_old=True, bulk_load=True, segment_name="bulk_load"
+    ) as index_storage:
+        index_storage.add_indexed_terms(terms_posting_lists)
+        index_storage.add_wiki_articles(wiki_articles)
+
+
+def _benchmark_bulk_load(random_generator, wiki_articles, repeats):
+    words = sorted(set(itertools.chain.from_iterable(x.content.split() for x in wiki_articles)))
+    terms_posting_lists = [
+        (term_id, PostingList.from_values(values))
+        for term_id, values in enumerate(_create_random_posting_lists_values(
+            random_generator, len(wiki_articles) // 16, len(words)
+        ))
+    ]
+    bulk_load_seconds = _measure_best_seconds(repeats, _load_storage_in_bulk, wiki_articles, terms_posting_lists)
+    return {
+        "bulk_load_us_per_row": bulk_load_seconds / (len(wiki_articles) + len(terms_posting_lists)) * 1e6,
+    }
+
+
+def _open_query_storages():
+    return (
+        CachingIndexStorage(IndexType.TRADITIONAL, False, truncate_old=False, read_only=True),
+        CachingIndexStorage(IndexType.POSITIONAL, False, truncate_old=False, read_only=True),
+    )
+
+
+def _measure_queries_latencies(index_type, raw_queries, traditional_index_storage, positional_index_storage):
+    terms_identifiers = utils.get_terms_identifiers(False)
+    return [
+        measure_seconds(
+            search, parse_query(raw_query, index_type), index_type, traditional_index_storage,
+            positional_index_storage, terms_identifiers, 10
+        )
+        for raw_query in raw_queries
+    ]
+
+
+def _benchmark_queries(benchmark_queries):
+    results = {}
+    for index_type, raw_queries in benchmark_queries.items():
+        traditional_index_storage, positional_index_storage = _open_query_storages()
+        cache_states_latencies = {
+            "cold": _measure_queries_latencies(
+                index_type, raw_queries, traditional_index_storage, positional_index_storage
+            ),
+            "warm": _measure_queries_latencies(
+                index_type, raw_queries, traditional_index_storage, positional_index_storage
+            ),
+        }
+        traditional_index_storage.close()
+        positional_index_storage.close()
+        for cache_state, latencies in cache_states_latencies.items():
+            for metric_name, value in _get_latency_percentiles(latencies).items():
+                results[f"query_{index_type.value.lower()}_{cache_state}_{metric_name}"] = value
+    return results
+
+
+def _benchmark_rater(random_generator, wiki_articles):
+    traditional_index_storage, positional_index_storage = _open_query_storages()
+    query_words_base_forms = traditional_index_storage.get_words_base_forms(
+        random_generator.choice(wiki_articles).content.split()[:2]
+    )
+    query_identifiers = set(itertools.chain(*get_words_terms_identifiers(
+        query_words_base_forms, utils.get_terms_identifiers(False)
+    ).values()))
+    search_result_rater = SearchResultRater(
+        traditional_index_storage, traditional_index_storage.get_terms_ids(query_identifiers).values()
+    )
+    candidates_ids = sorted(random_generator.sample(
+        [x.id for x in wiki_articles], min(RATED_CANDIDATES_COUNT, len(wiki_articles))
+    ))
+    cold_seconds = measure_seconds(search_result_rater.rate_wiki_articles, candidates_ids)
+    warm_seconds = measure_seconds(search_result_rater.rate_wiki_articles, candidates_ids)
+    traditional_index_storage.close()
+    positional_index_storage.close()
+    return {
+        "rater_cold_us_per_candidate": cold_seconds / len(candidates_ids) * 1e6,
+        "rater_warm_us_per_candidate": warm_seconds / len(candidates_ids) * 1e6,
+    }
+
+
+def _get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _get_environment():
+    return {
+        "commit": _get_git_commit(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def _compare_results(results, baseline_results, regression_threshold):
+    comparison = {}
+    for metric_name, value in results.items():
+        baseline_value = baseline_results.get(metric_name)
+        if baseline_value is None or baseline_value <= 0:
+            continue
+        ratio = value / baseline_value
+        comparison[metric_name] = {
+            "baseline": baseline_value, "current": value, "ratio": ratio,
+            "regression": ratio > 1 + regression_threshold,
+        }
+    return comparison
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles_count", type=int, default=3_000)
+    parser.add_argument("--vocabulary_size", type=int, default=5_000)
+    parser.add_argument("--queries_count", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results_path", type=str, default="output/benchmark_results.json")
+    parser.add_argument("--baseline_path", type=str, default=None)
+    parser.add_argument("--regression_threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    return vars(parser.parse_args())
+
+
+def run_benchmark_suite(articles_count=3_000, vocabulary_size=5_000, queries_count=200, repeats=5, seed=0,
+                        results_path="output/benchmark_results.json", baseline_path=None,
+                        regression_threshold=DEFAULT_REGRESSION_THRESHOLD):
+    logger = utils.get_default_logger()
+    results_path = os.path.abspath(results_path)
+    baseline_path = os.path.abspath(baseline_path) if baseline_path is not None else None
+    random_generator = random.Random(seed)
+    results = {}
+    with benchmark_working_directory():
+        logger.info("Creating benchmark corpus...")
+        wiki_articles = _write_benchmark_corpus(articles_count, vocabulary_size, seed)
+        logger.info("Benchmarking posting lists, ordered lists and bitmaps...")
+        results.update(_benchmark_posting_list(random_generator, articles_count, repeats))
+        results.update(_benchmark_ordered_list(random_generator, articles_count, repeats))
+        results.update(_benchmark_roaring_bitmap(random_generator, articles_count, repeats))
+        logger.info("Benchmarking index build...")
+        results.update(_benchmark_index_build(articles_count))
+        logger.info("Benchmarking bulk load...")
+        results.update(_benchmark_bulk_load(random_generator, wiki_articles, repeats))
+        logger.info("Benchmarking queries...")
+        results.update(_benchmark_queries(_create_benchmark_queries(random_generator, wiki_articles, queries_count)))
+        logger.info("Benchmarking search result rater...")
+        results.update(_benchmark_rater(random_generator, wiki_articles))
+    benchmark_report = {
+        "environment": _get_environment(),
+        "parameters": {
+            "articles_count": articles_count, "vocabulary_size": vocabulary_size, "queries_count": queries_count,
+            "repeats": repeats, "seed": seed,
+        },
+        "results": results,
+    }
+    if baseline_path is not None:
+        with open(baseline_path) as stream:
+            baseline_report = json.load(stream)
+        benchmark_report["comparison"] = _compare_results(
+            results, baseline_report["results"], regression_threshold
+        )
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "w") as stream:
+        json.dump(benchmark_report, stream, indent=2)
+    for metric_name, value in results.items():
+        logger.info(f"{metric_name}: {value:.3f}")
+    regressions = [
+        metric_name for metric_name, metric_comparison in benchmark_report.get("comparison", {}).items()
+        if metric_comparison["regression"]
+    ]
+    for metric_name in regressions:
+        metric_comparison = benchmark_report["comparison"][metric_name]
+        logger.warning(
+            f"Regression in {metric_name}: {metric_comparison['baseline']:.3f} -> {metric_comparison['current']:.3f} "
+            f"({metric_comparison['ratio']:.2f}x)"
+        )
+    logger.info(f"Benchmark results saved to {results_path}")
+    return len(regressions) == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark_suite(**_parse_input_arguments()) else 1)
@@ -0,0 +1,30 @@
+import contextlib
+import os
+import string
+import tempfile
+import time
+
+
+@contextlib.contextmanager
+def benchmark_working_directory():
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "data"))
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous_directory)
+
+
+def create_random_words(random_generator, words_count):
+    words = set()
+    while len(words) < words_count:
+        words.add("".join(random_generator.choices(string.ascii_lowercase, k=random_generator.randint(3, 12))))
+    return sorted(words)
+
+
+def measure_seconds(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
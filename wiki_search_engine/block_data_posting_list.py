@@ -0,0 +1,51 @@
+import numpy as np
+
+import posting_codecs
+import query_profiler
+import varint_codec
+from posting_codec import PostingCodec
+from posting_list import PostingList
+from posting_representation import PostingRepresentation
+
+
+class BlockDataPostingList(PostingList):
+    def __init__(self, coded_sequence=None, coding=128, length=None, skip_entries=None, coded_block_data=None,
+                 block_data_skip_entries=None, codec=PostingCodec.VARINT,
+                 representation=PostingRepresentation.SORTED_ARRAY):
+        super().__init__(coded_sequence, coding, length, skip_entries, codec, representation)
+        self.coded_block_data = coded_block_data if coded_block_data is not None else bytes()
+        self._block_data_skip_entries = block_data_skip_entries
+        self._block_data_end_offsets = None
+
+    def _set_documents_and_block_data(self, documents_posting_list, coded_blocks_data):
+        self.coded_sequence = documents_posting_list.coded_sequence
+        self._length = len(documents_posting_list)
+        self._last_element = documents_posting_list.last_element
+        self._blocks = documents_posting_list._blocks
+        self._bitmap = documents_posting_list._bitmap
+        self.representation = documents_posting_list.representation
+        self.coded_block_data = b"".join(coded_blocks_data)
+        self._block_data_end_offsets = np.cumsum([len(x) for x in coded_blocks_data])
+
+    @property
+    def block_data_skip_entries(self):
+        return varint_codec.encode_values(self._get_block_data_end_offsets(), self.coding)
+
+    def _get_block_data_end_offsets(self):
+        if self._block_data_end_offsets is None:
+            self._block_data_end_offsets = varint_codec.decode_values(self._block_data_skip_entries, self.coding)
+        return self._block_data_end_offsets
+
+    def _get_block_documents_count(self, block_index):
+        return min(PostingList.BLOCK_SIZE, len(self) - block_index * PostingList.BLOCK_SIZE)
+
+    def decode_block_data_gaps(self, block_index):
+        block_data_end_offsets = self._get_block_data_end_offsets()
+        start_offset = block_data_end_offsets[block_index - 1] if block_index > 0 else 0
+        coded_block = memoryview(self.coded_block_data)[start_offset:block_data_end_offsets[block_index]]
+        query_profiler.add_counter("postings_bytes_decoded", len(coded_block))
+        with query_profiler.profile_stage("decoding"):
+            return posting_codecs.decode_gaps(coded_block, self.codec, self.coding)
+
+    def append(self, document_id):
+        raise ValueError("Posting lists with block data can only be created as a whole")
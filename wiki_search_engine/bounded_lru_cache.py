@@ -0,0 +1,76 @@
+import collections
+import threading
+
+import attr
+
+
+@attr.s(frozen=True)
+class CacheStats(object):
+    hits = attr.ib()
+    misses = attr.ib()
+    evictions = attr.ib()
+    items_count = attr.ib()
+    size_bytes = attr.ib()
+    max_size_bytes = attr.ib()
+
+
+class BoundedLruCache(object):
+    def __init__(self, max_size_bytes):
+        self.max_size_bytes = max_size_bytes
+        self._entries = collections.OrderedDict()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._entries.move_to_end(key)
+            value, _ = self._entries[key]
+            return value
+
+    def put(self, key, value, size_bytes):
+        with self._lock:
+            self._remove(key)
+            if size_bytes > self.max_size_bytes:
+                return
+            self._entries[key] = (value, size_bytes)
+            self._size_bytes += size_bytes
+            while self._size_bytes > self.max_size_bytes:
+                _, (_, evicted_size_bytes) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size_bytes
+                self._evictions += 1
+
+    def _remove(self, key):
+        if key not in self._entries:
+            return
+        _, size_bytes = self._entries.pop(key)
+        self._size_bytes -= size_bytes
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return CacheStats(
+                hits=self._hits, misses=self._misses, evictions=self._evictions, items_count=len(self._entries),
+                size_bytes=self._size_bytes, max_size_bytes=self.max_size_bytes
+            )
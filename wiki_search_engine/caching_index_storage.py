@@ -1,53 +1,134 @@
-import functools
-import attr
+import sys
+
+import query_profiler
+from bounded_lru_cache import BoundedLruCache
+from index_segments import SegmentedIndexStorage, SegmentsPostingList
 from index_storage import IndexStorage
+from index_type import IndexType
+from mmap_index_storage import MmapIndexStorage
 from posting_list import PostingList
+from storage_backend import StorageBackend
+
 
+class CachingIndexStorage(SegmentedIndexStorage):
+    DEFAULT_CACHE_SIZE_BYTES = 512 * 2 ** 20
+    CACHE_POOLS_SHARES = {
+        "postings": 0.4,
+        "articles": 0.2,
+        "forward_index": 0.25,
+        "base_forms": 0.1,
+        "terms_ids": 0.05,
+    }
+    INDEX_TYPES_CACHE_SHARES = {
+        IndexType.TRADITIONAL: 0.5,
+        IndexType.POSITIONAL: 0.5,
+    }
+    CACHE_ENTRY_OVERHEAD_BYTES = 128
+    MISSING_TERM_ID = -1
 
-@attr.s()
-class ListItemCache(object):
-    item = attr.ib()
-    value = attr.ib(default=None)
+    def __init__(self, index_type, use_terms_clusters, truncate_old, cache_size_bytes=DEFAULT_CACHE_SIZE_BYTES,
+                 read_only=False):
+        super().__init__(index_type, use_terms_clusters, truncate_old, read_only=read_only)
+        self._caches = {
+            pool_name: BoundedLruCache(int(cache_size_bytes * pool_share))
+            for pool_name, pool_share in self.CACHE_POOLS_SHARES.items()
+        }
 
+    @staticmethod
+    def _get_posting_list_size(posting_list):
+        if isinstance(posting_list, SegmentsPostingList):
+            return sum(CachingIndexStorage._get_posting_list_size(x) for x in posting_list.segments_posting_lists)
+        coded_block_data = getattr(posting_list, "coded_block_data", bytes())
+        blocks_count = len(posting_list) // PostingList.BLOCK_SIZE + 1
+        return len(posting_list.coded_sequence) + len(coded_block_data) + 3 * blocks_count * 8
 
-class CachingIndexStorage(IndexStorage):
+    @staticmethod
+    def _get_wiki_article_size(wiki_article):
+        return sys.getsizeof(wiki_article.title) + sys.getsizeof(wiki_article.content)
 
-    def __init__(self, index_type, use_terms_clusters, truncate_old):
-        super().__init__(index_type, use_terms_clusters, truncate_old)
+    @staticmethod
+    def _get_forward_index_entry_size(forward_index_entry):
+        return (
+            forward_index_entry.tokens.nbytes + forward_index_entry.terms_ids.nbytes +
+            forward_index_entry.fallbacks.nbytes
+        )
 
-    @functools.lru_cache(maxsize=10_000_000)
-    def _list_items_cache(self, _func, item):
-        return ListItemCache(item=item)
+    @staticmethod
+    def _get_base_forms_size(base_forms):
+        return sum(sys.getsizeof(x) for x in base_forms)
 
     @staticmethod
-    def _resolve_items(items_caches, resolve_func, default_value=None):
-        unresolved_items_caches = list(filter(lambda x: x.value is None, items_caches))
-        if len(unresolved_items_caches) == 0:
-            return
-        items_values = resolve_func(list(map(lambda x: x.item, unresolved_items_caches)))
-        for item_cache in unresolved_items_caches:
-            if item_cache.item in items_values:
-                item_cache.value = items_values[item_cache.item]
-            elif default_value is not None:
-                item_cache.value = default_value
-            else:
-                raise ValueError(f"Cannot resolve item: {item_cache.item}")
-
-    def get_terms_postings_lists(self, terms):
-        items_caches = [self._list_items_cache(self.get_terms_postings_lists, x) for x in terms]
-        CachingIndexStorage._resolve_items(items_caches, super().get_terms_postings_lists, default_value=PostingList())
-        return {x.item: x.value for x in items_caches}
+    def _get_term_id_size(_term_id):
+        return 0
+
+    def _get_cached_items(self, pool_name, items, resolve_func, get_value_size, default_value=None):
+        cache = self._caches[pool_name]
+        items_values = {}
+        for item in items:
+            if item not in items_values:
+                items_values[item] = cache.get(item)
+        unresolved_items = [item for item, value in items_values.items() if value is None]
+        query_profiler.add_cache_lookups(pool_name, len(items_values) - len(unresolved_items), len(unresolved_items))
+        if len(unresolved_items) > 0:
+            with query_profiler.profile_stage(f"storage_{pool_name}"):
+                resolved_items_values = resolve_func(unresolved_items)
+            for item in unresolved_items:
+                if item in resolved_items_values:
+                    value = resolved_items_values[item]
+                elif default_value is not None:
+                    value = default_value
+                else:
+                    raise ValueError(f"Cannot resolve item: {item}")
+                items_values[item] = value
+                cache.put(item, value, sys.getsizeof(item) + get_value_size(value) + self.CACHE_ENTRY_OVERHEAD_BYTES)
+        return items_values
+
+    def get_terms_postings_lists(self, terms_ids):
+        return self._get_cached_items(
+            "postings", terms_ids, super().get_terms_postings_lists, self._get_posting_list_size,
+            default_value=PostingList()
+        )
 
     def get_wiki_articles(self, ids):
-        items_caches = [self._list_items_cache(self.get_wiki_articles, x) for x in ids]
-        CachingIndexStorage._resolve_items(items_caches, super().get_wiki_articles)
-        return {x.item: x.value for x in items_caches}
+        return self._get_cached_items("articles", ids, super().get_wiki_articles, self._get_wiki_article_size)
 
     def get_words_base_forms(self, words):
-        items_caches = [self._list_items_cache(self.get_words_base_forms, x) for x in words]
-        CachingIndexStorage._resolve_items(items_caches, super().get_words_base_forms, default_value=[])
-        return {x.item: x.value for x in items_caches}
+        return self._get_cached_items(
+            "base_forms", words, super().get_words_base_forms, self._get_base_forms_size, default_value=[]
+        )
+
+    def get_forward_index_entries(self, ids):
+        return self._get_cached_items(
+            "forward_index", ids, super().get_forward_index_entries, self._get_forward_index_entry_size
+        )
+
+    def get_terms_ids(self, terms):
+        terms_ids = self._get_cached_items(
+            "terms_ids", terms, super().get_terms_ids, self._get_term_id_size, default_value=self.MISSING_TERM_ID
+        )
+        return {term: term_id for term, term_id in terms_ids.items() if term_id != self.MISSING_TERM_ID}
+
+    def get_cache_stats(self):
+        return {pool_name: cache.stats for pool_name, cache in self._caches.items()}
+
+
+class CachingMmapIndexStorage(CachingIndexStorage, MmapIndexStorage):
+    pass
+
+
+def get_index_storage_class(storage_backend, caching=True):
+    index_storage_class, caching_index_storage_class = {
+        StorageBackend.SQLITE: (IndexStorage, CachingIndexStorage),
+        StorageBackend.MMAP: (MmapIndexStorage, CachingMmapIndexStorage),
+    }[storage_backend]
+    return caching_index_storage_class if caching else index_storage_class
+
 
-    @functools.lru_cache(maxsize=1)
-    def get_document_positions(self):
-        return super().get_document_positions()
+def open_caching_index_storages(index_storage_class, use_terms_clusters, cache_size_bytes, read_only=False):
+    return tuple(
+        index_storage_class(
+            index_type, use_terms_clusters, truncate_old=False, cache_size_bytes=int(cache_size_bytes * cache_share),
+            read_only=read_only
+        )
+        for index_type, cache_share in CachingIndexStorage.INDEX_TYPES_CACHE_SHARES.items()
+    )
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class CodeProfiler(Enum):
+    NONE = "NONE"
+    CPROFILE = "CPROFILE"
+    SAMPLING = "SAMPLING"
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def _get_shifted_gaps(gaps):
+    shifted_gaps = [int(gap) + 1 for gap in gaps]
+    if any(gap <= 0 for gap in shifted_gaps):
+        raise ValueError("Gaps to be encoded must be non-negative")
+    return shifted_gaps
+
+
+def _encode_bits(codes):
+    bits = "".join(codes)
+    if len(bits) == 0:
+        return bytes()
+    padded_bits = bits + "0" * (-len(bits) % 8)
+    return int(padded_bits, 2).to_bytes(len(padded_bits) // 8, "big")
+
+
+def _decode_bits(coded_sequence):
+    if len(coded_sequence) == 0:
+        return ""
+    return format(int.from_bytes(coded_sequence, "big"), f"0{len(coded_sequence) * 8}b")
+
+
+def _get_gamma_code(value):
+    value_bits = bin(value)[2:]
+    return "0" * (len(value_bits) - 1) + value_bits
+
+
+def _get_delta_code(value):
+    value_bits = bin(value)[2:]
+    return _get_gamma_code(len(value_bits)) + value_bits[1:]
+
+
+def encode_gamma_gaps(gaps):
+    return _encode_bits(_get_gamma_code(gap) for gap in _get_shifted_gaps(gaps))
+
+
+def decode_gamma_gaps(coded_sequence):
+    bits = _decode_bits(coded_sequence)
+    gaps = []
+    position = 0
+    while True:
+        value_start = bits.find("1", position)
+        if value_start < 0:
+            break
+        value_end = 2 * value_start - position + 1
+        gaps.append(int(bits[value_start:value_end], 2) - 1)
+        position = value_end
+    return np.array(gaps, dtype=np.int64)
+
+
+def encode_delta_gaps(gaps):
+    return _encode_bits(_get_delta_code(gap) for gap in _get_shifted_gaps(gaps))
+
+
+def decode_delta_gaps(coded_sequence):
+    bits = _decode_bits(coded_sequence)
+    gaps = []
+    position = 0
+    while True:
+        length_start = bits.find("1", position)
+        if length_start < 0:
+            break
+        length_end = 2 * length_start - position + 1
+        value_end = length_end + int(bits[length_start:length_end], 2) - 1
+        gaps.append(int("1" + bits[length_end:value_end], 2) - 1)
+        position = value_end
+    return np.array(gaps, dtype=np.int64)
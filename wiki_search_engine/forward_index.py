@@ -0,0 +1,90 @@
+import attr
+import numpy as np
+
+
+@attr.s(frozen=True)
+class ForwardIndexEntry(object):
+    title_tokens_count = attr.ib()
+    tokens_count = attr.ib()
+    tokens = attr.ib()
+    terms_ids = attr.ib()
+    fallbacks = attr.ib()
+
+    @staticmethod
+    def from_bytes(title_tokens_count, tokens_count, tokens, terms_ids, fallbacks):
+        return ForwardIndexEntry(
+            title_tokens_count=title_tokens_count,
+            tokens_count=tokens_count,
+            tokens=np.frombuffer(tokens, dtype=np.int32),
+            terms_ids=np.frombuffer(terms_ids, dtype=np.int32),
+            fallbacks=np.frombuffer(fallbacks, dtype=np.bool_)
+        )
+
+    def to_bytes(self):
+        return (
+            self.title_tokens_count, self.tokens_count, self.tokens.tobytes(), self.terms_ids.tobytes(),
+            self.fallbacks.tobytes()
+        )
+
+    def get_matching_entries(self, query_terms_ids, with_fallbacks=True):
+        sorted_query_terms_ids = np.unique(query_terms_ids)
+        if len(sorted_query_terms_ids) == 0:
+            return np.zeros(len(self.terms_ids), dtype=np.bool_)
+        query_terms_indexes = np.searchsorted(sorted_query_terms_ids[:-1], self.terms_ids)
+        matching_entries = sorted_query_terms_ids[query_terms_indexes] == self.terms_ids
+        if not with_fallbacks:
+            matching_entries &= ~self.fallbacks
+        return matching_entries
+
+    def get_matching_tokens(self, query_terms_ids, with_fallbacks=True):
+        return self.get_entries_tokens(self.get_matching_entries(query_terms_ids, with_fallbacks))
+
+    def get_entries_tokens(self, entries):
+        entries_tokens = np.zeros(self.tokens_count, dtype=np.bool_)
+        entries_tokens[self.tokens[entries]] = True
+        return entries_tokens
+
+
+def get_title_tokens_count(wiki_article):
+    return len(wiki_article.title.split(" "))
+
+
+def get_tokens_terms_identifiers(wiki_article, words_base_forms, terms_identifiers):
+    tokens_terms_identifiers = []
+    for token in " ".join([wiki_article.title, wiki_article.content]).lower().split(" "):
+        cleaned_token = token.strip()
+        is_fallback = cleaned_token not in words_base_forms
+        base_forms = [cleaned_token] if is_fallback else words_base_forms[cleaned_token]
+        token_terms_identifiers = list(dict.fromkeys(terms_identifiers[base_form] for base_form in base_forms))
+        tokens_terms_identifiers.append((token_terms_identifiers, is_fallback))
+    return tokens_terms_identifiers
+
+
+def count_terms_frequencies(wiki_article, words_base_forms, terms_identifiers):
+    title_tokens_count = get_title_tokens_count(wiki_article)
+    tokens_terms_identifiers = get_tokens_terms_identifiers(wiki_article, words_base_forms, terms_identifiers)
+    terms_frequencies = {}
+    for token_index, (token_terms_identifiers, _) in enumerate(tokens_terms_identifiers):
+        for term_identifier in token_terms_identifiers:
+            term_frequencies = terms_frequencies.setdefault(term_identifier, [0, 0])
+            term_frequencies[0 if token_index < title_tokens_count else 1] += 1
+    return terms_frequencies
+
+
+def create_forward_index_entry(wiki_article, words_base_forms, terms_identifiers, terms_ids):
+    tokens = []
+    entries_terms_ids = []
+    fallbacks = []
+    tokens_terms_identifiers = get_tokens_terms_identifiers(wiki_article, words_base_forms, terms_identifiers)
+    for token_index, (token_terms_identifiers, is_fallback) in enumerate(tokens_terms_identifiers):
+        for term_identifier in token_terms_identifiers:
+            tokens.append(token_index)
+            entries_terms_ids.append(terms_ids.setdefault(term_identifier, len(terms_ids)))
+            fallbacks.append(is_fallback)
+    return ForwardIndexEntry(
+        title_tokens_count=get_title_tokens_count(wiki_article),
+        tokens_count=len(tokens_terms_identifiers),
+        tokens=np.array(tokens, dtype=np.int32),
+        terms_ids=np.array(entries_terms_ids, dtype=np.int32),
+        fallbacks=np.array(fallbacks, dtype=np.bool_)
+    )
@@ -0,0 +1,54 @@
+import numpy as np
+
+import posting_codecs
+from block_data_posting_list import BlockDataPostingList
+from posting_codec import PostingCodec
+from posting_list import PostingList
+from posting_representation import PostingRepresentation
+from posting_list_cursor import FrequenciesPostingListCursor
+
+
+class FrequenciesPostingList(BlockDataPostingList):
+    def __init__(self, coded_sequence=None, coding=128, length=None, skip_entries=None, coded_block_data=None,
+                 block_data_skip_entries=None, max_title_frequency=0, max_content_frequency=0,
+                 codec=PostingCodec.VARINT, representation=PostingRepresentation.SORTED_ARRAY):
+        super().__init__(
+            coded_sequence, coding, length, skip_entries, coded_block_data, block_data_skip_entries, codec,
+            representation
+        )
+        self.max_title_frequency = max_title_frequency
+        self.max_content_frequency = max_content_frequency
+
+    @staticmethod
+    def _encode_frequencies_blocks(titles_frequencies, contents_frequencies, coding, codec):
+        return [
+            posting_codecs.encode_gaps(np.concatenate((
+                titles_frequencies[block_start:block_end], contents_frequencies[block_start:block_end]
+            )), codec, coding)
+            for block_start, block_end in BlockDataPostingList._get_blocks_ranges(len(titles_frequencies))
+        ]
+
+    @staticmethod
+    def from_documents_frequencies(documents_ids, titles_frequencies, contents_frequencies, coding=128,
+                                   codec=PostingCodec.VARINT, representation=PostingRepresentation.SORTED_ARRAY):
+        titles_frequencies = np.asarray(titles_frequencies, dtype=np.int64)
+        contents_frequencies = np.asarray(contents_frequencies, dtype=np.int64)
+        posting_list = FrequenciesPostingList(
+            coding=coding,
+            codec=codec,
+            max_title_frequency=int(titles_frequencies.max(initial=0)),
+            max_content_frequency=int(contents_frequencies.max(initial=0))
+        )
+        posting_list._set_documents_and_block_data(
+            PostingList.from_values(documents_ids, coding, codec, representation),
+            FrequenciesPostingList._encode_frequencies_blocks(titles_frequencies, contents_frequencies, coding, codec)
+        )
+        return posting_list
+
+    def decode_frequencies_block(self, block_index):
+        block_gaps = self.decode_block_data_gaps(block_index)
+        documents_count = self._get_block_documents_count(block_index)
+        return list(zip(block_gaps[:documents_count].tolist(), block_gaps[documents_count:].tolist()))
+
+    def cursor(self):
+        return FrequenciesPostingListCursor(self)
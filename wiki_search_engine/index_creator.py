@@ -1,87 +1,369 @@
+import functools
 import itertools
+import multiprocessing
+import os
 from collections import defaultdict
 
+import attr
+import numpy as np
+
+import segments_manifest
 import utils
 import argparse
 
+from caching_index_storage import get_index_storage_class
+from forward_index import count_terms_frequencies, create_forward_index_entry, get_tokens_terms_identifiers
+from frequencies_posting_list import FrequenciesPostingList
+from index_segments import (
+    SegmentsPostingList, get_segments_excluded_ids, merge_segments_posting_lists, open_segments
+)
 from index_type import IndexType
-from posting_list import PostingList
+from merge_engine import iterate_cursor
+from positional_posting_list import PositionalPostingList
 from index_storage import IndexStorage
+from posting_codec import PostingCodec
+from posting_list import PostingList
+from storage_backend import StorageBackend
 
+RANGES_PER_WORKER = 4
+DOCUMENTS_RANGE_SIZE = 1000
+TERMS_CHUNK_SIZE = 1024
+MAX_DELTA_SEGMENTS = 8
+COMPACTED_SEGMENT_NAME = "compacted"
 
-def _create_traditional_index(wiki_articles, use_terms_clusters=False):
-    words_base_forms = utils.read_words_base_forms()
-    terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
-    terms_posting_lists = defaultdict(lambda: PostingList())
-    for wiki_article in sorted(wiki_articles, key=lambda x: x.id):
-        list_of_base_forms = utils.get_base_forms_from_article(words_base_forms, wiki_article)
-        article_base_forms = set(itertools.chain(*list_of_base_forms))
-        for base_form in article_base_forms:
-            terms_posting_lists[terms_identifiers[base_form]].append_if_not_equal_to_last_element(wiki_article.id)
-    return {"terms_posting_lists": terms_posting_lists}
+_worker_data = {}
 
 
-def _create_positional_index(wiki_articles, use_terms_clusters=False):
-    words_base_forms = utils.read_words_base_forms()
-    terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
-    terms_posting_lists = defaultdict(lambda: PostingList())
-    position_counter = 1
-    documents_positions = []
-    for wiki_article in sorted(wiki_articles, key=lambda x: x.id):
+def _append_if_not_equal_to_last_element(values, value):
+    if len(values) == 0 or values[-1] != value:
+        values.append(value)
+
+
+def _convert_terms_values_to_arrays(terms_values):
+    return {term: np.array(values, dtype=np.int64) for term, values in terms_values.items()}
+
+
+def _create_traditional_index_part(wiki_articles, words_base_forms, terms_identifiers):
+    terms_documents_frequencies = defaultdict(lambda: [])
+    for wiki_article in wiki_articles:
+        terms_frequencies = count_terms_frequencies(wiki_article, words_base_forms, terms_identifiers)
+        for term_identifier, (title_frequency, content_frequency) in terms_frequencies.items():
+            terms_documents_frequencies[term_identifier].append((wiki_article.id, title_frequency, content_frequency))
+    return _convert_terms_values_to_arrays(terms_documents_frequencies)
+
+
+def _create_positional_index_part(wiki_articles, words_base_forms, terms_identifiers):
+    terms_documents_positions = defaultdict(lambda: [])
+    for wiki_article in wiki_articles:
         list_of_base_forms = utils.get_base_forms_from_article(words_base_forms, wiki_article)
-        documents_positions.append(position_counter)
-        for base_forms in list_of_base_forms:
+        for position, base_forms in enumerate(list_of_base_forms, start=1):
             for term in base_forms:
-                terms_posting_lists[terms_identifiers[term]].append_if_not_equal_to_last_element(position_counter)
-            position_counter += 1
-        position_counter += 1
-    return {"terms_posting_lists": terms_posting_lists, "documents_positions": documents_positions}
+                _append_if_not_equal_to_last_element(
+                    terms_documents_positions[terms_identifiers[term]], (wiki_article.id, position)
+                )
+    return _convert_terms_values_to_arrays(terms_documents_positions)
 
 
-def _create_index(index_type, wiki_articles, use_terms_clusters):
+def _create_index_part(index_type, wiki_articles, words_base_forms, terms_identifiers):
     if index_type == IndexType.TRADITIONAL:
-        return _create_traditional_index(wiki_articles, use_terms_clusters)
+        return _create_traditional_index_part(wiki_articles, words_base_forms, terms_identifiers)
     elif index_type == IndexType.POSITIONAL:
-        return _create_positional_index(wiki_articles, use_terms_clusters)
+        return _create_positional_index_part(wiki_articles, words_base_forms, terms_identifiers)
     else:
         raise ValueError(f"Invalid index_type: {index_type}")
 
 
+def _initialize_worker(use_terms_clusters):
+    _worker_data["words_base_forms"] = utils.read_words_base_forms()
+    _worker_data["terms_identifiers"] = utils.get_terms_identifiers(use_terms_clusters)
+
+
+def _create_index_part_in_worker(index_type, wiki_articles):
+    return _create_index_part(
+        index_type, wiki_articles, _worker_data["words_base_forms"], _worker_data["terms_identifiers"]
+    )
+
+
+def _create_posting_list(index_type, values, posting_codec):
+    representation = PostingList.get_representation(np.unique(values[:, 0]))
+    if index_type == IndexType.TRADITIONAL:
+        return FrequenciesPostingList.from_documents_frequencies(
+            values[:, 0], values[:, 1], values[:, 2], codec=posting_codec, representation=representation
+        )
+    elif index_type == IndexType.POSITIONAL:
+        return PositionalPostingList.from_documents_positions(
+            values[:, 0], values[:, 1], codec=posting_codec, representation=representation
+        )
+    else:
+        raise ValueError(f"Invalid index_type: {index_type}")
+
+
+def _merge_index_parts(index_type, index_parts, posting_codec):
+    terms_values_parts = defaultdict(lambda: [])
+    for index_part in index_parts:
+        for term, values in index_part.items():
+            terms_values_parts[term].append(values)
+    return {
+        term: _create_posting_list(index_type, np.concatenate(values_parts), posting_codec)
+        for term, values_parts in terms_values_parts.items()
+    }
+
+
+def _iterate_documents_ranges(wiki_articles, range_size):
+    wiki_articles = iter(wiki_articles)
+    while True:
+        documents_range = list(itertools.islice(wiki_articles, range_size))
+        if len(documents_range) == 0:
+            break
+        yield documents_range
+
+
+def _create_index_parts_in_pool(index_type, wiki_articles, use_terms_clusters, workers):
+    documents_ranges = _iterate_documents_ranges(wiki_articles, DOCUMENTS_RANGE_SIZE)
+    create_index_part = functools.partial(_create_index_part_in_worker, index_type)
+    index_parts = []
+    with multiprocessing.Pool(workers, initializer=_initialize_worker, initargs=(use_terms_clusters,)) as pool:
+        while True:
+            documents_ranges_window = list(itertools.islice(documents_ranges, workers * RANGES_PER_WORKER))
+            if len(documents_ranges_window) == 0:
+                break
+            index_parts.extend(pool.map(create_index_part, documents_ranges_window))
+    return index_parts
+
+
+def _create_index(index_type, wiki_articles, use_terms_clusters, workers, posting_codec):
+    if workers == 1:
+        words_base_forms = utils.read_words_base_forms()
+        terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
+        index_parts = [_create_index_part(index_type, wiki_articles, words_base_forms, terms_identifiers)]
+    else:
+        index_parts = _create_index_parts_in_pool(index_type, wiki_articles, use_terms_clusters, workers)
+    return _merge_index_parts(index_type, index_parts, posting_codec)
+
+
 def _parse_input_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-index_type", type=IndexType, choices=list(IndexType.__dict__.values()))
     parser.add_argument("--use_terms_clusters", type=bool, default=False)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--storage_backend", type=StorageBackend, choices=list(StorageBackend), default=StorageBackend.SQLITE
+    )
+    parser.add_argument("--wiki_articles_path", type=str, default="data/wiki_slice.txt")
+    parser.add_argument("--incremental", type=bool, default=False)
+    parser.add_argument("--merge_segments", type=bool, default=False)
+    parser.add_argument("--compact", type=bool, default=False)
+    parser.add_argument(
+        "--posting_codec", type=PostingCodec, choices=list(PostingCodec), default=PostingCodec.VARINT
+    )
     return vars(parser.parse_args())
 
 
-def _save_index_data(index_data, index_storage, logger):
-    logger.info("Saving posting lists to index storage")
-    for term, posting_list in index_data["terms_posting_lists"].items():
-        index_storage.add_indexed_term(term, posting_list)
-    logger.info("Saving documents positions to index storage")
-    if "documents_positions" in index_data:
-        for document_position in index_data["documents_positions"]:
-            index_storage.add_document_position(document_position)
+def _create_forward_index_entries(wiki_articles, words_base_forms, terms_identifiers, terms_ids):
+    for wiki_article in wiki_articles:
+        yield wiki_article.id, create_forward_index_entry(wiki_article, words_base_forms, terms_identifiers, terms_ids)
+
 
+def _get_terms_ids_posting_lists(terms_posting_lists, terms_ids):
+    return sorted((terms_ids[term], posting_list) for term, posting_list in terms_posting_lists.items())
 
-def run_index_creator(index_type, use_terms_clusters):
+
+def _create_full_index(index_type, use_terms_clusters, workers, storage_backend, posting_codec, wiki_articles_path):
     logger = utils.get_default_logger()
     logger.info("Creating index storage...")
-    logger.info("Reading wiki articles...")
-    wiki_articles = utils.read_wiki_articles()
     logger.info("Creating index...")
-    index_data = _create_index(index_type, wiki_articles, use_terms_clusters)
-    with IndexStorage(index_type, use_terms_clusters, truncate_old=True) as index_storage:
+    terms_posting_lists = _create_index(
+        index_type, utils.iter_wiki_articles(wiki_articles_path), use_terms_clusters, workers, posting_codec
+    )
+    index_storage_class = get_index_storage_class(storage_backend, caching=False)
+    with index_storage_class(index_type, use_terms_clusters, truncate_old=True, bulk_load=True) as index_storage:
+        index_storage.set_posting_codec(posting_codec)
         logger.info("Saving wiki articles to index storage")
-        for wiki_article in wiki_articles:
-            index_storage.add_wiki_article(wiki_article)
-        _save_index_data(index_data, index_storage, logger)
-        logger.info("Saving words base forms to index storage")
+        index_storage.add_wiki_articles(utils.iter_wiki_articles(wiki_articles_path))
+        logger.info("Saving posting lists to index storage")
+        terms_ids = {term: term_id for term_id, term in enumerate(sorted(terms_posting_lists))}
+        index_storage.add_indexed_terms(_get_terms_ids_posting_lists(terms_posting_lists, terms_ids))
+        logger.info("Saving forward index to index storage")
         words_base_forms = utils.read_words_base_forms()
-        for word, base_forms in words_base_forms.items():
-            index_storage.add_word_base_forms(word, base_forms)
+        index_storage.add_forward_index_entries(_create_forward_index_entries(
+            utils.iter_wiki_articles(wiki_articles_path), words_base_forms,
+            utils.get_terms_identifiers(use_terms_clusters), terms_ids
+        ))
+        index_storage.add_terms_ids(terms_ids.items())
+        logger.info("Saving words base forms to index storage")
+        index_storage.add_words_base_forms(words_base_forms.items())
     logger.info("Index created successfully")
 
 
+def _read_segment_wiki_articles(index_storage, wiki_articles_path):
+    wiki_articles = list(utils.iter_wiki_articles(wiki_articles_path))
+    articles_ids = index_storage.get_wiki_articles_ids_by_titles(set(x.title for x in wiki_articles))
+    next_article_id = index_storage.get_max_wiki_article_id() + 1
+    segment_wiki_articles = {}
+    for wiki_article in wiki_articles:
+        if wiki_article.title not in articles_ids:
+            articles_ids[wiki_article.title] = next_article_id
+            next_article_id += 1
+        article_id = articles_ids[wiki_article.title]
+        segment_wiki_articles[article_id] = attr.evolve(wiki_article, id=article_id)
+    return [segment_wiki_articles[x] for x in sorted(segment_wiki_articles)]
+
+
+def _get_segment_terms_ids(index_storage, wiki_articles, words_base_forms, terms_identifiers):
+    segment_terms = set()
+    for wiki_article in wiki_articles:
+        tokens_terms_identifiers = get_tokens_terms_identifiers(wiki_article, words_base_forms, terms_identifiers)
+        for token_terms_identifiers, _ in tokens_terms_identifiers:
+            segment_terms.update(token_terms_identifiers)
+    known_terms_ids = index_storage.get_terms_ids(segment_terms)
+    first_new_term_id = index_storage.get_max_term_id() + 1
+    new_terms_ids = {
+        term: first_new_term_id + term_index
+        for term_index, term in enumerate(sorted(segment_terms - known_terms_ids.keys()))
+    }
+    return known_terms_ids, new_terms_ids
+
+
+def _get_index_storage_backend(index_type, use_terms_clusters, storage_backend=StorageBackend.SQLITE):
+    index_storage_backend = IndexStorage.read_storage_backend(
+        IndexStorage._get_database_name(index_type, use_terms_clusters)
+    )
+    return index_storage_backend if index_storage_backend is not None else storage_backend
+
+
+def _add_index_segment(index_type, use_terms_clusters, workers, wiki_articles_path):
+    logger = utils.get_default_logger()
+    words_base_forms = utils.read_words_base_forms()
+    terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
+    index_storage_class = get_index_storage_class(_get_index_storage_backend(index_type, use_terms_clusters))
+    with index_storage_class(index_type, use_terms_clusters, truncate_old=False, read_only=True) as index_storage:
+        database_name = index_storage.database_name
+        posting_codec = index_storage.posting_codec
+        segments_names = segments_manifest.read_segments_names(database_name)
+        wiki_articles = _read_segment_wiki_articles(index_storage, wiki_articles_path)
+        known_terms_ids, new_terms_ids = _get_segment_terms_ids(
+            index_storage, wiki_articles, words_base_forms, terms_identifiers
+        )
+    segment_name = segments_manifest.create_segment_name(segments_names)
+    logger.info(f"Creating index segment {segment_name} with {len(wiki_articles)} articles...")
+    terms_posting_lists = _create_index(index_type, wiki_articles, use_terms_clusters, workers, posting_codec)
+    terms_ids = {**known_terms_ids, **new_terms_ids}
+    with IndexStorage(
+        index_type, use_terms_clusters, truncate_old=True, bulk_load=True, segment_name=segment_name
+    ) as segment_storage:
+        segment_storage.set_posting_codec(posting_codec)
+        segment_storage.add_wiki_articles(wiki_articles)
+        segment_storage.add_indexed_terms(_get_terms_ids_posting_lists(terms_posting_lists, terms_ids))
+        segment_storage.add_forward_index_entries(_create_forward_index_entries(
+            wiki_articles, words_base_forms, terms_identifiers, terms_ids
+        ))
+        segment_storage.add_terms_ids(new_terms_ids.items())
+    segments_manifest.write_segments_names(database_name, segments_names + [segment_name])
+    logger.info(f"Index segment {segment_name} added successfully")
+    if len(segments_names) + 1 > MAX_DELTA_SEGMENTS:
+        _merge_delta_segments(index_type, use_terms_clusters)
+
+
+def _create_merged_posting_list(index_type, posting_list, posting_codec):
+    if not isinstance(posting_list, SegmentsPostingList):
+        return posting_list
+    cursor = posting_list.cursor()
+    values = []
+    for document_id in iterate_cursor(cursor):
+        if index_type == IndexType.POSITIONAL:
+            values.extend((document_id, position) for position in cursor.positions())
+        else:
+            values.append((document_id, ) + tuple(cursor.frequencies()))
+    if len(values) == 0:
+        return None
+    return _create_posting_list(index_type, np.array(values, dtype=np.int64), posting_codec)
+
+
+def _merge_segments(index_type, segments, segments_documents_ids, output_storage):
+    segments_excluded_ids = get_segments_excluded_ids(segments_documents_ids)
+    for segment, documents_ids, excluded_ids in zip(segments, segments_documents_ids, segments_excluded_ids):
+        live_documents_ids = [x for x in documents_ids if x not in excluded_ids]
+        for range_start in range(0, len(live_documents_ids), DOCUMENTS_RANGE_SIZE):
+            range_documents_ids = live_documents_ids[range_start:range_start + DOCUMENTS_RANGE_SIZE]
+            output_storage.add_wiki_articles(segment.get_wiki_articles(range_documents_ids).values())
+            output_storage.add_forward_index_entries(segment.get_forward_index_entries(range_documents_ids).items())
+    terms_ids = {}
+    for segment in segments:
+        terms_ids.update(segment.get_all_terms_ids())
+    output_storage.add_terms_ids(terms_ids.items())
+    indexed_terms_ids = sorted(set(itertools.chain.from_iterable(x.get_indexed_terms_ids() for x in segments)))
+    for chunk_start in range(0, len(indexed_terms_ids), TERMS_CHUNK_SIZE):
+        chunk_terms_ids = indexed_terms_ids[chunk_start:chunk_start + TERMS_CHUNK_SIZE]
+        terms_posting_lists = merge_segments_posting_lists(
+            [segment.get_terms_postings_lists(chunk_terms_ids) for segment in segments], segments_excluded_ids,
+            chunk_terms_ids
+        )
+        merged_terms_posting_lists = [
+            (term_id, _create_merged_posting_list(index_type, posting_list, output_storage.posting_codec))
+            for term_id, posting_list in terms_posting_lists.items()
+        ]
+        output_storage.add_indexed_terms([(term_id, x) for term_id, x in merged_terms_posting_lists if x is not None])
+
+
+def _merge_delta_segments(index_type, use_terms_clusters):
+    logger = utils.get_default_logger()
+    database_name = IndexStorage._get_database_name(index_type, use_terms_clusters)
+    segments_names = segments_manifest.read_segments_names(database_name)
+    if len(segments_names) <= 1:
+        logger.info("Nothing to merge")
+        return
+    merged_segment_name = segments_manifest.create_segment_name(segments_names)
+    logger.info(f"Merging {len(segments_names)} index segments into {merged_segment_name}...")
+    segments = open_segments(index_type, use_terms_clusters, segments_names, read_only=True)
+    segments_documents_ids = [segment.get_wiki_articles_ids() for segment in segments]
+    with IndexStorage(
+        index_type, use_terms_clusters, truncate_old=True, bulk_load=True, segment_name=merged_segment_name
+    ) as merged_storage:
+        merged_storage.set_posting_codec(segments[0].posting_codec)
+        _merge_segments(index_type, segments, segments_documents_ids, merged_storage)
+    for segment in segments:
+        segment.close()
+    segments_manifest.write_segments_names(database_name, [merged_segment_name])
+    segments_manifest.remove_segments(database_name, segments_names)
+    logger.info("Index segments merged successfully")
+
+
+def _compact_index(index_type, use_terms_clusters, storage_backend):
+    logger = utils.get_default_logger()
+    index_storage_class = get_index_storage_class(
+        _get_index_storage_backend(index_type, use_terms_clusters, storage_backend), caching=False
+    )
+    base_storage = index_storage_class(index_type, use_terms_clusters, truncate_old=False, read_only=True)
+    segments_names = segments_manifest.read_segments_names(base_storage.database_name)
+    logger.info(f"Compacting index with {len(segments_names)} index segments...")
+    segments = [base_storage] + open_segments(index_type, use_terms_clusters, segments_names, read_only=True)
+    segments_documents_ids = [segment.get_wiki_articles_ids() for segment in segments]
+    with index_storage_class(
+        index_type, use_terms_clusters, truncate_old=True, bulk_load=True, segment_name=COMPACTED_SEGMENT_NAME
+    ) as compacted_storage:
+        compacted_storage.set_posting_codec(base_storage.posting_codec)
+        _merge_segments(index_type, segments, segments_documents_ids, compacted_storage)
+        compacted_storage.add_words_base_forms(utils.read_words_base_forms().items())
+    for segment in segments:
+        segment.close()
+    for compacted_file, storage_file in zip(compacted_storage.get_storage_files(), base_storage.get_storage_files()):
+        os.replace(compacted_file, storage_file)
+    segments_manifest.remove_all_segments(base_storage.database_name)
+    logger.info("Index compacted successfully")
+
+
+def run_index_creator(index_type, use_terms_clusters, workers=1, storage_backend=StorageBackend.SQLITE,
+                      wiki_articles_path="data/wiki_slice.txt", incremental=False, merge_segments=False,
+                      compact=False, posting_codec=PostingCodec.VARINT):
+    if compact:
+        _compact_index(index_type, use_terms_clusters, storage_backend)
+    elif merge_segments:
+        _merge_delta_segments(index_type, use_terms_clusters)
+    elif incremental:
+        _add_index_segment(index_type, use_terms_clusters, workers, wiki_articles_path)
+    else:
+        _create_full_index(index_type, use_terms_clusters, workers, storage_backend, posting_codec, wiki_articles_path)
+
+
 if __name__ == '__main__':
     run_index_creator(**_parse_input_arguments())
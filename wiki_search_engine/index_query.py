@@ -1,18 +1,28 @@
 import argparse
-import functools
 import itertools
-import math
 import re
+import time
 
-import termcolor
+import numpy as np
 from collections import defaultdict
 
+import query_profiler
 import utils
-from caching_index_storage import CachingIndexStorage
+from caching_index_storage import CachingIndexStorage, get_index_storage_class, open_caching_index_storages
+from code_profiler import CodeProfiler
 from index_type import IndexType
+from merge_engine import (
+    PhraseCursor, PositionsUnionCursor, UnionCursor, create_documents_intersection_cursor,
+    create_documents_union_cursor, iterate_cursor
+)
 from posting_list import PostingList
-from query import Query, QueryPart, QueryType
+from query import Query, QueryPart, QueryType, SearchResults
+from query_planner import QueryPartPlan, create_planned_cursor
+from query_result_cache import QueryResultCache
 from search_result_rater import SearchResultRater
+from startup_snapshot import get_startup_snapshot_path, load_startup_snapshot
+from storage_backend import StorageBackend
+from top_k_ranker import rank_top_k
 
 
 def _get_query_words_base_forms(index_storage, query):
@@ -31,92 +41,85 @@ def get_words_terms_identifiers(words_base_forms, terms_identifiers):
     }
 
 
-def _get_traditional_index_documents_ids(index_storage, query_words_base_forms, terms_identifiers):
-    query_terms_identifiers = get_words_terms_identifiers(dict(query_words_base_forms), terms_identifiers)
-    query_identifiers = set(itertools.chain(*query_terms_identifiers.values()))
-    terms_identifiers_posting_lists = defaultdict(
-        lambda: PostingList(), index_storage.get_terms_postings_lists(tuple(query_identifiers))
-    )
-    words_ordered_lists = set()
-    for word, identifiers in query_terms_identifiers.items():
-        word_ordered_lists = [terms_identifiers_posting_lists[x].decode_to_ordered_list() for x in identifiers]
-        if len(word_ordered_lists) == 0:
-            continue
-        word_merged_ordered_list = functools.reduce(lambda x, y: x | y, word_ordered_lists)
-        words_ordered_lists.add(word_merged_ordered_list)
-    if len(words_ordered_lists) == 0:
-        return ()
-    return set(functools.reduce(lambda x, y: x & y, words_ordered_lists).items)
-
-
-def _get_document_id_from_positions(documents_ids, term_position):
-    start_index = 0
-    end_index = len(documents_ids)
-    while start_index < end_index:
-        middle_index = math.ceil((start_index + end_index) / 2)
-        if documents_ids[middle_index] > term_position:
-            end_index = middle_index - 1
-        elif documents_ids[middle_index] < term_position:
-            start_index = middle_index
-        else:
-            return middle_index
-    return start_index
+def _get_word_cursor(word_posting_lists, union_cursor_class=UnionCursor):
+    if union_cursor_class == UnionCursor:
+        return create_documents_union_cursor(word_posting_lists)
+    if len(word_posting_lists) == 1:
+        return word_posting_lists[0].cursor()
+    return union_cursor_class([posting_list.cursor() for posting_list in word_posting_lists])
+
 
+def _get_terms_identifiers_posting_lists(index_storage, query_identifiers):
+    query_identifiers_ids = index_storage.get_terms_ids(query_identifiers)
+    terms_ids_posting_lists = index_storage.get_terms_postings_lists(tuple(query_identifiers_ids.values()))
+    return defaultdict(lambda: PostingList(), {
+        identifier: terms_ids_posting_lists[term_id] for identifier, term_id in query_identifiers_ids.items()
+        if term_id in terms_ids_posting_lists
+    })
 
-def _get_positional_index_documents_ids(index_storage, query_words_base_forms, terms_identifiers):
+
+def _get_words_cursors(index_storage, query_terms_identifiers, union_cursor_class=UnionCursor):
+    query_identifiers = tuple(set(itertools.chain(*query_terms_identifiers.values())))
+    terms_identifiers_posting_lists = _get_terms_identifiers_posting_lists(index_storage, query_identifiers)
+    return [
+        _get_word_cursor([terms_identifiers_posting_lists[x] for x in set(identifiers)], union_cursor_class)
+        for identifiers in query_terms_identifiers.values() if len(identifiers) > 0
+    ]
+
+
+def _get_query_words_cursors(index_storage, query_words_base_forms, terms_identifiers, union_cursor_class=UnionCursor):
     query_terms_identifiers = get_words_terms_identifiers(dict(query_words_base_forms), terms_identifiers)
-    query_identifiers = set(itertools.chain(*query_terms_identifiers.values()))
-    terms_identifiers_posting_lists = defaultdict(
-        lambda: PostingList(), index_storage.get_terms_postings_lists(tuple(query_identifiers))
+    return _get_words_cursors(index_storage, query_terms_identifiers, union_cursor_class)
+
+
+def _get_traditional_index_documents_cursor(index_storage, query_words_base_forms, terms_identifiers):
+    words_cursors = _get_query_words_cursors(index_storage, query_words_base_forms, terms_identifiers)
+    return create_documents_intersection_cursor(words_cursors)
+
+
+def _get_positional_index_documents_cursor(index_storage, query_words_base_forms, terms_identifiers):
+    words_cursors = _get_query_words_cursors(
+        index_storage, query_words_base_forms, terms_identifiers, PositionsUnionCursor
     )
-    documents_ids = index_storage.get_document_positions()
-    word_position = 0
-    list_of_matched_positions = []
-    for word, identifiers in query_terms_identifiers.items():
-        list_of_word_positions = [terms_identifiers_posting_lists[x].decode_to_ordered_list() for x in identifiers]
-        shifted_word_positions = {position - word_position for position in itertools.chain(*list_of_word_positions)}
-        list_of_matched_positions.append(shifted_word_positions)
-        word_position += 1
-    matched_positions = functools.reduce(lambda x, y: x & y, list_of_matched_positions)
-    return set([_get_document_id_from_positions(documents_ids, x) + 1 for x in matched_positions])
-
-
-def _get_mixed_index_documents_ids(traditional_index_storage, positional_index_storage, query_parts,
-                                   query_words_base_forms, terms_identifiers):
-    if len(query_parts) == 0:
-        return
-    list_of_documents_ids = []
+    return PhraseCursor(words_cursors)
+
+
+def _get_query_part_words_base_forms(query_part, query_words_base_forms):
+    query_words = set(query_part.raw_query.split(" "))
+    return [words_base_forms for words_base_forms in query_words_base_forms if words_base_forms[0] in query_words]
+
+
+def _get_mixed_index_documents_cursor(traditional_index_storage, positional_index_storage, query_parts,
+                                      query_words_base_forms, terms_identifiers):
+    parts_plans = []
     for query_part in query_parts:
-        query_words = set(query_part.raw_query.split(" "))
-        words_base_forms_part = [
-            words_base_forms for words_base_forms in query_words_base_forms
-            if words_base_forms[0] in query_words
-        ]
+        words_base_forms_part = _get_query_part_words_base_forms(query_part, query_words_base_forms)
         if query_part.query_type == QueryType.NORMAL:
-            list_of_documents_ids.append(_get_traditional_index_documents_ids(
+            words_cursors = _get_query_words_cursors(
                 traditional_index_storage, words_base_forms_part, terms_identifiers
-            ))
+            )
         elif query_part.query_type == QueryType.PHRASE:
-            list_of_documents_ids.append(_get_positional_index_documents_ids(
-                positional_index_storage, words_base_forms_part, terms_identifiers
-            ))
+            words_cursors = _get_query_words_cursors(
+                positional_index_storage, words_base_forms_part, terms_identifiers, PositionsUnionCursor
+            )
         else:
             raise ValueError(f"Invalid query_type: {query_part.query_type}")
-    return functools.reduce(lambda x, y: x & y, list_of_documents_ids)
+        parts_plans.append(QueryPartPlan(query_part.query_type, words_cursors))
+    return create_planned_cursor(parts_plans)
 
 
-def _get_matching_documents_ids(query, index_type, traditional_index_storage, positional_index_storage,
-                                query_words_base_forms, terms_identifiers):
+def _get_matching_documents_cursor(query, index_type, traditional_index_storage, positional_index_storage,
+                                   query_words_base_forms, terms_identifiers):
     if index_type == IndexType.TRADITIONAL:
-        return _get_traditional_index_documents_ids(
+        return _get_traditional_index_documents_cursor(
             traditional_index_storage, query_words_base_forms, terms_identifiers
         )
     elif index_type == IndexType.POSITIONAL:
-        return _get_positional_index_documents_ids(
+        return _get_positional_index_documents_cursor(
             positional_index_storage, query_words_base_forms, terms_identifiers
         )
     elif index_type == IndexType.MIXED:
-        return _get_mixed_index_documents_ids(
+        return _get_mixed_index_documents_cursor(
             traditional_index_storage, positional_index_storage, query.query_parts, query_words_base_forms,
             terms_identifiers
         )
@@ -124,22 +127,19 @@ def _get_matching_documents_ids(query, index_type, traditional_index_storage, po
         raise ValueError(f"Invalid index_type: {index_type}")
 
 
-def _show_search_results(wiki_articles, index_storage, terms_identifiers, query_terms_identifiers, max_results):
-    matching_identifiers = set(itertools.chain(*query_terms_identifiers.values()))
-    for wiki_article in wiki_articles[:max_results]:
+def _show_search_results(wiki_articles, index_storage, query_terms_ids):
+    import termcolor
+    forward_index_entries = index_storage.get_forward_index_entries([x.id for x in wiki_articles])
+    for wiki_article in wiki_articles:
         print(termcolor.colored(wiki_article.title, color="green"))
         content_words = list(map(lambda x: x.lower(), wiki_article.content.split(" ")))
-        content_words_base_forms = index_storage.get_words_base_forms(content_words)
+        forward_index_entry = forward_index_entries[wiki_article.id]
+        matching_tokens = forward_index_entry.get_matching_tokens(query_terms_ids)
         displayed_words_indexes = set()
         colored_words_indexes = set()
-        for i in range(len(content_words)):
-            word_base_forms = content_words_base_forms[content_words[i]]
-            if len(word_base_forms) == 0:
-                word_base_forms.append(content_words[i])
-            word_identifiers = {terms_identifiers[base_form] for base_form in word_base_forms}
-            if any([word_identifier in matching_identifiers for word_identifier in word_identifiers]):
-                colored_words_indexes.add(i)
-                displayed_words_indexes.update(range(i - 5, i + 6))
+        for i in np.flatnonzero(matching_tokens[forward_index_entry.title_tokens_count:]).tolist():
+            colored_words_indexes.add(i)
+            displayed_words_indexes.update(range(i - 5, i + 6))
         for i in range(len(content_words)):
             if i in colored_words_indexes:
                 print(termcolor.colored(content_words[i], color="blue"), end=" ")
@@ -154,11 +154,24 @@ def _parse_input_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("-index_type", type=IndexType, choices=list(IndexType.__dict__.values()))
     parser.add_argument("--use_terms_clusters", type=bool, default=False)
+    parser.add_argument(
+        "--storage_backend", type=StorageBackend, choices=list(StorageBackend), default=StorageBackend.SQLITE
+    )
+    parser.add_argument("--max_results", type=int, default=10)
+    parser.add_argument("--cache_size_mb", type=int, default=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20)
+    parser.add_argument(
+        "--result_cache_size_mb", type=int, default=QueryResultCache.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20
+    )
+    parser.add_argument("--result_cache_path", type=str, default=None)
+    parser.add_argument("--profile", type=bool, default=False)
+    parser.add_argument("--code_profiler", type=CodeProfiler, choices=list(CodeProfiler), default=CodeProfiler.NONE)
+    parser.add_argument("--code_profile_path", type=str, default="data/query_profile.out")
+    parser.add_argument("--startup_snapshot", type=bool, default=False)
     return vars(parser.parse_args())
 
 
-def _get_query(index_type):
-    raw_query = input().lower()
+def parse_query(raw_query, index_type):
+    raw_query = raw_query.lower()
     if index_type != IndexType.MIXED:
         return Query(raw_query, query_parts=[])
     parsed_query = raw_query
@@ -175,26 +188,146 @@ def _get_query(index_type):
     return Query(cleaned_query, query_parts)
 
 
-def run_index_query(index_type, use_terms_clusters):
-    traditional_index_storage = CachingIndexStorage(IndexType.TRADITIONAL, use_terms_clusters, truncate_old=False)
-    positional_index_storage = CachingIndexStorage(IndexType.POSITIONAL, use_terms_clusters, truncate_old=False)
-    terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
-    while True:
-        print("Type query:")
-        query = _get_query(index_type)
-        query_words_base_forms = _get_query_words_base_forms(traditional_index_storage, query.raw_query)
-        query_terms_identifiers = get_words_terms_identifiers(dict(query_words_base_forms), terms_identifiers)
-        query_identifiers = set(itertools.chain(*query_terms_identifiers.values()))
-        document_ids = _get_matching_documents_ids(
+def _get_word_result_key(identifiers, identifiers_ids):
+    return (
+        tuple(sorted(set(identifiers_ids[x] for x in identifiers if x in identifiers_ids))),
+        tuple(sorted(set(x for x in identifiers if x not in identifiers_ids)))
+    )
+
+
+def _get_words_result_key(query_words_base_forms, terms_identifiers, identifiers_ids, query_type):
+    query_terms_identifiers = get_words_terms_identifiers(dict(query_words_base_forms), terms_identifiers)
+    words_keys = [
+        _get_word_result_key(identifiers, identifiers_ids)
+        for identifiers in query_terms_identifiers.values() if len(identifiers) > 0
+    ]
+    return tuple(words_keys) if query_type == QueryType.PHRASE else tuple(sorted(set(words_keys)))
+
+
+def _get_query_result_key(query, index_type, use_terms_clusters, query_words_base_forms, terms_identifiers,
+                          identifiers_ids, max_results):
+    if index_type == IndexType.MIXED:
+        query_parts = [
+            (query_part.query_type, _get_query_part_words_base_forms(query_part, query_words_base_forms))
+            for query_part in query.query_parts
+        ]
+    else:
+        query_parts = [
+            (QueryType.PHRASE if index_type == IndexType.POSITIONAL else QueryType.NORMAL, query_words_base_forms)
+        ]
+    return (index_type.value, use_terms_clusters, max_results) + tuple(
+        (query_type.value, _get_words_result_key(words_base_forms_part, terms_identifiers, identifiers_ids, query_type))
+        for query_type, words_base_forms_part in query_parts
+    )
+
+
+def _rank_documents(query, index_type, traditional_index_storage, positional_index_storage, query_words_base_forms,
+                    terms_identifiers, query_terms_ids, max_results):
+    with query_profiler.profile_stage("matching"):
+        documents_cursor = _get_matching_documents_cursor(
             query, index_type, traditional_index_storage, positional_index_storage, query_words_base_forms,
             terms_identifiers
         )
-        wiki_articles = list(traditional_index_storage.get_wiki_articles(document_ids).values())
-        search_result_rater = SearchResultRater(traditional_index_storage, terms_identifiers, query_identifiers)
-        ranked_wiki_articles = list(sorted(wiki_articles, key=search_result_rater.rate_wiki_article, reverse=True))
-        _show_search_results(
-            ranked_wiki_articles, traditional_index_storage, terms_identifiers, query_terms_identifiers, max_results=10
+        query_terms_posting_lists = [
+            posting_list
+            for posting_list in traditional_index_storage.get_terms_postings_lists(query_terms_ids).values()
+            if len(posting_list) > 0
+        ]
+    search_result_rater = SearchResultRater(traditional_index_storage, query_terms_ids)
+    with query_profiler.profile_stage("top_k"):
+        return rank_top_k(
+            iterate_cursor(documents_cursor), search_result_rater, query_terms_posting_lists, max_results
+        )
+
+
+def search(query, index_type, traditional_index_storage, positional_index_storage, terms_identifiers, max_results,
+           result_cache=None):
+    with query_profiler.profile_stage("base_forms"):
+        query_words_base_forms = _get_query_words_base_forms(traditional_index_storage, query.raw_query)
+        query_terms_identifiers = get_words_terms_identifiers(dict(query_words_base_forms), terms_identifiers)
+    with query_profiler.profile_stage("terms_ids"):
+        query_identifiers = tuple(set(itertools.chain(*query_terms_identifiers.values())))
+        identifiers_ids = traditional_index_storage.get_terms_ids(query_identifiers)
+        query_terms_ids = list(identifiers_ids.values())
+    ranked_documents = None
+    if result_cache is not None:
+        with query_profiler.profile_stage("result_cache"):
+            index_version = f"{traditional_index_storage.index_version}:{positional_index_storage.index_version}"
+            query_result_key = _get_query_result_key(
+                query, index_type, traditional_index_storage.use_terms_clusters, query_words_base_forms,
+                terms_identifiers, identifiers_ids, max_results
+            )
+            ranked_documents = result_cache.get(index_version, query_result_key)
+        result_cache_hit = ranked_documents is not None
+        query_profiler.add_cache_lookups("query_results", int(result_cache_hit), int(not result_cache_hit))
+    if ranked_documents is None:
+        ranked_documents = _rank_documents(
+            query, index_type, traditional_index_storage, positional_index_storage, query_words_base_forms,
+            terms_identifiers, query_terms_ids, max_results
         )
+        if result_cache is not None:
+            with query_profiler.profile_stage("result_cache"):
+                result_cache.put(index_version, query_result_key, ranked_documents)
+    with query_profiler.profile_stage("articles"):
+        wiki_articles = traditional_index_storage.get_wiki_articles([x for x, _ in ranked_documents])
+    return SearchResults(
+        wiki_articles=[wiki_articles[x] for x, _ in ranked_documents],
+        ratings=[rating for _, rating in ranked_documents],
+        query_terms_ids=query_terms_ids
+    )
+
+
+def run_index_query(index_type, use_terms_clusters, storage_backend=StorageBackend.SQLITE, max_results=10,
+                    cache_size_mb=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20,
+                    result_cache_size_mb=QueryResultCache.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20, result_cache_path=None,
+                    profile=False, code_profiler=CodeProfiler.NONE, code_profile_path="data/query_profile.out",
+                    startup_snapshot=False):
+    startup_start_time = time.perf_counter()
+    logger = utils.get_default_logger()
+    index_storage_class = get_index_storage_class(storage_backend)
+    traditional_index_storage, positional_index_storage = open_caching_index_storages(
+        index_storage_class, use_terms_clusters, cache_size_mb * 2 ** 20
+    )
+    if startup_snapshot:
+        terms_identifiers = load_startup_snapshot(
+            [traditional_index_storage, positional_index_storage], use_terms_clusters,
+            get_startup_snapshot_path(use_terms_clusters, storage_backend)
+        ).get_terms_identifiers(use_terms_clusters)
+    else:
+        terms_identifiers = utils.get_terms_identifiers(use_terms_clusters)
+    result_cache = QueryResultCache(result_cache_size_mb * 2 ** 20, result_cache_path)
+    profile_summary = query_profiler.ProfileSummary()
+    startup_seconds = time.perf_counter() - startup_start_time
+    logger.info(f"Ready for queries after {startup_seconds * 1000:.1f} ms")
+    first_query_seconds = None
+    with query_profiler.code_profiling(code_profiler, code_profile_path):
+        try:
+            while True:
+                print("Type query:")
+                query = parse_query(input(), index_type)
+                query_start_time = time.perf_counter()
+                with query_profiler.profile_query(profile) as profiler:
+                    search_results = search(
+                        query, index_type, traditional_index_storage, positional_index_storage, terms_identifiers,
+                        max_results, result_cache
+                    )
+                    with query_profiler.profile_stage("show_results"):
+                        _show_search_results(
+                            search_results.wiki_articles, traditional_index_storage, search_results.query_terms_ids
+                        )
+                if first_query_seconds is None:
+                    first_query_seconds = time.perf_counter() - query_start_time
+                    logger.info(
+                        f"Time to first query: {(startup_seconds + first_query_seconds) * 1000:.1f} ms "
+                        f"(startup {startup_seconds * 1000:.1f} ms, first query {first_query_seconds * 1000:.1f} ms)"
+                    )
+                if profiler is not None:
+                    profile_report = profiler.get_report()
+                    query_profiler.log_query_report(logger, query.raw_query, profile_report)
+                    profile_summary.add_report(profile_report)
+        finally:
+            if profile:
+                query_profiler.log_profile_summary(logger, profile_summary.get_summary())
 
 
 if __name__ == "__main__":
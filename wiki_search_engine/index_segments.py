@@ -0,0 +1,165 @@
+import segments_manifest
+from index_storage import IndexStorage
+from merge_engine import ExcludingCursor, SegmentsUnionCursor
+
+
+class SegmentsPostingList(object):
+    def __init__(self, segments_posting_lists, segments_excluded_ids):
+        self.segments_posting_lists = segments_posting_lists
+        self.segments_excluded_ids = segments_excluded_ids
+
+    def __len__(self):
+        return sum(len(posting_list) for posting_list in self.segments_posting_lists)
+
+    @property
+    def max_title_frequency(self):
+        return max(posting_list.max_title_frequency for posting_list in self.segments_posting_lists)
+
+    @property
+    def max_content_frequency(self):
+        return max(posting_list.max_content_frequency for posting_list in self.segments_posting_lists)
+
+    def documents_cursor(self):
+        return self.cursor()
+
+    def cursor(self):
+        return SegmentsUnionCursor([
+            ExcludingCursor(posting_list.cursor(), excluded_ids) if len(excluded_ids) > 0 else posting_list.cursor()
+            for posting_list, excluded_ids in zip(self.segments_posting_lists, self.segments_excluded_ids)
+        ])
+
+
+def open_segments(index_type, use_terms_clusters, segments_names, read_only):
+    return [
+        IndexStorage(index_type, use_terms_clusters, truncate_old=False, read_only=read_only, segment_name=x)
+        for x in segments_names
+    ]
+
+
+def get_segments_excluded_ids(segments_documents_ids):
+    segments_excluded_ids = []
+    newer_segments_documents_ids = set()
+    for segment_documents_ids in reversed(segments_documents_ids):
+        segments_excluded_ids.append(frozenset(newer_segments_documents_ids))
+        newer_segments_documents_ids.update(segment_documents_ids)
+    return segments_excluded_ids[::-1]
+
+
+def merge_segments_posting_lists(segments_terms_posting_lists, segments_excluded_ids, terms_ids):
+    terms_posting_lists = {}
+    for term_id in terms_ids:
+        term_segments = [
+            (terms_posting_lists_part[term_id], excluded_ids)
+            for terms_posting_lists_part, excluded_ids in zip(segments_terms_posting_lists, segments_excluded_ids)
+            if term_id in terms_posting_lists_part
+        ]
+        if len(term_segments) == 0:
+            continue
+        if len(term_segments) == 1 and len(term_segments[0][1]) == 0:
+            terms_posting_lists[term_id] = term_segments[0][0]
+            continue
+        terms_posting_lists[term_id] = SegmentsPostingList(
+            [posting_list for posting_list, _ in term_segments], [excluded_ids for _, excluded_ids in term_segments]
+        )
+    return terms_posting_lists
+
+
+class SegmentedIndexStorage(IndexStorage):
+    def __init__(self, index_type, use_terms_clusters, truncate_old, bulk_load=False, read_only=False,
+                 segment_name=None):
+        super().__init__(index_type, use_terms_clusters, truncate_old, bulk_load, read_only, segment_name)
+        self.segments = open_segments(
+            index_type, use_terms_clusters, segments_manifest.read_segments_names(self.database_name), read_only
+        )
+        self._startup_snapshot = None
+        self._segments_documents_ids = None
+        self._segments_excluded_ids = None
+        self.index_version = IndexStorage._get_files_version(
+            self.get_storage_files() + [segments_manifest.get_segments_manifest_path(self.database_name)] +
+            [path for segment in self.segments for path in segment.get_storage_files()]
+        )
+
+    def use_startup_snapshot(self, startup_snapshot):
+        self._startup_snapshot = startup_snapshot
+        self._segments_documents_ids = None
+        self._segments_excluded_ids = None
+
+    def _load_segments_documents_ids(self):
+        if self._startup_snapshot is not None:
+            return [set(x) for x in self._startup_snapshot.get_segments_documents_ids(self.index_type)]
+        return [set(segment.get_wiki_articles_ids()) for segment in self.segments]
+
+    @property
+    def segments_documents_ids(self):
+        if self._segments_documents_ids is None:
+            self._segments_documents_ids = self._load_segments_documents_ids()
+        return self._segments_documents_ids
+
+    @property
+    def segments_excluded_ids(self):
+        if self._segments_excluded_ids is None:
+            self._segments_excluded_ids = get_segments_excluded_ids([set()] + self.segments_documents_ids)
+        return self._segments_excluded_ids
+
+    def _get_document_segment_index(self, document_id):
+        for segment_index in range(len(self.segments), 0, -1):
+            if document_id in self.segments_documents_ids[segment_index - 1]:
+                return segment_index
+        return 0
+
+    def _get_segments_documents_items(self, ids, get_base_items, get_segment_items):
+        if len(self.segments) == 0:
+            return get_base_items(ids)
+        segments_ids = [[] for _ in range(len(self.segments) + 1)]
+        for document_id in ids:
+            segments_ids[self._get_document_segment_index(document_id)].append(document_id)
+        base_ids, *deltas_ids = segments_ids
+        documents_items = get_base_items(base_ids)
+        for segment, segment_ids in zip(self.segments, deltas_ids):
+            documents_items.update(get_segment_items(segment, segment_ids))
+        return documents_items
+
+    def get_terms_postings_lists(self, terms_ids):
+        terms_ids = list(terms_ids)
+        base_terms_posting_lists = super().get_terms_postings_lists(terms_ids)
+        if len(self.segments) == 0:
+            return base_terms_posting_lists
+        segments_terms_posting_lists = [base_terms_posting_lists] + [
+            segment.get_terms_postings_lists(terms_ids) for segment in self.segments
+        ]
+        return merge_segments_posting_lists(segments_terms_posting_lists, self.segments_excluded_ids, terms_ids)
+
+    def get_wiki_articles(self, ids):
+        return self._get_segments_documents_items(ids, super().get_wiki_articles, IndexStorage.get_wiki_articles)
+
+    def get_forward_index_entries(self, ids):
+        return self._get_segments_documents_items(
+            ids, super().get_forward_index_entries, IndexStorage.get_forward_index_entries
+        )
+
+    def get_terms_ids(self, terms):
+        if self._startup_snapshot is not None:
+            return self._startup_snapshot.get_terms_ids(self.index_type, terms)
+        terms = list(terms)
+        terms_ids = super().get_terms_ids(terms)
+        for segment in self.segments:
+            terms_ids.update(segment.get_terms_ids([term for term in terms if term not in terms_ids]))
+        return terms_ids
+
+    def get_wiki_articles_ids_by_titles(self, titles):
+        titles = list(titles)
+        articles_ids = super().get_wiki_articles_ids_by_titles(titles)
+        for segment in self.segments:
+            articles_ids.update(segment.get_wiki_articles_ids_by_titles(titles))
+        return articles_ids
+
+    def get_max_wiki_article_id(self):
+        return max([super().get_max_wiki_article_id()] + [x.get_max_wiki_article_id() for x in self.segments])
+
+    def get_max_term_id(self):
+        return max([super().get_max_term_id()] + [segment.get_max_term_id() for segment in self.segments])
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        super().close()
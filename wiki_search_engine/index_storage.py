@@ -1,30 +1,122 @@
 import sqlite3
 import os
+import hashlib
 import json
+import threading
+import urllib.parse
 
+import segments_manifest
+from block_data_posting_list import BlockDataPostingList
+from forward_index import ForwardIndexEntry
+from frequencies_posting_list import FrequenciesPostingList
 from index_type import IndexType
+from positional_posting_list import PositionalPostingList
+from posting_codec import PostingCodec
 from posting_list import PostingList
+from posting_representation import PostingRepresentation
+from storage_backend import StorageBackend
 from wiki_article import WikiArticle
 
 
 class IndexStorage(object):
     TRADITIONAL_INDEX_DATABASE_NAME = 'traditional_index'
     POSITIONAL_INDEX_DATABASE_NAME = 'positional_index'
+    QUERY_CHUNK_SIZE = 512
+    POSTING_CODEC_METADATA_KEY = "posting_codec"
+    STORAGE_BACKEND_METADATA_KEY = "storage_backend"
+    STORAGE_BACKEND = StorageBackend.SQLITE
+    POSTINGS_FILE_SUFFIX = ".postings"
+    TERMS_ENTRIES_FILE_SUFFIX = ".terms.npy"
+    CACHED_STATEMENTS = 256
+    BULK_LOAD_PRAGMAS = (
+        "PRAGMA page_size = 16384",
+        "PRAGMA journal_mode = OFF",
+        "PRAGMA synchronous = OFF",
+        "PRAGMA cache_size = -262144",
+        "PRAGMA temp_store = MEMORY",
+    )
 
-    def __init__(self, index_type, use_terms_clusters, truncate_old):
-        self.database_name = IndexStorage._get_database_name(index_type, use_terms_clusters)
+    def __init__(self, index_type, use_terms_clusters, truncate_old, bulk_load=False, read_only=False,
+                 segment_name=None):
+        self.index_type = index_type
+        self.use_terms_clusters = use_terms_clusters
+        self.database_name = IndexStorage._get_database_name(index_type, use_terms_clusters, segment_name)
+        self.segment_name = segment_name
+        self.bulk_load = bulk_load
+        self.read_only = read_only
+        self._threads_connections = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         if truncate_old:
             self._truncate_old_if_exists()
-        self.connection = sqlite3.connect(self.database_name)
-        self.cursor = self.connection.cursor()
-        self._create_tables_if_not_exists()
+        if read_only:
+            self._get_thread_connection()
+        else:
+            if bulk_load:
+                self._set_bulk_load_pragmas()
+            self._create_tables_if_not_exists()
+            if not bulk_load:
+                self._create_indexes_if_not_exists()
+            if truncate_old:
+                self._write_index_metadata(self.STORAGE_BACKEND_METADATA_KEY, self.STORAGE_BACKEND.value)
+        index_metadata = self._read_index_metadata()
+        self._check_storage_backend(index_metadata)
+        self.posting_codec = PostingCodec(
+            index_metadata.get(self.POSTING_CODEC_METADATA_KEY, PostingCodec.VARINT.value)
+        )
+        self.index_version = IndexStorage._get_files_version(self.get_storage_files())
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.bulk_load and exc_type is None:
+            self._finish_bulk_load()
         self.commit_changes()
-        self.connection.close()
+        self.close()
+
+    def _connect(self):
+        if self.read_only:
+            return sqlite3.connect(
+                f"file:{urllib.parse.quote(self.database_name)}?mode=ro&immutable=1", uri=True,
+                cached_statements=self.CACHED_STATEMENTS, check_same_thread=False
+            )
+        return sqlite3.connect(self.database_name, cached_statements=self.CACHED_STATEMENTS, check_same_thread=False)
+
+    def _get_thread_connection(self):
+        if not hasattr(self._threads_connections, "connection"):
+            connection = self._connect()
+            self._threads_connections.connection = connection
+            self._threads_connections.cursor = connection.cursor()
+            with self._connections_lock:
+                self._connections.append(connection)
+        return self._threads_connections
+
+    @property
+    def connection(self):
+        return self._get_thread_connection().connection
+
+    @property
+    def cursor(self):
+        return self._get_thread_connection().cursor
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._threads_connections = threading.local()
+
+    @staticmethod
+    def _get_files_version(paths):
+        files_version = hashlib.sha1()
+        for path in paths:
+            if os.path.exists(path):
+                path_stat = os.stat(path)
+                files_version.update(
+                    f"{path}:{path_stat.st_ino}:{path_stat.st_size}:{path_stat.st_mtime_ns};".encode("utf-8")
+                )
+        return files_version.hexdigest()
 
     @staticmethod
     def _get_index_type_database_name(index_type):
@@ -35,82 +127,272 @@ class IndexStorage(object):
         }[index_type]
 
     @staticmethod
-    def _get_database_name(index_type, use_terms_clusters):
+    def _get_database_name(index_type, use_terms_clusters, segment_name=None):
         index_type_name = IndexStorage._get_index_type_database_name(index_type)
         index_terms_suffix = "_clusters" if use_terms_clusters else ""
-        return f"data/{index_type_name}{index_terms_suffix}.db"
+        database_name = f"data/{index_type_name}{index_terms_suffix}.db"
+        if segment_name is None:
+            return database_name
+        return segments_manifest.get_segment_database_name(database_name, segment_name)
+
+    @staticmethod
+    def _get_placeholders_count(keys_count):
+        return 1 << (keys_count - 1).bit_length()
+
+    @staticmethod
+    def _get_backend_files(database_name):
+        files_prefix = os.path.splitext(database_name)[0]
+        return [
+            files_prefix + IndexStorage.POSTINGS_FILE_SUFFIX,
+            files_prefix + IndexStorage.TERMS_ENTRIES_FILE_SUFFIX,
+        ]
+
+    @staticmethod
+    def read_storage_backend(database_name):
+        if not os.path.exists(database_name):
+            return None
+        connection = sqlite3.connect(f"file:{urllib.parse.quote(database_name)}?mode=ro", uri=True)
+        try:
+            storage_backend_row = connection.execute(
+                "SELECT value FROM index_metadata WHERE key = ?", (IndexStorage.STORAGE_BACKEND_METADATA_KEY, )
+            ).fetchone()
+        except sqlite3.OperationalError:
+            storage_backend_row = None
+        finally:
+            connection.close()
+        return StorageBackend(storage_backend_row[0]) if storage_backend_row is not None else None
 
     def _truncate_old_if_exists(self):
-        if os.path.exists(self.database_name):
-            os.remove(self.database_name)
+        if self.segment_name is None:
+            segments_manifest.remove_all_segments(self.database_name)
+        for path in [self.database_name] + IndexStorage._get_backend_files(self.database_name):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _check_storage_backend(self, index_metadata):
+        storage_backend = index_metadata.get(self.STORAGE_BACKEND_METADATA_KEY)
+        if storage_backend is not None and storage_backend != self.STORAGE_BACKEND.value:
+            raise ValueError(
+                f"Index {self.database_name} was built with the {storage_backend} storage backend "
+                f"and cannot be opened with the {self.STORAGE_BACKEND.value} storage backend"
+            )
+
+    def _set_bulk_load_pragmas(self):
+        for pragma in self.BULK_LOAD_PRAGMAS:
+            self.cursor.execute(pragma)
 
     def _create_tables_if_not_exists(self):
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS indexed_terms
-            (term TEXT PRIMARY KEY, posting_list BYTES)
+            (
+                term_id INTEGER PRIMARY KEY, posting_list BLOB, length INTEGER, skip_entries BLOB, block_data BLOB,
+                block_data_skip_entries BLOB, max_title_frequency INTEGER, max_content_frequency INTEGER,
+                representation TEXT
+            )
         """)
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS wiki_articles
-            (wiki_article_id BIGINT PRIMARY KEY, title TEXT, content TEXT)
+            (wiki_article_id INTEGER PRIMARY KEY, title TEXT, content TEXT)
         """)
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS word_base_forms
-            (word TEXT PRIMARY KEY, base_forms TEXT)
+            (word TEXT, base_forms TEXT)
+        """)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS forward_index
+            (
+                wiki_article_id INTEGER PRIMARY KEY, title_tokens_count INTEGER, tokens_count INTEGER, tokens BLOB,
+                terms_ids BLOB, fallbacks BLOB
+            )
+        """)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS terms_ids
+            (term TEXT, term_id INTEGER PRIMARY KEY)
         """)
         self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS document_positions
-            (position INTEGER PRIMARY KEY)
+            CREATE TABLE IF NOT EXISTS index_metadata
+            (key TEXT PRIMARY KEY, value TEXT)
         """)
         self.commit_changes()
 
-    def add_indexed_term(self, term, posting_list):
-        self.cursor.execute(
-            "INSERT INTO indexed_terms (term, posting_list) VALUES (?, ?)",
-            (term, posting_list.coded_sequence)
+    def _create_indexes_if_not_exists(self):
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS word_base_forms_word ON word_base_forms (word)")
+        self.cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS terms_ids_term ON terms_ids (term)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS wiki_articles_title ON wiki_articles (title)")
+        self.commit_changes()
+
+    def _finish_bulk_load(self):
+        self._create_indexes_if_not_exists()
+        self.cursor.execute("ANALYZE")
+
+    def _read_index_metadata(self):
+        try:
+            return dict(self.cursor.execute("SELECT key, value FROM index_metadata"))
+        except sqlite3.OperationalError:
+            return {}
+
+    def _select_by_keys(self, query_template, keys):
+        keys = list(keys)
+        selected_rows = []
+        for chunk_start in range(0, len(keys), self.QUERY_CHUNK_SIZE):
+            chunk_keys = keys[chunk_start:chunk_start + self.QUERY_CHUNK_SIZE]
+            placeholders_count = IndexStorage._get_placeholders_count(len(chunk_keys))
+            padded_chunk_keys = chunk_keys + [chunk_keys[-1]] * (placeholders_count - len(chunk_keys))
+            placeholders = ",".join(["?"] * placeholders_count)
+            selected_rows.extend(self.cursor.execute(query_template.format(placeholders), padded_chunk_keys))
+        return selected_rows
+
+    @staticmethod
+    def _get_posting_list_columns(posting_list):
+        posting_list_columns = (posting_list.coded_sequence, len(posting_list), posting_list.skip_entries)
+        if isinstance(posting_list, BlockDataPostingList):
+            posting_list_columns += (posting_list.coded_block_data, posting_list.block_data_skip_entries)
+        else:
+            posting_list_columns += (None, None)
+        if isinstance(posting_list, FrequenciesPostingList):
+            posting_list_columns += (posting_list.max_title_frequency, posting_list.max_content_frequency)
+        else:
+            posting_list_columns += (None, None)
+        return posting_list_columns + (posting_list.representation.value, )
+
+    def _create_posting_list(self, coded_sequence, length, skip_entries, coded_block_data, block_data_skip_entries,
+                             max_title_frequency, max_content_frequency, representation):
+        representation = PostingRepresentation(representation or PostingRepresentation.SORTED_ARRAY.value)
+        if coded_block_data is None:
+            return PostingList(
+                coded_sequence, length=length, skip_entries=skip_entries, codec=self.posting_codec,
+                representation=representation
+            )
+        if self.index_type == IndexType.POSITIONAL:
+            return PositionalPostingList(
+                coded_sequence, length=length, skip_entries=skip_entries, coded_block_data=coded_block_data,
+                block_data_skip_entries=block_data_skip_entries, codec=self.posting_codec, representation=representation
+            )
+        return FrequenciesPostingList(
+            coded_sequence, length=length, skip_entries=skip_entries, coded_block_data=coded_block_data,
+            block_data_skip_entries=block_data_skip_entries, max_title_frequency=max_title_frequency,
+            max_content_frequency=max_content_frequency, codec=self.posting_codec, representation=representation
         )
 
-    def add_wiki_article(self, wiki_article):
-        self.cursor.execute(
+    def add_indexed_terms(self, terms_ids_posting_lists):
+        self.cursor.executemany(
+            """
+            INSERT INTO indexed_terms (
+                term_id, posting_list, length, skip_entries, block_data, block_data_skip_entries, max_title_frequency,
+                max_content_frequency, representation
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (term_id, ) + IndexStorage._get_posting_list_columns(posting_list)
+                for term_id, posting_list in terms_ids_posting_lists
+            )
+        )
+
+    def add_wiki_articles(self, wiki_articles):
+        self.cursor.executemany(
             "INSERT INTO wiki_articles (wiki_article_id, title, content) VALUES (?, ?, ?)",
-            (wiki_article.id, wiki_article.title, wiki_article.content)
+            ((wiki_article.id, wiki_article.title, wiki_article.content) for wiki_article in wiki_articles)
         )
 
-    def add_word_base_forms(self, word, base_forms):
-        self.cursor.execute(
+    def add_words_base_forms(self, words_base_forms):
+        self.cursor.executemany(
             "INSERT INTO word_base_forms (word, base_forms) VALUES (?, ?)",
-            (word, json.dumps(base_forms))
+            ((word, json.dumps(base_forms)) for word, base_forms in words_base_forms)
         )
 
-    def add_document_position(self, document_position):
-        self.cursor.execute(
-            "INSERT INTO document_positions (position) VALUES (?)",
-            (document_position, )
+    def add_forward_index_entries(self, articles_forward_index_entries):
+        self.cursor.executemany(
+            """
+            INSERT INTO forward_index (wiki_article_id, title_tokens_count, tokens_count, tokens, terms_ids, fallbacks)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (article_id, ) + forward_index_entry.to_bytes()
+                for article_id, forward_index_entry in articles_forward_index_entries
+            )
         )
 
-    def get_terms_postings_lists(self, terms):
-        formatted_terms = ",".join(map(lambda term: f"'{term}'", terms))
-        terms_postings_lists = self.cursor.execute(
-            f"SELECT term, posting_list FROM indexed_terms WHERE term IN ({formatted_terms})"
-        ).fetchall()
-        return {x[0]: PostingList(x[1]) for x in terms_postings_lists}
+    def add_terms_ids(self, terms_ids):
+        self.cursor.executemany("INSERT INTO terms_ids (term, term_id) VALUES (?, ?)", terms_ids)
+
+    def _write_index_metadata(self, key, value):
+        self.cursor.execute("INSERT OR REPLACE INTO index_metadata (key, value) VALUES (?, ?)", (key, value))
+
+    def set_posting_codec(self, posting_codec):
+        self._write_index_metadata(self.POSTING_CODEC_METADATA_KEY, posting_codec.value)
+        self.posting_codec = posting_codec
+
+    def add_indexed_term(self, term_id, posting_list):
+        self.add_indexed_terms([(term_id, posting_list)])
+
+    def add_wiki_article(self, wiki_article):
+        self.add_wiki_articles([wiki_article])
+
+    def add_word_base_forms(self, word, base_forms):
+        self.add_words_base_forms([(word, base_forms)])
+
+    def get_terms_postings_lists(self, terms_ids):
+        terms_postings_lists = self._select_by_keys(
+            """
+            SELECT
+                term_id, posting_list, length, skip_entries, block_data, block_data_skip_entries, max_title_frequency,
+                max_content_frequency, representation
+            FROM indexed_terms WHERE term_id IN ({})
+            """,
+            terms_ids
+        )
+        return {x[0]: self._create_posting_list(*x[1:]) for x in terms_postings_lists}
 
     def get_wiki_articles(self, ids):
-        formatted_ids = ",".join(map(lambda x: str(x), ids))
-        articles_tuples = self.cursor.execute(
-            f"SELECT wiki_article_id, title, content FROM wiki_articles WHERE wiki_article_id IN ({formatted_ids})"
-        ).fetchall()
+        articles_tuples = self._select_by_keys(
+            "SELECT wiki_article_id, title, content FROM wiki_articles WHERE wiki_article_id IN ({})", ids
+        )
         return {x[0]: WikiArticle(id=x[0], title=x[1], content=x[2]) for x in articles_tuples}
 
     def get_words_base_forms(self, words):
-        formatted_words = ",".join(map(lambda word: f"""'{word.replace("'", "")}'""", words))
-        words_base_forms = self.cursor.execute(
-            f"SELECT word, base_forms FROM word_base_forms WHERE word IN ({formatted_words})"
-        ).fetchall()
+        words_base_forms = self._select_by_keys(
+            "SELECT word, base_forms FROM word_base_forms WHERE word IN ({})", words
+        )
         return {x[0]: json.loads(x[1]) for x in words_base_forms}
 
-    def get_document_positions(self):
-        fetched_data = self.cursor.execute("SELECT position FROM document_positions").fetchall()
-        return [x[0] for x in fetched_data]
+    def get_forward_index_entries(self, ids):
+        forward_index_entries = self._select_by_keys(
+            """
+            SELECT wiki_article_id, title_tokens_count, tokens_count, tokens, terms_ids, fallbacks
+            FROM forward_index WHERE wiki_article_id IN ({})
+            """,
+            ids
+        )
+        return {x[0]: ForwardIndexEntry.from_bytes(*x[1:]) for x in forward_index_entries}
+
+    def get_terms_ids(self, terms):
+        terms_ids = self._select_by_keys("SELECT term, term_id FROM terms_ids WHERE term IN ({})", terms)
+        return dict(terms_ids)
+
+    def get_wiki_articles_ids(self):
+        return [x[0] for x in self.cursor.execute("SELECT wiki_article_id FROM wiki_articles ORDER BY wiki_article_id")]
+
+    def get_wiki_articles_ids_by_titles(self, titles):
+        articles_ids = self._select_by_keys(
+            "SELECT title, MIN(wiki_article_id) FROM wiki_articles WHERE title IN ({}) GROUP BY title", titles
+        )
+        return dict(articles_ids)
+
+    def get_max_wiki_article_id(self):
+        return self.cursor.execute("SELECT COALESCE(MAX(wiki_article_id), 0) FROM wiki_articles").fetchone()[0]
+
+    def get_indexed_terms_ids(self):
+        return [x[0] for x in self.cursor.execute("SELECT term_id FROM indexed_terms ORDER BY term_id")]
+
+    def get_all_terms_ids(self):
+        return dict(self.cursor.execute("SELECT term, term_id FROM terms_ids"))
+
+    def get_max_term_id(self):
+        return self.cursor.execute("SELECT COALESCE(MAX(term_id), -1) FROM terms_ids").fetchone()[0]
+
+    def get_storage_files(self):
+        return [self.database_name]
 
     def commit_changes(self):
         self.connection.commit()
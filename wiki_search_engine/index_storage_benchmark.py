@@ -0,0 +1,112 @@
+import argparse
+import random
+
+import numpy as np
+
+import utils
+from benchmark_utils import benchmark_working_directory, create_random_words, measure_seconds
+from index_storage import IndexStorage
+from index_type import IndexType
+from posting_list import PostingList
+from wiki_article import WikiArticle
+
+
+def _create_benchmark_data(terms_count, articles_count, seed):
+    random_generator = random.Random(seed)
+    terms = create_random_words(random_generator, terms_count)
+    terms_posting_lists = [
+        (term_id, PostingList.from_values(sorted(random_generator.sample(
+            range(1, articles_count + 1), min(articles_count, int(random_generator.paretovariate(1.0)))
+        ))))
+        for term_id in range(len(terms))
+    ]
+    wiki_articles = [
+        WikiArticle(
+            id=article_id,
+            title=" ".join(random_generator.choices(terms, k=3)),
+            content=" ".join(random_generator.choices(terms, k=200))
+        )
+        for article_id in range(1, articles_count + 1)
+    ]
+    words_base_forms = [(term, [term]) for term in terms]
+    return {"terms_posting_lists": terms_posting_lists, "wiki_articles": wiki_articles,
+            "words_base_forms": words_base_forms}
+
+
+def _load_row_by_row(benchmark_data):
+    with IndexStorage(IndexType.TRADITIONAL, False, truncate_old=True) as index_storage:
+        for term_id, posting_list in benchmark_data["terms_posting_lists"]:
+            index_storage.add_indexed_term(term_id, posting_list)
+        for wiki_article in benchmark_data["wiki_articles"]:
+            index_storage.add_wiki_article(wiki_article)
+        for word, base_forms in benchmark_data["words_base_forms"]:
+            index_storage.add_word_base_forms(word, base_forms)
+
+
+def _load_in_bulk(benchmark_data):
+    with IndexStorage(IndexType.TRADITIONAL, False, truncate_old=True, bulk_load=True) as index_storage:
+        index_storage.add_indexed_terms(benchmark_data["terms_posting_lists"])
+        index_storage.add_wiki_articles(benchmark_data["wiki_articles"])
+        index_storage.add_words_base_forms(benchmark_data["words_base_forms"])
+
+
+def _get_terms_postings_lists_with_formatted_sql(index_storage, terms_ids):
+    formatted_terms_ids = ",".join(map(str, terms_ids))
+    terms_postings_lists = index_storage.cursor.execute(
+        "SELECT term_id, posting_list, length, skip_entries FROM indexed_terms "
+        f"WHERE term_id IN ({formatted_terms_ids})"
+    ).fetchall()
+    return {x[0]: PostingList(x[1], length=x[2], skip_entries=x[3]) for x in terms_postings_lists}
+
+
+def _get_terms_postings_lists_with_parameters(index_storage, terms_ids):
+    return index_storage.get_terms_postings_lists(terms_ids)
+
+
+def _measure_latencies(index_storage, queries, select_func):
+    latencies = [measure_seconds(select_func, index_storage, query_terms_ids) for query_terms_ids in queries]
+    return {"p50": np.percentile(latencies, 50) * 1000, "p95": np.percentile(latencies, 95) * 1000}
+
+
+def _create_queries(benchmark_data, queries_count, query_terms_count, seed):
+    random_generator = random.Random(seed)
+    terms_ids = [term_id for term_id, _ in benchmark_data["terms_posting_lists"]]
+    return [random_generator.sample(terms_ids, query_terms_count) for _ in range(queries_count)]
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--terms_count", type=int, default=100_000)
+    parser.add_argument("--articles_count", type=int, default=20_000)
+    parser.add_argument("--queries_count", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    return vars(parser.parse_args())
+
+
+def run_index_storage_benchmark(terms_count, articles_count, queries_count, seed):
+    logger = utils.get_default_logger()
+    logger.info("Creating benchmark data...")
+    benchmark_data = _create_benchmark_data(terms_count, articles_count, seed)
+    with benchmark_working_directory():
+        row_by_row_seconds = measure_seconds(_load_row_by_row, benchmark_data)
+        logger.info(f"Row by row load: {row_by_row_seconds:.2f} s")
+        bulk_seconds = measure_seconds(_load_in_bulk, benchmark_data)
+        logger.info(f"Bulk load: {bulk_seconds:.2f} s ({row_by_row_seconds / bulk_seconds:.1f}x faster)")
+        with IndexStorage(IndexType.TRADITIONAL, False, truncate_old=False) as index_storage:
+            for query_terms_count in [1, 4, 64, 1024]:
+                queries = _create_queries(benchmark_data, queries_count, query_terms_count, seed)
+                formatted_latencies = _measure_latencies(
+                    index_storage, queries, _get_terms_postings_lists_with_formatted_sql
+                )
+                parameters_latencies = _measure_latencies(
+                    index_storage, queries, _get_terms_postings_lists_with_parameters
+                )
+                logger.info(
+                    f"Lookup of {query_terms_count} terms: "
+                    f"formatted SQL p50 {formatted_latencies['p50']:.3f} ms, p95 {formatted_latencies['p95']:.3f} ms; "
+                    f"parameterized p50 {parameters_latencies['p50']:.3f} ms, p95 {parameters_latencies['p95']:.3f} ms"
+                )
+
+
+if __name__ == "__main__":
+    run_index_storage_benchmark(**_parse_input_arguments())
@@ -0,0 +1,99 @@
+import array
+import itertools
+import json
+import mmap
+import os
+import struct
+import zlib
+
+HEADER_LENGTH_FORMAT = "<Q"
+ARRAYS_ALIGNMENT = 8
+EMPTY_SLOT = -1
+
+
+def get_string_hash(string_bytes):
+    return zlib.crc32(string_bytes)
+
+
+def create_hash_slots(encoded_strings):
+    slots_count = 1 << (2 * len(encoded_strings)).bit_length()
+    slots_mask = slots_count - 1
+    hash_slots = array.array("i", [EMPTY_SLOT]) * slots_count
+    for string_index, string_bytes in enumerate(encoded_strings):
+        slot = get_string_hash(string_bytes) & slots_mask
+        while hash_slots[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & slots_mask
+        hash_slots[slot] = string_index
+    return hash_slots
+
+
+def get_offsets(lengths):
+    offsets = list(itertools.accumulate(lengths, initial=0))
+    return array.array("I" if offsets[-1] < 2 ** 32 else "q", offsets)
+
+
+def write_arrays(path, magic, named_arrays):
+    header = {}
+    offset = 0
+    for name, values in named_arrays.items():
+        header[name] = [values.typecode, offset, len(values)]
+        offset += -(-len(values) * values.itemsize // ARRAYS_ALIGNMENT) * ARRAYS_ALIGNMENT
+    encoded_header = json.dumps(header).encode("utf-8")
+    encoded_header += b" " * (-len(encoded_header) % ARRAYS_ALIGNMENT)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as stream:
+        stream.write(magic + struct.pack(HEADER_LENGTH_FORMAT, len(encoded_header)) + encoded_header)
+        for values in named_arrays.values():
+            values_bytes = values.tobytes()
+            stream.write(values_bytes + b"\0" * (-len(values_bytes) % ARRAYS_ALIGNMENT))
+    os.replace(temporary_path, path)
+
+
+def load_arrays(path, magic):
+    with open(path, "rb") as stream:
+        buffer = memoryview(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+    if buffer[:len(magic)] != magic:
+        raise ValueError(f"Invalid arrays file: {path}")
+    header_start = len(magic) + struct.calcsize(HEADER_LENGTH_FORMAT)
+    header_length, = struct.unpack_from(HEADER_LENGTH_FORMAT, buffer, len(magic))
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+    arrays_start = header_start + header_length
+    named_arrays = {}
+    for name, (typecode, offset, count) in header.items():
+        array_start = arrays_start + offset
+        named_arrays[name] = buffer[array_start:array_start + count * array.array(typecode).itemsize].cast(typecode)
+    return named_arrays
+
+
+class MappedStrings(object):
+    def __init__(self, offsets, strings_bytes, hash_slots):
+        self._offsets = offsets
+        self._strings_bytes = strings_bytes
+        self._hash_slots = hash_slots
+        self._slots_mask = len(hash_slots) - 1
+
+    @staticmethod
+    def create_arrays(strings):
+        encoded_strings = [string.encode("utf-8") for string in strings]
+        return (
+            get_offsets(len(x) for x in encoded_strings),
+            array.array("B", b"".join(encoded_strings)),
+            create_hash_slots(encoded_strings),
+        )
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, string_index):
+        return str(self._strings_bytes[self._offsets[string_index]:self._offsets[string_index + 1]], "utf-8")
+
+    def find(self, string):
+        string_bytes = string.encode("utf-8")
+        slot = get_string_hash(string_bytes) & self._slots_mask
+        while True:
+            string_index = self._hash_slots[slot]
+            if string_index == EMPTY_SLOT or self._strings_bytes[
+                self._offsets[string_index]:self._offsets[string_index + 1]
+            ] == string_bytes:
+                return string_index
+            slot = (slot + 1) & self._slots_mask
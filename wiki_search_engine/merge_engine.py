@@ -0,0 +1,180 @@
+import functools
+import heapq
+import operator
+
+import query_profiler
+from posting_list import PostingList
+from posting_representation import PostingRepresentation
+from roaring_bitmap import RoaringBitmapCursor
+
+
+class UnionCursor(object):
+    def __init__(self, cursors):
+        self.cursors = cursors
+        self._heap = [(cursor.current, index) for index, cursor in enumerate(cursors) if cursor.current is not None]
+        heapq.heapify(self._heap)
+        self.current = self._heap[0][0] if len(self._heap) > 0 else None
+
+    def __len__(self):
+        return sum(len(cursor) for cursor in self.cursors)
+
+    def _replace_heap_top(self, value):
+        _, index = self._heap[0]
+        if value is None:
+            heapq.heappop(self._heap)
+        else:
+            heapq.heapreplace(self._heap, (value, index))
+
+    def _update_current(self):
+        self.current = self._heap[0][0] if len(self._heap) > 0 else None
+        return self.current
+
+    def advance(self):
+        if self.current is None:
+            return None
+        while len(self._heap) > 0 and self._heap[0][0] == self.current:
+            self._replace_heap_top(self.cursors[self._heap[0][1]].advance())
+        return self._update_current()
+
+    def skip_to(self, value):
+        if self.current is None or self.current >= value:
+            return self.current
+        while len(self._heap) > 0 and self._heap[0][0] < value:
+            self._replace_heap_top(self.cursors[self._heap[0][1]].skip_to(value))
+        return self._update_current()
+
+
+class PositionsUnionCursor(UnionCursor):
+    def positions(self):
+        cursors_positions = [cursor.positions() for cursor in self.cursors if cursor.current == self.current]
+        if len(cursors_positions) == 1:
+            return cursors_positions[0]
+        return sorted(set().union(*cursors_positions))
+
+
+class SegmentsUnionCursor(UnionCursor):
+    def _get_current_cursor(self):
+        return self.cursors[self._heap[0][1]]
+
+    def positions(self):
+        return self._get_current_cursor().positions()
+
+    def frequencies(self):
+        return self._get_current_cursor().frequencies()
+
+
+class ExcludingCursor(object):
+    def __init__(self, cursor, excluded_values):
+        self.cursor = cursor
+        self.excluded_values = excluded_values
+        self.current = self._skip_excluded(cursor.current)
+
+    def __len__(self):
+        return len(self.cursor)
+
+    def _skip_excluded(self, value):
+        while value is not None and value in self.excluded_values:
+            value = self.cursor.advance()
+        return value
+
+    def advance(self):
+        self.current = self._skip_excluded(self.cursor.advance())
+        return self.current
+
+    def skip_to(self, value):
+        self.current = self._skip_excluded(self.cursor.skip_to(value))
+        return self.current
+
+    def positions(self):
+        return self.cursor.positions()
+
+    def frequencies(self):
+        return self.cursor.frequencies()
+
+
+class IntersectionCursor(object):
+    def __init__(self, cursors, start_value=None):
+        self.cursors = cursors
+        self.current = None
+        if len(cursors) > 0:
+            self.current = self._find_match(cursors[0].current if start_value is None else start_value)
+
+    def __len__(self):
+        return min([len(cursor) for cursor in self.cursors], default=0)
+
+    def _is_match(self):
+        return True
+
+    def _find_match(self, value):
+        while value is not None:
+            for cursor in self.cursors:
+                found_value = cursor.skip_to(value)
+                if found_value is None:
+                    return None
+                if found_value > value:
+                    value = found_value
+                    break
+            else:
+                if self._is_match():
+                    return value
+                value = self.cursors[0].advance()
+        return None
+
+    def advance(self):
+        if self.current is None:
+            return None
+        self.current = self._find_match(self.cursors[0].advance())
+        return self.current
+
+    def skip_to(self, value):
+        if self.current is None or self.current >= value:
+            return self.current
+        self.current = self._find_match(value)
+        return self.current
+
+
+class PhraseCursor(IntersectionCursor):
+    def __init__(self, words_cursors, start_value=None):
+        self.words_cursors = words_cursors
+        super().__init__(sorted(words_cursors, key=len), start_value)
+
+    def _is_match(self):
+        query_profiler.add_counter("phrase_verifications")
+        return _has_phrase_positions(self.words_cursors)
+
+
+def _is_bitmap_posting_list(posting_list):
+    return isinstance(posting_list, PostingList) and posting_list.representation == PostingRepresentation.BITMAP
+
+
+def create_documents_union_cursor(posting_lists):
+    bitmaps = [x.bitmap for x in posting_lists if _is_bitmap_posting_list(x)]
+    cursors = [x.documents_cursor() for x in posting_lists if not _is_bitmap_posting_list(x)]
+    if len(bitmaps) > 0:
+        cursors.append(functools.reduce(operator.or_, bitmaps).cursor())
+    return cursors[0] if len(cursors) == 1 else UnionCursor(cursors)
+
+
+def create_documents_intersection_cursor(cursors, start_value=None):
+    bitmaps = [cursor.bitmap for cursor in cursors if isinstance(cursor, RoaringBitmapCursor)]
+    if len(bitmaps) > 1:
+        cursors = [cursor for cursor in cursors if not isinstance(cursor, RoaringBitmapCursor)] + [
+            functools.reduce(operator.and_, bitmaps).cursor()
+        ]
+    return IntersectionCursor(sorted(cursors, key=len), start_value)
+
+
+def iterate_cursor(cursor):
+    value = cursor.current
+    while value is not None:
+        yield value
+        value = cursor.advance()
+
+
+def _has_phrase_positions(cursors):
+    phrase_positions = set(cursors[0].positions())
+    for word_position, cursor in enumerate(cursors[1:], start=1):
+        phrase_positions.intersection_update(position - word_position for position in cursor.positions())
+        if len(phrase_positions) == 0:
+            return False
+    return True
@@ -0,0 +1,133 @@
+import itertools
+import mmap
+import os
+
+import numpy as np
+
+from index_storage import IndexStorage
+from posting_representation import PostingRepresentation
+from storage_backend import StorageBackend
+
+
+class MmapIndexStorage(IndexStorage):
+    STORAGE_BACKEND = StorageBackend.MMAP
+    TERMS_ENTRY_SIZE = 9
+    REPRESENTATIONS = list(PostingRepresentation)
+    MISSING_ENTRY_VALUE = -1
+
+    def __init__(self, index_type, use_terms_clusters, truncate_old, bulk_load=False, read_only=False,
+                 segment_name=None):
+        files_prefix = os.path.splitext(
+            IndexStorage._get_database_name(index_type, use_terms_clusters, segment_name)
+        )[0]
+        self.postings_path = files_prefix + self.POSTINGS_FILE_SUFFIX
+        self.terms_entries_path = files_prefix + self.TERMS_ENTRIES_FILE_SUFFIX
+        self._pending_terms_posting_lists = {}
+        super().__init__(index_type, use_terms_clusters, truncate_old, bulk_load, read_only, segment_name)
+        self._load_postings_file()
+
+    def _load_postings_file(self):
+        if not os.path.exists(self.terms_entries_path):
+            self._terms_entries = np.zeros((0, self.TERMS_ENTRY_SIZE), dtype=np.int64)
+            self._postings = memoryview(b"")
+            return
+        self._terms_entries = np.load(self.terms_entries_path, mmap_mode="r")
+        with open(self.postings_path, "rb") as stream:
+            if os.fstat(stream.fileno()).st_size == 0:
+                self._postings = memoryview(b"")
+            else:
+                self._postings = memoryview(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _get_posting_list(self, term_id):
+        (offset, coded_sequence_length, skip_entries_length, length, block_data_length, block_data_skip_entries_length,
+         max_title_frequency, max_content_frequency, representation_index) = self._terms_entries[term_id].tolist()
+        coded_parts_bounds = list(itertools.accumulate(
+            [offset, coded_sequence_length, skip_entries_length, block_data_length, block_data_skip_entries_length]
+        ))
+        coded_sequence, skip_entries, coded_block_data, block_data_skip_entries = [
+            self._postings[start:end] for start, end in zip(coded_parts_bounds[:-1], coded_parts_bounds[1:])
+        ]
+        return self._create_posting_list(
+            coded_sequence, length, skip_entries, coded_block_data if block_data_skip_entries_length > 0 else None,
+            block_data_skip_entries,
+            max_title_frequency if max_title_frequency != self.MISSING_ENTRY_VALUE else None,
+            max_content_frequency if max_content_frequency != self.MISSING_ENTRY_VALUE else None,
+            self.REPRESENTATIONS[representation_index].value
+        )
+
+    def _has_posting_list(self, term_id):
+        return 0 <= term_id < len(self._terms_entries) and self._terms_entries[term_id, 0] != self.MISSING_ENTRY_VALUE
+
+    def _copy_posting_list(self, posting_list):
+        coded_sequence, length, skip_entries, coded_block_data, block_data_skip_entries, *other_columns = (
+            IndexStorage._get_posting_list_columns(posting_list)
+        )
+        return self._create_posting_list(
+            bytes(coded_sequence), length, bytes(skip_entries),
+            bytes(coded_block_data) if coded_block_data is not None else None,
+            bytes(block_data_skip_entries) if block_data_skip_entries is not None else None,
+            *other_columns
+        )
+
+    def _write_postings_file(self, terms_posting_lists):
+        terms_ids = sorted(terms_posting_lists.keys())
+        terms_entries = np.full(
+            (terms_ids[-1] + 1 if len(terms_ids) > 0 else 0, self.TERMS_ENTRY_SIZE), self.MISSING_ENTRY_VALUE,
+            dtype=np.int64
+        )
+        offset = 0
+        with open(self.postings_path + ".tmp", "wb") as stream:
+            for term_id in terms_ids:
+                (coded_sequence, length, skip_entries, coded_block_data, block_data_skip_entries, max_title_frequency,
+                 max_content_frequency, representation) = IndexStorage._get_posting_list_columns(
+                    terms_posting_lists[term_id]
+                )
+                coded_parts = [
+                    coded_sequence, skip_entries, coded_block_data or bytes(), block_data_skip_entries or bytes()
+                ]
+                for coded_part in coded_parts:
+                    stream.write(coded_part)
+                coded_parts_lengths = [len(coded_part) for coded_part in coded_parts]
+                terms_entries[term_id] = (
+                    [offset] + coded_parts_lengths[:2] + [length] + coded_parts_lengths[2:] +
+                    [
+                        x if x is not None else self.MISSING_ENTRY_VALUE
+                        for x in [max_title_frequency, max_content_frequency]
+                    ] +
+                    [self.REPRESENTATIONS.index(PostingRepresentation(representation))]
+                )
+                offset += sum(coded_parts_lengths)
+        with open(self.terms_entries_path + ".tmp", "wb") as stream:
+            np.save(stream, terms_entries)
+        os.replace(self.postings_path + ".tmp", self.postings_path)
+        os.replace(self.terms_entries_path + ".tmp", self.terms_entries_path)
+
+    def _flush_pending_terms(self):
+        if len(self._pending_terms_posting_lists) == 0:
+            return
+        terms_posting_lists = {
+            term_id: self._copy_posting_list(posting_list)
+            for term_id, posting_list in self.get_terms_postings_lists(self.get_indexed_terms_ids()).items()
+        }
+        terms_posting_lists.update(self._pending_terms_posting_lists)
+        self._pending_terms_posting_lists = {}
+        self._write_postings_file(terms_posting_lists)
+        self._load_postings_file()
+
+    def add_indexed_terms(self, terms_ids_posting_lists):
+        self._pending_terms_posting_lists.update(terms_ids_posting_lists)
+
+    def get_terms_postings_lists(self, terms_ids):
+        return {
+            term_id: self._get_posting_list(term_id) for term_id in terms_ids if self._has_posting_list(term_id)
+        }
+
+    def get_indexed_terms_ids(self):
+        return np.flatnonzero(self._terms_entries[:, 0] != self.MISSING_ENTRY_VALUE).tolist()
+
+    def get_storage_files(self):
+        return super().get_storage_files() + [self.postings_path, self.terms_entries_path]
+
+    def commit_changes(self):
+        self._flush_pending_terms()
+        super().commit_changes()
@@ -1,3 +1,16 @@
+import bisect
+
+
+def gallop_to(items, item, start_index):
+    end_index = start_index
+    step = 1
+    while end_index < len(items) and items[end_index] < item:
+        start_index = end_index + 1
+        end_index += step
+        step *= 2
+    return bisect.bisect_left(items, item, start_index, min(end_index, len(items)))
+
+
 class OrderedList(object):
     def __init__(self, items):
         self.items = tuple(items)
@@ -10,17 +23,16 @@ class OrderedList(object):
                 raise ValueError("Cannot initialize OrderedList with unsorted items")
 
     def __and__(self, other):
+        smaller_items, larger_items = sorted((self.items, other.items), key=len)
         items_intersection = []
-        self_index, other_index = 0, 0
-        while self_index < len(self.items) and other_index < len(other.items):
-            if self.items[self_index] < other.items[other_index]:
-                self_index += 1
-            elif self.items[self_index] > other.items[other_index]:
-                other_index += 1
-            else:
-                items_intersection.append(self.items[self_index])
-                self_index += 1
-                other_index += 1
+        larger_index = 0
+        for item in smaller_items:
+            larger_index = gallop_to(larger_items, item, larger_index)
+            if larger_index == len(larger_items):
+                break
+            if larger_items[larger_index] == item:
+                items_intersection.append(item)
+                larger_index += 1
         return OrderedList(items_intersection)
 
     def __or__(self, other):
@@ -0,0 +1,74 @@
+import numpy as np
+
+import varint_codec
+
+HEADER_VALUES_COUNT = 3
+VARINT_CODING = 128
+
+
+def _count_gaps_bits(gaps):
+    gaps_bits = np.zeros(len(gaps), dtype=np.int64)
+    remaining_gaps = gaps.copy()
+    while np.any(remaining_gaps > 0):
+        gaps_bits += remaining_gaps > 0
+        remaining_gaps >>= 1
+    return gaps_bits
+
+
+def _count_coded_bytes(gaps, gaps_bits, bit_width):
+    exceptions = gaps_bits > bit_width
+    exceptions_bytes = int(varint_codec.count_gaps_bytes(gaps[exceptions] >> bit_width).sum())
+    return (len(gaps) * bit_width + 7) // 8 + int(exceptions.sum()) + exceptions_bytes
+
+
+def _choose_bit_width(gaps, gaps_bits):
+    return min(
+        range(int(gaps_bits.max()) + 1), key=lambda bit_width: _count_coded_bytes(gaps, gaps_bits, bit_width)
+    )
+
+
+def _pack_bits(values, bit_width):
+    if bit_width == 0:
+        return bytes()
+    values_bits = (values[:, None] >> np.arange(bit_width - 1, -1, -1, dtype=np.int64)) & 1
+    return np.packbits(values_bits.astype(np.uint8)).tobytes()
+
+
+def _unpack_bits(coded_bytes, values_count, bit_width):
+    if bit_width == 0:
+        return np.zeros(values_count, dtype=np.int64)
+    values_bits = np.unpackbits(coded_bytes)[:values_count * bit_width].reshape(values_count, bit_width)
+    return values_bits.astype(np.int64) @ (1 << np.arange(bit_width - 1, -1, -1, dtype=np.int64))
+
+
+def encode_gaps(gaps):
+    gaps = np.asarray(gaps, dtype=np.int64)
+    if np.any(gaps < 0):
+        raise ValueError("Gaps to be encoded must be non-negative")
+    if len(gaps) == 0:
+        return bytes()
+    gaps_bits = _count_gaps_bits(gaps)
+    bit_width = _choose_bit_width(gaps, gaps_bits)
+    exceptions_indexes = np.flatnonzero(gaps_bits > bit_width)
+    return (
+        varint_codec.encode_gaps([len(gaps), bit_width, len(exceptions_indexes)]) +
+        _pack_bits(gaps & ((1 << bit_width) - 1), bit_width) +
+        varint_codec.encode_gaps(np.concatenate((
+            np.diff(exceptions_indexes, prepend=0), gaps[exceptions_indexes] >> bit_width
+        )))
+    )
+
+
+def decode_gaps(coded_sequence):
+    if len(coded_sequence) == 0:
+        return np.zeros(0, dtype=np.int64)
+    coded_bytes = np.frombuffer(coded_sequence, dtype=np.uint8)
+    header_end = int(np.flatnonzero(coded_bytes >= VARINT_CODING)[HEADER_VALUES_COUNT - 1]) + 1
+    gaps_count, bit_width, exceptions_count = varint_codec.decode_gaps(coded_sequence[:header_end]).tolist()
+    packed_end = header_end + (gaps_count * bit_width + 7) // 8
+    gaps = _unpack_bits(coded_bytes[header_end:packed_end], gaps_count, bit_width)
+    if exceptions_count > 0:
+        exceptions_values = varint_codec.decode_gaps(coded_sequence[packed_end:])
+        exceptions_indexes = np.cumsum(exceptions_values[:exceptions_count])
+        gaps[exceptions_indexes] |= exceptions_values[exceptions_count:] << bit_width
+    return gaps
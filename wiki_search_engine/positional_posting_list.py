@@ -0,0 +1,53 @@
+import numpy as np
+
+import posting_codecs
+from block_data_posting_list import BlockDataPostingList
+from posting_codec import PostingCodec
+from posting_list import PostingList
+from posting_representation import PostingRepresentation
+from posting_list_cursor import PositionalPostingListCursor
+
+
+class PositionalPostingList(BlockDataPostingList):
+    @staticmethod
+    def _encode_positions_blocks(positions_counts, positions_gaps, coding, codec):
+        coded_positions_blocks = []
+        positions_ends = np.cumsum(positions_counts)
+        for block_start, block_end in BlockDataPostingList._get_blocks_ranges(len(positions_counts)):
+            block_positions_start = positions_ends[block_start - 1] if block_start > 0 else 0
+            coded_positions_blocks.append(posting_codecs.encode_gaps(np.concatenate((
+                positions_counts[block_start:block_end],
+                positions_gaps[block_positions_start:positions_ends[block_end - 1]]
+            )), codec, coding))
+        return coded_positions_blocks
+
+    @staticmethod
+    def from_documents_positions(documents_ids, positions, coding=128, codec=PostingCodec.VARINT,
+                                 representation=PostingRepresentation.SORTED_ARRAY):
+        documents_ids = np.asarray(documents_ids, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        documents_starts = np.flatnonzero(np.diff(documents_ids, prepend=0))
+        positions_counts = np.diff(np.append(documents_starts, len(documents_ids)))
+        positions_gaps = np.diff(positions, prepend=0)
+        positions_gaps[documents_starts] = positions[documents_starts]
+        posting_list = PositionalPostingList(coding=coding, codec=codec)
+        posting_list._set_documents_and_block_data(
+            PostingList.from_values(documents_ids[documents_starts], coding, codec, representation),
+            PositionalPostingList._encode_positions_blocks(positions_counts, positions_gaps, coding, codec)
+        )
+        return posting_list
+
+    def decode_positions_block(self, block_index):
+        block_gaps = self.decode_block_data_gaps(block_index)
+        documents_count = self._get_block_documents_count(block_index)
+        positions_counts = block_gaps[:documents_count]
+        positions_gaps = block_gaps[documents_count:]
+        positions_ends = np.cumsum(positions_counts)
+        positions_sums = np.cumsum(positions_gaps)
+        documents_starts = positions_ends - positions_counts
+        documents_bases = positions_sums[documents_starts] - positions_gaps[documents_starts]
+        positions = positions_sums - np.repeat(documents_bases, positions_counts)
+        return positions.tolist(), documents_starts.tolist() + [len(positions)]
+
+    def cursor(self):
+        return PositionalPostingListCursor(self)
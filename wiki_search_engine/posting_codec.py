@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class PostingCodec(Enum):
+    VARINT = "VARINT"
+    ELIAS_GAMMA = "ELIAS_GAMMA"
+    ELIAS_DELTA = "ELIAS_DELTA"
+    SIMPLE_8B = "SIMPLE_8B"
+    PFOR_DELTA = "PFOR_DELTA"
@@ -0,0 +1,26 @@
+import elias_codec
+import pfor_delta_codec
+import simple8b_codec
+import varint_codec
+from posting_codec import PostingCodec
+
+_GAPS_CODERS = {
+    PostingCodec.ELIAS_GAMMA: (elias_codec.encode_gamma_gaps, elias_codec.decode_gamma_gaps),
+    PostingCodec.ELIAS_DELTA: (elias_codec.encode_delta_gaps, elias_codec.decode_delta_gaps),
+    PostingCodec.SIMPLE_8B: (simple8b_codec.encode_gaps, simple8b_codec.decode_gaps),
+    PostingCodec.PFOR_DELTA: (pfor_delta_codec.encode_gaps, pfor_delta_codec.decode_gaps),
+}
+
+
+def encode_gaps(gaps, posting_codec, coding=128):
+    if posting_codec == PostingCodec.VARINT:
+        return varint_codec.encode_gaps(gaps, coding)
+    encode_func, _ = _GAPS_CODERS[posting_codec]
+    return encode_func(gaps)
+
+
+def decode_gaps(coded_sequence, posting_codec, coding=128):
+    if posting_codec == PostingCodec.VARINT:
+        return varint_codec.decode_gaps(coded_sequence, coding)
+    _, decode_func = _GAPS_CODERS[posting_codec]
+    return decode_func(coded_sequence)
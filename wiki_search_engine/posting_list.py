@@ -1,16 +1,174 @@
+import numpy as np
+
+import posting_codecs
+import query_profiler
+import varint_codec
 from ordered_list import OrderedList
+from posting_codec import PostingCodec
+from posting_list_cursor import PostingListCursor
+from posting_representation import PostingRepresentation
+from roaring_bitmap import ARRAY_CONTAINER_MAX_SIZE, RoaringBitmap
 
 
 class PostingList(object):
-    def __init__(self, coded_sequence=None, coding=128):
+    BLOCK_SIZE = 128
+    DENSE_TERM_MIN_LENGTH = ARRAY_CONTAINER_MAX_SIZE
+    DENSE_TERM_MIN_DENSITY = 1 / 16
+
+    def __init__(self, coded_sequence=None, coding=128, length=None, skip_entries=None, codec=PostingCodec.VARINT,
+                 representation=PostingRepresentation.SORTED_ARRAY):
         self.coding = coding
+        self.codec = codec
+        self.representation = representation
         if coded_sequence is None:
-            self.last_element = 0
+            self._last_element = 0
+            self._length = 0
             self.coded_sequence = bytearray()
         else:
-            encoded_sequence = self.decode_from_bytes_to_list(coded_sequence)
-            self.last_element = encoded_sequence[-1]
+            self._last_element = None
+            self._length = length
             self.coded_sequence = coded_sequence
+        self._skip_entries = skip_entries
+        self._blocks = None
+        self._bitmap = None
+
+    @staticmethod
+    def _get_blocks_last_indexes(values_count):
+        blocks_last_indexes = np.arange(PostingList.BLOCK_SIZE - 1, values_count, PostingList.BLOCK_SIZE)
+        if values_count > 0 and (len(blocks_last_indexes) == 0 or blocks_last_indexes[-1] != values_count - 1):
+            blocks_last_indexes = np.append(blocks_last_indexes, values_count - 1)
+        return blocks_last_indexes
+
+    @staticmethod
+    def _get_blocks_ranges(values_count):
+        return [
+            (block_start, min(block_start + PostingList.BLOCK_SIZE, values_count))
+            for block_start in range(0, values_count, PostingList.BLOCK_SIZE)
+        ]
+
+    @staticmethod
+    def _get_blocks_from_values(values, coded_sequence_length, coding):
+        if len(values) <= PostingList.BLOCK_SIZE:
+            blocks_count = min(len(values), 1)
+            return (
+                np.array(values[-1:], dtype=np.int64),
+                np.array([coded_sequence_length] * blocks_count, dtype=np.int64)
+            )
+        values = np.asarray(values, dtype=np.int64)
+        gaps_end_offsets = np.cumsum(varint_codec.count_gaps_bytes(np.diff(values, prepend=0), coding))
+        blocks_last_indexes = PostingList._get_blocks_last_indexes(len(values))
+        return values[blocks_last_indexes], gaps_end_offsets[blocks_last_indexes]
+
+    @staticmethod
+    def _get_bitmap_blocks_from_values(values):
+        blocks_last_indexes = PostingList._get_blocks_last_indexes(len(values))
+        return np.asarray(values, dtype=np.int64)[blocks_last_indexes], blocks_last_indexes + 1
+
+    @staticmethod
+    def _from_values_as_bitmap(values, coding, codec):
+        values = np.asarray(values, dtype=np.int64)
+        if len(values) > 0 and values[0] <= 0:
+            raise ValueError("Values to be encoded must be positive and strictly increasing")
+        bitmap = RoaringBitmap.from_values(values)
+        posting_list = PostingList(
+            bitmap.to_bytes(), coding, length=len(values), codec=codec, representation=PostingRepresentation.BITMAP
+        )
+        posting_list._last_element = int(values[-1]) if len(values) > 0 else 0
+        posting_list._blocks = PostingList._get_bitmap_blocks_from_values(values)
+        posting_list._bitmap = bitmap
+        return posting_list
+
+    @staticmethod
+    def _from_values_by_blocks(values, coding, codec):
+        values = np.asarray(values, dtype=np.int64)
+        gaps = np.diff(values, prepend=0)
+        if np.any(gaps <= 0):
+            raise ValueError("Values to be encoded must be positive and strictly increasing")
+        coded_blocks = [
+            posting_codecs.encode_gaps(gaps[block_start:block_end], codec, coding)
+            for block_start, block_end in PostingList._get_blocks_ranges(len(values))
+        ]
+        posting_list = PostingList(b"".join(coded_blocks), coding, length=len(values), codec=codec)
+        posting_list._last_element = int(values[-1]) if len(values) > 0 else 0
+        posting_list._blocks = (
+            values[PostingList._get_blocks_last_indexes(len(values))],
+            np.cumsum([len(coded_block) for coded_block in coded_blocks], dtype=np.int64)
+        )
+        return posting_list
+
+    @staticmethod
+    def get_representation(documents_ids):
+        if len(documents_ids) < PostingList.DENSE_TERM_MIN_LENGTH:
+            return PostingRepresentation.SORTED_ARRAY
+        documents_range = int(documents_ids[-1]) - int(documents_ids[0]) + 1
+        if len(documents_ids) < documents_range * PostingList.DENSE_TERM_MIN_DENSITY:
+            return PostingRepresentation.SORTED_ARRAY
+        return PostingRepresentation.BITMAP
+
+    @staticmethod
+    def from_values(values, coding=128, codec=PostingCodec.VARINT, representation=PostingRepresentation.SORTED_ARRAY):
+        if representation == PostingRepresentation.BITMAP:
+            return PostingList._from_values_as_bitmap(values, coding, codec)
+        if codec != PostingCodec.VARINT:
+            return PostingList._from_values_by_blocks(values, coding, codec)
+        coded_sequence = varint_codec.encode_values(values, coding)
+        posting_list = PostingList(coded_sequence, coding, length=len(values))
+        posting_list._last_element = int(values[-1]) if len(values) > 0 else 0
+        posting_list._blocks = PostingList._get_blocks_from_values(values, len(coded_sequence), coding)
+        return posting_list
+
+    @property
+    def last_element(self):
+        if self._last_element is None:
+            blocks_last_elements, _ = self._get_blocks()
+            self._last_element = int(blocks_last_elements[-1]) if len(blocks_last_elements) > 0 else 0
+        return self._last_element
+
+    @property
+    def skip_entries(self):
+        blocks_last_elements, blocks_end_offsets = self._get_blocks()
+        return (
+            varint_codec.encode_values(blocks_last_elements, self.coding) +
+            varint_codec.encode_values(blocks_end_offsets, self.coding)
+        )
+
+    @property
+    def blocks_last_elements(self):
+        return self._get_blocks()[0]
+
+    @property
+    def bitmap(self):
+        if self.representation != PostingRepresentation.BITMAP:
+            raise ValueError(f"Posting list with {self.representation.value} representation has no bitmap")
+        if self._bitmap is None:
+            self._bitmap = RoaringBitmap.from_bytes(self.coded_sequence)
+        return self._bitmap
+
+    def _get_blocks(self):
+        if self._blocks is not None:
+            return self._blocks
+        if self._skip_entries is not None:
+            skip_entries_gaps = varint_codec.decode_gaps(self._skip_entries, self.coding)
+            blocks_count = len(skip_entries_gaps) // 2
+            self._blocks = (
+                np.cumsum(skip_entries_gaps[:blocks_count]), np.cumsum(skip_entries_gaps[blocks_count:])
+            )
+        elif self.representation == PostingRepresentation.BITMAP:
+            decoded_values = self.decode_to_array()
+            self._length = len(decoded_values)
+            self._blocks = PostingList._get_bitmap_blocks_from_values(decoded_values)
+        else:
+            decoded_values = self.decode_to_array()
+            self._length = len(decoded_values)
+            self._blocks = PostingList._get_blocks_from_values(
+                decoded_values, len(self.coded_sequence), self.coding
+            )
+        return self._blocks
+
+    def __len__(self):
+        if self._length is None:
+            self._length = len(self.decode_to_array())
+        return self._length
 
     def _encode_value(self, value):
         if value <= 0:
@@ -21,42 +179,72 @@ class PostingList(object):
             value //= self.coding
         return coded_bytes[::-1]
 
-    def _decode_value(self, bytes_list):
-        encoded_value = 0
-        for coded_byte in bytes_list:
-            if coded_byte >= self.coding:
-                raise ValueError(f"Coded byte cannot exceed value of self.coding, but was: {coded_byte}")
-            encoded_value = encoded_value * self.coding + coded_byte
-        return encoded_value
-
     def decode_from_bytes_to_list(self, coded_sequence):
-        coded_value_bytes = []
-        coded_value_increases = []
-        for coded_byte in list(coded_sequence):
-            coded_value_bytes.append(coded_byte % self.coding)
-            if coded_byte >= self.coding:
-                coded_value = self._decode_value(coded_value_bytes)
-                coded_value_increases.append(coded_value)
-                coded_value_bytes = []
-        coded_values = []
-        for value_increase in coded_value_increases:
-            last_value = coded_values[-1] if len(coded_values) > 0 else 0
-            coded_values.append(last_value + value_increase)
-        return coded_values
+        return varint_codec.decode_values(coded_sequence, self.coding).tolist()
+
+    def decode_to_array(self):
+        if self.representation == PostingRepresentation.BITMAP:
+            return self.bitmap.to_array()
+        if self.codec == PostingCodec.VARINT:
+            return varint_codec.decode_values(self.coded_sequence, self.coding)
+        if self._blocks is None and self._skip_entries is None:
+            raise ValueError(f"Posting list coded with {self.codec.value} can't be decoded without skip entries")
+        blocks_count = len(self.blocks_last_elements)
+        if blocks_count == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.decode_block(block_index) for block_index in range(blocks_count)])
+
+    def _decode_bitmap_block(self, block_index):
+        blocks_last_elements = self.blocks_last_elements
+        block_start = int(blocks_last_elements[block_index - 1]) + 1 if block_index > 0 else 0
+        block_end = int(blocks_last_elements[block_index]) + 1
+        query_profiler.add_counter("postings_bytes_decoded", (block_end - block_start) // 8)
+        with query_profiler.profile_stage("decoding"):
+            return self.bitmap.get_range_values(block_start, block_end)
+
+    def decode_block(self, block_index):
+        if self.representation == PostingRepresentation.BITMAP:
+            return self._decode_bitmap_block(block_index)
+        blocks_last_elements, blocks_end_offsets = self._get_blocks()
+        start_offset = blocks_end_offsets[block_index - 1] if block_index > 0 else 0
+        first_element_base = blocks_last_elements[block_index - 1] if block_index > 0 else 0
+        coded_block = memoryview(self.coded_sequence)[start_offset:blocks_end_offsets[block_index]]
+        query_profiler.add_counter("postings_bytes_decoded", len(coded_block))
+        with query_profiler.profile_stage("decoding"):
+            return first_element_base + np.cumsum(posting_codecs.decode_gaps(coded_block, self.codec, self.coding))
 
     def append(self, document_id):
+        if self.representation != PostingRepresentation.SORTED_ARRAY:
+            raise ValueError(
+                f"Posting lists with {self.representation.value} representation can only be created as a whole"
+            )
+        if self.codec != PostingCodec.VARINT:
+            raise ValueError(f"Posting lists coded with {self.codec.value} can only be created as a whole")
         if document_id <= self.last_element:
             raise ValueError(f"Added document ID can't be less than the last document ID")
         value_increase = document_id - self.last_element
         coded_value_increase = self._encode_value(value_increase)
         coded_value_increase[-1] += self.coding
+        if not isinstance(self.coded_sequence, bytearray):
+            self.coded_sequence = bytearray(self.coded_sequence)
         self.coded_sequence += bytearray(coded_value_increase)
-        self.last_element = document_id
+        self._last_element = document_id
+        self._length = None if self._length is None else self._length + 1
+        self._skip_entries = None
+        self._blocks = None
 
     def append_if_not_equal_to_last_element(self, document_id):
         if self.last_element == document_id:
             return
         self.append(document_id)
 
+    def cursor(self):
+        return PostingListCursor(self)
+
+    def documents_cursor(self):
+        if self.representation == PostingRepresentation.BITMAP:
+            return self.bitmap.cursor()
+        return self.cursor()
+
     def decode_to_ordered_list(self):
-        return OrderedList(self.decode_from_bytes_to_list(self.coded_sequence))
+        return OrderedList(self.decode_to_array().tolist())
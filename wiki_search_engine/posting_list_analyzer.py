@@ -2,18 +2,17 @@ import itertools
 import logging
 from collections import defaultdict
 
-import numpy as np
-
 import utils
 
+from benchmark_utils import measure_seconds
+from posting_codec import PostingCodec
 from posting_list import PostingList
 
 
 def _create_terms_posting_lists(coding):
-    wiki_articles = utils.read_wiki_articles()
     words_base_forms = utils.read_words_base_forms()
     terms_posting_lists = defaultdict(lambda: PostingList(coding=coding))
-    for wiki_article in wiki_articles:
+    for wiki_article in utils.iter_wiki_articles():
         list_of_base_forms = utils.get_base_forms_from_article(words_base_forms, wiki_article, with_default_word=False)
         article_base_forms = set(itertools.chain(*list_of_base_forms))
         for base_form in article_base_forms:
@@ -29,20 +28,21 @@ def _count_int32_bytes_in_ordered_lists(ordered_lists):
     return sum([len(ordered_list.items) * 4 for ordered_list in ordered_lists])
 
 
-def _count_bytes_in_gamma_coding_list(ordered_list):
-    last_value = 0
-    total_bits = 0
-    for value in ordered_list:
-        increase_of_value = value - last_value
-        if increase_of_value == 0:
-            continue
-        total_bits += 2 * np.floor(np.log2(increase_of_value)) + 1
-        last_value = value
-    return int(np.ceil(total_bits / 8))
+def _decode_posting_lists(posting_lists):
+    for posting_list in posting_lists:
+        posting_list.decode_to_array()
 
 
-def _count_bytes_in_gamma_coding_lists(ordered_lists):
-    return sum([_count_bytes_in_gamma_coding_list(ordered_list) for ordered_list in ordered_lists])
+def _analyze_posting_codec(logger, terms_documents_ids, posting_codec):
+    posting_lists = [
+        PostingList.from_values(documents_ids, codec=posting_codec) for documents_ids in terms_documents_ids
+    ]
+    values_count = sum(len(documents_ids) for documents_ids in terms_documents_ids)
+    decoding_seconds = measure_seconds(_decode_posting_lists, posting_lists)
+    logger.info(
+        f"{posting_codec.value} posting lists: {_count_bytes_in_postings_lists(posting_lists)} bytes, "
+        f"decoding {values_count / decoding_seconds / 1e6:.2f}M values/s"
+    )
 
 
 def analyze_posting_lists():
@@ -56,11 +56,12 @@ def analyze_posting_lists():
     bytes_in_128_posting_lists = _count_bytes_in_postings_lists(postings_lists_128_coded)
     bytes_in_16_posting_lists = _count_bytes_in_postings_lists(postings_lists_16_coded)
     bytes_in_int32_lists = _count_int32_bytes_in_ordered_lists(ordered_lists)
-    bytes_in_gamma_coding_lists = _count_bytes_in_gamma_coding_lists(ordered_lists)
     logger.info(f"Bytes in 128 coded posting lists: {bytes_in_128_posting_lists}")
     logger.info(f"Bytes in 16 coded posting lists: {bytes_in_16_posting_lists}")
     logger.info(f"Bytes in int32 lists: {bytes_in_int32_lists}")
-    logger.info(f"Bytes in gamma coding lists: {bytes_in_gamma_coding_lists}")
+    terms_documents_ids = [ordered_list.items for ordered_list in ordered_lists]
+    for posting_codec in PostingCodec:
+        _analyze_posting_codec(logger, terms_documents_ids, posting_codec)
 
 
 if __name__ == "__main__":
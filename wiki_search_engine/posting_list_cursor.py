@@ -0,0 +1,81 @@
+from ordered_list import gallop_to
+
+
+class PostingListCursor(object):
+    def __init__(self, posting_list):
+        self.posting_list = posting_list
+        self.blocks_last_elements = posting_list.blocks_last_elements.tolist()
+        self.current = None
+        self._block_index = -1
+        self._block_values = []
+        self._block_position = 0
+        self._load_block(0)
+
+    def __len__(self):
+        return len(self.posting_list)
+
+    def _load_block(self, block_index):
+        self._block_index = block_index
+        self._block_position = 0
+        if block_index >= len(self.blocks_last_elements):
+            self._block_values = []
+            self.current = None
+            return
+        self._block_values = self.posting_list.decode_block(block_index).tolist()
+        self.current = self._block_values[0]
+
+    def advance(self):
+        if self.current is None:
+            return None
+        self._block_position += 1
+        if self._block_position == len(self._block_values):
+            self._load_block(self._block_index + 1)
+        else:
+            self.current = self._block_values[self._block_position]
+        return self.current
+
+    def skip_to(self, value):
+        if self.current is None or self.current >= value:
+            return self.current
+        if value > self.blocks_last_elements[self._block_index]:
+            self._load_block(gallop_to(self.blocks_last_elements, value, self._block_index + 1))
+            if self.current is None:
+                return None
+        self._block_position = gallop_to(self._block_values, value, self._block_position)
+        self.current = self._block_values[self._block_position]
+        return self.current
+
+
+class BlockDataPostingListCursor(PostingListCursor):
+    def __init__(self, posting_list, decode_block_data):
+        self._decode_block_data = decode_block_data
+        self._block_data = None
+        super().__init__(posting_list)
+
+    def _load_block(self, block_index):
+        self._block_data = None
+        super()._load_block(block_index)
+
+    def _get_block_data(self):
+        if self._block_data is None:
+            self._block_data = self._decode_block_data(self._block_index)
+        return self._block_data
+
+
+class PositionalPostingListCursor(BlockDataPostingListCursor):
+    def __init__(self, posting_list):
+        super().__init__(posting_list, posting_list.decode_positions_block)
+
+    def positions(self):
+        block_positions, block_positions_bounds = self._get_block_data()
+        positions_start = block_positions_bounds[self._block_position]
+        positions_end = block_positions_bounds[self._block_position + 1]
+        return block_positions[positions_start:positions_end]
+
+
+class FrequenciesPostingListCursor(BlockDataPostingListCursor):
+    def __init__(self, posting_list):
+        super().__init__(posting_list, posting_list.decode_frequencies_block)
+
+    def frequencies(self):
+        return self._get_block_data()[self._block_position]
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class PostingRepresentation(Enum):
+    SORTED_ARRAY = "SORTED_ARRAY"
+    BITMAP = "BITMAP"
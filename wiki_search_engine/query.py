@@ -17,4 +17,11 @@ class QueryPart(object):
 @attr.s
 class Query(object):
     raw_query = attr.ib()
-    query_parts = attr.ib()
\ No newline at end of file
+    query_parts = attr.ib()
+
+
+@attr.s
+class SearchResults(object):
+    wiki_articles = attr.ib()
+    ratings = attr.ib()
+    query_terms_ids = attr.ib()
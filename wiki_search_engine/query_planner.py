@@ -0,0 +1,50 @@
+import attr
+
+from merge_engine import IntersectionCursor, PhraseCursor, create_documents_intersection_cursor
+from query import QueryType
+
+PHRASE_VERIFICATION_COST = 4
+
+
+@attr.s(frozen=True)
+class QueryPartPlan(object):
+    query_type = attr.ib()
+    words_cursors = attr.ib()
+
+    @property
+    def estimated_documents(self):
+        return min([len(cursor) for cursor in self.words_cursors], default=0)
+
+    @property
+    def filter_cost(self):
+        verification_cost = PHRASE_VERIFICATION_COST if self.query_type == QueryType.PHRASE else 1
+        return self.estimated_documents * max(len(self.words_cursors), 1) * verification_cost
+
+    def create_cursor(self, start_value=None):
+        if self.query_type == QueryType.PHRASE:
+            return PhraseCursor(self.words_cursors, start_value)
+        return create_documents_intersection_cursor(self.words_cursors, start_value)
+
+
+def plan_query_parts(parts_plans):
+    if len(parts_plans) == 0:
+        return []
+    leading_part_index = min(range(len(parts_plans)), key=lambda x: parts_plans[x].estimated_documents)
+    filters_parts_plans = sorted(
+        [part_plan for index, part_plan in enumerate(parts_plans) if index != leading_part_index],
+        key=lambda x: x.filter_cost
+    )
+    return [parts_plans[leading_part_index]] + filters_parts_plans
+
+
+def create_planned_cursor(parts_plans):
+    planned_parts = plan_query_parts(parts_plans)
+    if len(planned_parts) == 0:
+        return IntersectionCursor([])
+    leading_part, *filters_parts = planned_parts
+    leading_cursor = leading_part.create_cursor()
+    if leading_cursor.current is None:
+        return leading_cursor
+    return IntersectionCursor(
+        [leading_cursor] + [part_plan.create_cursor(leading_cursor.current) for part_plan in filters_parts]
+    )
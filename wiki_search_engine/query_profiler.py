@@ -0,0 +1,246 @@
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import attr
+
+from code_profiler import CodeProfiler
+
+CACHE_HITS_COUNTER_SUFFIX = "_cache_hits"
+CACHE_MISSES_COUNTER_SUFFIX = "_cache_misses"
+DEFAULT_SAMPLING_INTERVAL_SECONDS = 0.005
+
+_profiling_state = threading.local()
+_inactive_stage = contextlib.nullcontext()
+_active_profilers_count = 0
+_active_profilers_lock = threading.Lock()
+
+
+@attr.s
+class StageTimes(object):
+    calls = attr.ib(default=0)
+    wall_seconds = attr.ib(default=0.0)
+    cpu_seconds = attr.ib(default=0.0)
+
+
+@attr.s
+class _ActiveStage(object):
+    name = attr.ib()
+    wall_start = attr.ib()
+    cpu_start = attr.ib()
+    children_wall_seconds = attr.ib(default=0.0)
+    children_cpu_seconds = attr.ib(default=0.0)
+
+
+def _get_cache_hit_rates(counters):
+    cache_hit_rates = {}
+    for counter_name, hits in counters.items():
+        if not counter_name.endswith(CACHE_HITS_COUNTER_SUFFIX):
+            continue
+        cache_name = counter_name[:-len(CACHE_HITS_COUNTER_SUFFIX)]
+        lookups = hits + counters.get(cache_name + CACHE_MISSES_COUNTER_SUFFIX, 0)
+        cache_hit_rates[cache_name] = hits / lookups if lookups > 0 else 0.0
+    return cache_hit_rates
+
+
+class QueryProfiler(object):
+    def __init__(self):
+        self.stages = defaultdict(StageTimes)
+        self.counters = Counter()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self._active_stages = []
+        self._previous_profiler = None
+
+    def __enter__(self):
+        global _active_profilers_count
+        with _active_profilers_lock:
+            _active_profilers_count += 1
+        self._previous_profiler = get_active_profiler()
+        _profiling_state.profiler = self
+        self._active_stages.append(_ActiveStage(None, time.perf_counter(), time.thread_time()))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        query_stage = self._active_stages.pop()
+        self.wall_seconds += time.perf_counter() - query_stage.wall_start
+        self.cpu_seconds += time.thread_time() - query_stage.cpu_start
+        _profiling_state.profiler = self._previous_profiler
+        global _active_profilers_count
+        with _active_profilers_lock:
+            _active_profilers_count -= 1
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        active_stage = _ActiveStage(name, time.perf_counter(), time.thread_time())
+        self._active_stages.append(active_stage)
+        try:
+            yield
+        finally:
+            self._active_stages.pop()
+            wall_seconds = time.perf_counter() - active_stage.wall_start
+            cpu_seconds = time.thread_time() - active_stage.cpu_start
+            stage_times = self.stages[name]
+            stage_times.calls += 1
+            stage_times.wall_seconds += wall_seconds - active_stage.children_wall_seconds
+            stage_times.cpu_seconds += cpu_seconds - active_stage.children_cpu_seconds
+            if len(self._active_stages) > 0:
+                self._active_stages[-1].children_wall_seconds += wall_seconds
+                self._active_stages[-1].children_cpu_seconds += cpu_seconds
+
+    def add_counter(self, name, value=1):
+        self.counters[name] += value
+
+    def get_report(self):
+        return {
+            "wall_ms": self.wall_seconds * 1000,
+            "cpu_ms": self.cpu_seconds * 1000,
+            "stages": {
+                name: {
+                    "calls": stage_times.calls,
+                    "wall_ms": stage_times.wall_seconds * 1000,
+                    "cpu_ms": stage_times.cpu_seconds * 1000,
+                }
+                for name, stage_times in sorted(self.stages.items(), key=lambda x: -x[1].wall_seconds)
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "cache_hit_rates": _get_cache_hit_rates(self.counters),
+        }
+
+
+class ProfileSummary(object):
+    def __init__(self):
+        self.queries = 0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.stages = defaultdict(lambda: {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0})
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def add_report(self, report):
+        with self._lock:
+            self.queries += 1
+            self.wall_ms += report["wall_ms"]
+            self.cpu_ms += report["cpu_ms"]
+            for name, stage_report in report["stages"].items():
+                for key, value in stage_report.items():
+                    self.stages[name][key] += value
+            self.counters.update(report["counters"])
+
+    def get_summary(self):
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "wall_ms": self.wall_ms,
+                "cpu_ms": self.cpu_ms,
+                "mean_wall_ms": self.wall_ms / self.queries if self.queries > 0 else 0.0,
+                "stages": {
+                    name: dict(stage_report, wall_share=stage_report["wall_ms"] / max(self.wall_ms, 1e-9))
+                    for name, stage_report in sorted(self.stages.items(), key=lambda x: -x[1]["wall_ms"])
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "cache_hit_rates": _get_cache_hit_rates(self.counters),
+            }
+
+
+class StackSampler(object):
+    def __init__(self, thread_id, interval_seconds=DEFAULT_SAMPLING_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks_counts = Counter()
+        self._stop_event = threading.Event()
+        self._sampling_thread = threading.Thread(target=self._sample, daemon=True)
+
+    @staticmethod
+    def _get_collapsed_stack(frame):
+        stack = []
+        while frame is not None:
+            stack.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks_counts[self._get_collapsed_stack(frame)] += 1
+
+    def start(self):
+        self._sampling_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._sampling_thread.join()
+
+    def dump_stacks(self, path):
+        with open(path, "w") as stream:
+            for stack, count in self.stacks_counts.most_common():
+                stream.write(f"{stack} {count}\n")
+
+
+def get_active_profiler():
+    return getattr(_profiling_state, "profiler", None)
+
+
+def profile_stage(name):
+    if _active_profilers_count == 0:
+        return _inactive_stage
+    profiler = getattr(_profiling_state, "profiler", None)
+    return profiler.stage(name) if profiler is not None else _inactive_stage
+
+
+def add_counter(name, value=1):
+    if _active_profilers_count == 0:
+        return
+    profiler = getattr(_profiling_state, "profiler", None)
+    if profiler is not None:
+        profiler.add_counter(name, value)
+
+
+def add_cache_lookups(cache_name, hits, misses):
+    if _active_profilers_count == 0:
+        return
+    profiler = getattr(_profiling_state, "profiler", None)
+    if profiler is not None:
+        profiler.add_counter(cache_name + CACHE_HITS_COUNTER_SUFFIX, hits)
+        profiler.add_counter(cache_name + CACHE_MISSES_COUNTER_SUFFIX, misses)
+
+
+def log_query_report(logger, raw_query, report):
+    logger.info(f"Query profile: {json.dumps(dict(query=raw_query, **report))}")
+
+
+def log_profile_summary(logger, summary):
+    logger.info(f"Queries profile summary: {json.dumps(summary)}")
+
+
+def profile_query(enabled):
+    return QueryProfiler() if enabled else _inactive_stage
+
+
+@contextlib.contextmanager
+def code_profiling(code_profiler, output_path):
+    if code_profiler == CodeProfiler.NONE:
+        yield
+    elif code_profiler == CodeProfiler.CPROFILE:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output_path)
+    elif code_profiler == CodeProfiler.SAMPLING:
+        stack_sampler = StackSampler(threading.get_ident())
+        stack_sampler.start()
+        try:
+            yield
+        finally:
+            stack_sampler.stop()
+            stack_sampler.dump_stacks(output_path)
+    else:
+        raise ValueError(f"Invalid code_profiler: {code_profiler}")
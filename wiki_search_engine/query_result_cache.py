@@ -0,0 +1,136 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+from bounded_lru_cache import BoundedLruCache
+
+
+class QueryResultCache(object):
+    DEFAULT_CACHE_SIZE_BYTES = 64 * 2 ** 20
+    CACHE_ENTRY_OVERHEAD_BYTES = 128
+    RANKED_DOCUMENT_SIZE_BYTES = 120
+    DISK_CACHE_TIMEOUT_SECONDS = 30
+    DISK_CACHE_MAX_ENTRIES = 2 ** 18
+    DISK_CACHE_PRUNE_INTERVAL = 1024
+
+    def __init__(self, max_size_bytes=DEFAULT_CACHE_SIZE_BYTES, disk_cache_path=None):
+        self._memory_cache = BoundedLruCache(max_size_bytes)
+        self._index_version = None
+        self._lock = threading.Lock()
+        self._disk_connection = None
+        self._disk_puts_count = 0
+        if disk_cache_path is not None:
+            self._disk_connection = sqlite3.connect(
+                disk_cache_path, timeout=self.DISK_CACHE_TIMEOUT_SECONDS, check_same_thread=False
+            )
+            self._disk_connection.execute("PRAGMA journal_mode = WAL")
+            self._disk_connection.execute("PRAGMA synchronous = OFF")
+            self._disk_connection.execute("""
+                CREATE TABLE IF NOT EXISTS query_results (
+                    query_key TEXT, index_version TEXT, ranked_documents TEXT, write_time REAL,
+                    PRIMARY KEY (query_key, index_version)
+                )
+            """)
+            self._disk_connection.execute(
+                "CREATE INDEX IF NOT EXISTS query_results_write_time ON query_results (write_time)"
+            )
+            self._prune_disk_cache()
+            self._disk_connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _encode_query_key(query_key):
+        return json.dumps(query_key, separators=(",", ":"))
+
+    def _get_ranked_documents_size(self, query_key, ranked_documents):
+        return (
+            sys.getsizeof(query_key) + len(ranked_documents) * self.RANKED_DOCUMENT_SIZE_BYTES +
+            self.CACHE_ENTRY_OVERHEAD_BYTES
+        )
+
+    def _set_index_version(self, index_version):
+        with self._lock:
+            if index_version == self._index_version:
+                return
+            self._memory_cache.clear()
+            self._index_version = index_version
+
+    def _prune_disk_cache(self):
+        self._disk_connection.execute(
+            """
+            DELETE FROM query_results WHERE write_time < (
+                SELECT write_time FROM query_results ORDER BY write_time DESC LIMIT 1 OFFSET ?
+            )
+            """,
+            (self.DISK_CACHE_MAX_ENTRIES - 1, )
+        )
+
+    def _get_from_disk(self, index_version, query_key):
+        with self._lock:
+            ranked_documents_row = self._disk_connection.execute(
+                "SELECT ranked_documents FROM query_results WHERE query_key = ? AND index_version = ?",
+                (self._encode_query_key(query_key), index_version)
+            ).fetchone()
+        if ranked_documents_row is None:
+            return None
+        return [(document_id, rating) for document_id, rating in json.loads(ranked_documents_row[0])]
+
+    def _put_to_disk(self, index_version, query_key, ranked_documents):
+        encoded_ranked_documents = json.dumps(
+            [(document_id, float(rating)) for document_id, rating in ranked_documents]
+        )
+        with self._lock:
+            self._disk_connection.execute(
+                """
+                INSERT OR REPLACE INTO query_results (query_key, index_version, ranked_documents, write_time)
+                VALUES (?, ?, ?, ?)
+                """,
+                (self._encode_query_key(query_key), index_version, encoded_ranked_documents, time.time())
+            )
+            self._disk_puts_count += 1
+            if self._disk_puts_count % self.DISK_CACHE_PRUNE_INTERVAL == 0:
+                self._prune_disk_cache()
+            self._disk_connection.commit()
+
+    def get(self, index_version, query_key):
+        self._set_index_version(index_version)
+        ranked_documents = self._memory_cache.get(query_key)
+        if ranked_documents is not None or self._disk_connection is None:
+            return ranked_documents
+        ranked_documents = self._get_from_disk(index_version, query_key)
+        if ranked_documents is not None:
+            self._memory_cache.put(
+                query_key, ranked_documents, self._get_ranked_documents_size(query_key, ranked_documents)
+            )
+        return ranked_documents
+
+    def put(self, index_version, query_key, ranked_documents):
+        self._set_index_version(index_version)
+        self._memory_cache.put(
+            query_key, ranked_documents, self._get_ranked_documents_size(query_key, ranked_documents)
+        )
+        if self._disk_connection is not None:
+            self._put_to_disk(index_version, query_key, ranked_documents)
+
+    def clear(self):
+        self._memory_cache.clear()
+        if self._disk_connection is not None:
+            with self._lock:
+                self._disk_connection.execute("DELETE FROM query_results")
+                self._disk_connection.commit()
+
+    @property
+    def stats(self):
+        return self._memory_cache.stats
+
+    def close(self):
+        if self._disk_connection is not None:
+            self._disk_connection.close()
+            self._disk_connection = None
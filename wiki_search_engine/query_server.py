@@ -0,0 +1,179 @@
+import argparse
+import concurrent.futures
+import http.server
+import json
+import time
+import urllib.parse
+
+import attr
+
+import query_profiler
+import utils
+from caching_index_storage import CachingIndexStorage, get_index_storage_class, open_caching_index_storages
+from index_query import parse_query, search
+from index_type import IndexType
+from query_result_cache import QueryResultCache
+from storage_backend import StorageBackend
+
+REQUEST_QUEUE_SIZE = 128
+
+
+@attr.s(frozen=True)
+class SearchContext(object):
+    index_type = attr.ib()
+    traditional_index_storage = attr.ib()
+    positional_index_storage = attr.ib()
+    terms_identifiers = attr.ib()
+    max_results = attr.ib()
+    result_cache = attr.ib()
+    profile_summary = attr.ib()
+
+
+class ThreadPoolHttpServer(http.server.HTTPServer):
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def __init__(self, server_address, request_handler_class, search_context, workers):
+        super().__init__(server_address, request_handler_class)
+        self.search_context = search_context
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request_in_worker, request, client_address)
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+        self.search_context.traditional_index_storage.close()
+        self.search_context.positional_index_storage.close()
+        self.search_context.result_cache.close()
+
+
+class QueryRequestHandler(http.server.BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        encoded_body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def _search(self, raw_query, max_results):
+        search_context = self.server.search_context
+        start_time = time.perf_counter()
+        with query_profiler.profile_query(search_context.profile_summary is not None) as profiler:
+            search_results = search(
+                parse_query(raw_query, search_context.index_type), search_context.index_type,
+                search_context.traditional_index_storage, search_context.positional_index_storage,
+                search_context.terms_identifiers, max_results, search_context.result_cache
+            )
+        if profiler is not None:
+            profile_report = profiler.get_report()
+            query_profiler.log_query_report(utils.get_default_logger(), raw_query, profile_report)
+            search_context.profile_summary.add_report(profile_report)
+        return {
+            "query": raw_query,
+            "results": [
+                {"id": wiki_article.id, "title": wiki_article.title, "rating": float(rating)}
+                for wiki_article, rating in zip(search_results.wiki_articles, search_results.ratings)
+            ],
+            "latency_ms": (time.perf_counter() - start_time) * 1000,
+        }
+
+    def _get_cache_stats(self):
+        search_context = self.server.search_context
+        return {
+            index_storage_name: {pool_name: attr.asdict(stats) for pool_name, stats in cache_stats.items()}
+            for index_storage_name, cache_stats in [
+                ("traditional", search_context.traditional_index_storage.get_cache_stats()),
+                ("positional", search_context.positional_index_storage.get_cache_stats()),
+                ("query_results", {"results": search_context.result_cache.stats}),
+            ]
+        }
+
+    def do_GET(self):
+        parsed_url = urllib.parse.urlparse(self.path)
+        parameters = urllib.parse.parse_qs(parsed_url.query)
+        if parsed_url.path == "/search":
+            raw_query = parameters.get("q", [""])[0]
+            max_results = parameters.get("max_results", [str(self.server.search_context.max_results)])[0]
+            if len(raw_query.strip()) == 0 or not max_results.isdigit():
+                self._send_json(400, {"error": "Expected a non-empty q and a non-negative integer max_results"})
+            else:
+                self._send_json(200, self._search(raw_query, int(max_results)))
+        elif parsed_url.path == "/stats":
+            self._send_json(200, self._get_cache_stats())
+        elif parsed_url.path == "/profile" and self.server.search_context.profile_summary is not None:
+            self._send_json(200, self.server.search_context.profile_summary.get_summary())
+        else:
+            self._send_json(404, {"error": f"Unknown path: {parsed_url.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_query_server(index_type, use_terms_clusters, storage_backend=StorageBackend.SQLITE, max_results=10,
+                        cache_size_mb=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20, host="127.0.0.1",
+                        port=8000, workers=8,
+                        result_cache_size_mb=QueryResultCache.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20,
+                        result_cache_path=None, profile=False):
+    traditional_index_storage, positional_index_storage = open_caching_index_storages(
+        get_index_storage_class(storage_backend), use_terms_clusters, cache_size_mb * 2 ** 20, read_only=True
+    )
+    search_context = SearchContext(
+        index_type=index_type,
+        traditional_index_storage=traditional_index_storage,
+        positional_index_storage=positional_index_storage,
+        terms_identifiers=utils.get_terms_identifiers(use_terms_clusters),
+        max_results=max_results,
+        result_cache=QueryResultCache(result_cache_size_mb * 2 ** 20, result_cache_path),
+        profile_summary=query_profiler.ProfileSummary() if profile else None
+    )
+    return ThreadPoolHttpServer((host, port), QueryRequestHandler, search_context, workers)
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-index_type", type=IndexType, choices=list(IndexType.__dict__.values()))
+    parser.add_argument("--use_terms_clusters", type=bool, default=False)
+    parser.add_argument(
+        "--storage_backend", type=StorageBackend, choices=list(StorageBackend), default=StorageBackend.SQLITE
+    )
+    parser.add_argument("--max_results", type=int, default=10)
+    parser.add_argument("--cache_size_mb", type=int, default=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--result_cache_size_mb", type=int, default=QueryResultCache.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20
+    )
+    parser.add_argument("--result_cache_path", type=str, default=None)
+    parser.add_argument("--profile", type=bool, default=False)
+    return vars(parser.parse_args())
+
+
+def run_query_server(index_type, use_terms_clusters, storage_backend=StorageBackend.SQLITE, max_results=10,
+                     cache_size_mb=CachingIndexStorage.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20, host="127.0.0.1",
+                     port=8000, workers=8, result_cache_size_mb=QueryResultCache.DEFAULT_CACHE_SIZE_BYTES // 2 ** 20,
+                     result_cache_path=None, profile=False):
+    logger = utils.get_default_logger()
+    with create_query_server(
+        index_type, use_terms_clusters, storage_backend, max_results, cache_size_mb, host, port, workers,
+        result_cache_size_mb, result_cache_path, profile
+    ) as query_server:
+        logger.info(f"Serving queries on http://{host}:{port}/search?q=... with {workers} workers")
+        try:
+            query_server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+
+
+if __name__ == "__main__":
+    run_query_server(**_parse_input_arguments())
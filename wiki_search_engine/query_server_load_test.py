@@ -0,0 +1,64 @@
+import argparse
+import concurrent.futures
+import json
+import time
+import urllib.parse
+import urllib.request
+
+import utils
+from batch_query import get_throughput_summary
+
+
+def _read_queries(queries_path):
+    with open(queries_path) as stream:
+        return [line.rstrip("\n") for line in stream if len(line.strip()) > 0]
+
+
+def _send_search_request(server_url, raw_query, max_results):
+    search_url = f"{server_url}/search?" + urllib.parse.urlencode({"q": raw_query, "max_results": max_results})
+    start_time = time.perf_counter()
+    with urllib.request.urlopen(search_url) as response:
+        json.loads(response.read())
+    return (time.perf_counter() - start_time) * 1000
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-queries_path", type=str)
+    parser.add_argument("--server_url", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests_count", type=int, default=1_000)
+    parser.add_argument("--max_results", type=int, default=10)
+    return vars(parser.parse_args())
+
+
+def run_query_server_load_test(queries_path, server_url="http://127.0.0.1:8000", clients=16, requests_count=1_000,
+                               max_results=10):
+    logger = utils.get_default_logger()
+    queries = _read_queries(queries_path)
+    requests_queries = [queries[i % len(queries)] for i in range(requests_count)]
+    latencies_ms = []
+    failed_requests_count = 0
+    start_time = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(clients) as executor:
+        requests_futures = [
+            executor.submit(_send_search_request, server_url, raw_query, max_results) for raw_query in requests_queries
+        ]
+        for request_future in concurrent.futures.as_completed(requests_futures):
+            try:
+                latencies_ms.append(request_future.result())
+            except OSError as error:
+                failed_requests_count += 1
+                logger.warning(f"Request failed: {error}")
+    summary = get_throughput_summary(latencies_ms, time.perf_counter() - start_time)
+    summary["failed_requests"] = failed_requests_count
+    logger.info(
+        f"Sent {requests_count} requests from {clients} clients in {summary['total_seconds']:.2f} s: "
+        f"{summary['queries_per_second']:.1f} queries/s, p50 {summary['p50_ms']:.2f} ms, "
+        f"p95 {summary['p95_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, {failed_requests_count} failed"
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    run_query_server_load_test(**_parse_input_arguments())
@@ -0,0 +1,250 @@
+import numpy as np
+
+from ordered_list import gallop_to
+
+CONTAINER_BITS = 16
+CONTAINER_MASK = (1 << CONTAINER_BITS) - 1
+ARRAY_CONTAINER_MAX_SIZE = 4096
+BITMAP_CONTAINER_WORDS = (1 << CONTAINER_BITS) // 64
+CONTAINERS_ALIGNMENT = 8
+HEADER_DTYPE = np.dtype("<i8")
+ARRAY_CONTAINER_DTYPE = np.dtype("<u2")
+BITMAP_CONTAINER_DTYPE = np.dtype("<u8")
+BYTES_POPCOUNTS = np.array([bin(x).count("1") for x in range(256)], dtype=np.uint8)
+
+
+def _get_aligned_length(length):
+    return -(-length // CONTAINERS_ALIGNMENT) * CONTAINERS_ALIGNMENT
+
+
+def _is_bitmap_container(container):
+    return container.dtype == BITMAP_CONTAINER_DTYPE
+
+
+def _get_bitmap_cardinality(bitmap_words):
+    return int(BYTES_POPCOUNTS[bitmap_words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _bitmap_to_array(bitmap_words):
+    return np.flatnonzero(np.unpackbits(bitmap_words.view(np.uint8), bitorder="little")).astype(ARRAY_CONTAINER_DTYPE)
+
+
+def _array_to_bitmap(values):
+    bitmap_words = np.zeros(BITMAP_CONTAINER_WORDS, dtype=BITMAP_CONTAINER_DTYPE)
+    np.bitwise_or.at(
+        bitmap_words, values >> 6, np.left_shift(np.uint64(1), (values & 63).astype(BITMAP_CONTAINER_DTYPE))
+    )
+    return bitmap_words
+
+
+def _create_container(values):
+    return _array_to_bitmap(values) if len(values) > ARRAY_CONTAINER_MAX_SIZE else values
+
+
+def _create_container_from_bitmap(bitmap_words):
+    if _get_bitmap_cardinality(bitmap_words) > ARRAY_CONTAINER_MAX_SIZE:
+        return bitmap_words
+    return _bitmap_to_array(bitmap_words)
+
+
+def _get_container_values(container):
+    return _bitmap_to_array(container) if _is_bitmap_container(container) else container
+
+
+def _get_container_cardinality(container):
+    return _get_bitmap_cardinality(container) if _is_bitmap_container(container) else len(container)
+
+
+def _contains_in_bitmap(bitmap_words, values):
+    return (bitmap_words[values >> 6] >> (values & 63).astype(BITMAP_CONTAINER_DTYPE)) & np.uint64(1) == 1
+
+
+def _intersect_containers(first_container, second_container):
+    if _is_bitmap_container(first_container) and _is_bitmap_container(second_container):
+        return _create_container_from_bitmap(first_container & second_container)
+    if _is_bitmap_container(first_container):
+        return second_container[_contains_in_bitmap(first_container, second_container)]
+    if _is_bitmap_container(second_container):
+        return first_container[_contains_in_bitmap(second_container, first_container)]
+    return np.intersect1d(first_container, second_container, assume_unique=True)
+
+
+def _unite_containers(first_container, second_container):
+    if _is_bitmap_container(first_container) and _is_bitmap_container(second_container):
+        return first_container | second_container
+    if _is_bitmap_container(first_container) or _is_bitmap_container(second_container):
+        bitmap_container, array_container = sorted(
+            (first_container, second_container), key=lambda x: not _is_bitmap_container(x)
+        )
+        return bitmap_container | _array_to_bitmap(array_container)
+    return _create_container(np.union1d(first_container, second_container).astype(ARRAY_CONTAINER_DTYPE))
+
+
+class RoaringBitmap(object):
+    def __init__(self, keys=None, containers=None):
+        self.keys = keys if keys is not None else np.zeros(0, dtype=np.int64)
+        self.containers = containers if containers is not None else []
+        self._length = None
+
+    @staticmethod
+    def from_values(values):
+        values = np.asarray(values, dtype=np.int64)
+        if len(values) > 0 and (values[0] < 0 or np.any(np.diff(values) <= 0)):
+            raise ValueError("Values of a bitmap must be non-negative and strictly increasing")
+        keys, keys_starts = np.unique(values >> CONTAINER_BITS, return_index=True)
+        low_values = (values & CONTAINER_MASK).astype(ARRAY_CONTAINER_DTYPE)
+        return RoaringBitmap(keys, [
+            _create_container(container_values) for container_values in np.split(low_values, keys_starts[1:])
+        ] if len(values) > 0 else [])
+
+    @staticmethod
+    def from_bytes(coded_bitmap):
+        containers_count = int(np.frombuffer(coded_bitmap, dtype=HEADER_DTYPE, count=1)[0])
+        header = np.frombuffer(coded_bitmap, dtype=HEADER_DTYPE, count=1 + 2 * containers_count)
+        keys, cardinalities = header[1:1 + containers_count], header[1 + containers_count:].tolist()
+        offset = header.nbytes
+        containers = []
+        for cardinality in cardinalities:
+            if cardinality > ARRAY_CONTAINER_MAX_SIZE:
+                containers.append(np.frombuffer(
+                    coded_bitmap, dtype=BITMAP_CONTAINER_DTYPE, count=BITMAP_CONTAINER_WORDS, offset=offset
+                ))
+            else:
+                containers.append(
+                    np.frombuffer(coded_bitmap, dtype=ARRAY_CONTAINER_DTYPE, count=cardinality, offset=offset)
+                )
+            offset += _get_aligned_length(containers[-1].nbytes)
+        bitmap = RoaringBitmap(keys.astype(np.int64), containers)
+        bitmap._length = sum(cardinalities)
+        return bitmap
+
+    def to_bytes(self):
+        cardinalities = [_get_container_cardinality(container) for container in self.containers]
+        header = np.concatenate(([len(self.containers)], self.keys, cardinalities)).astype(HEADER_DTYPE)
+        return b"".join([header.tobytes()] + [
+            container.tobytes() + bytes(_get_aligned_length(container.nbytes) - container.nbytes)
+            for container in self.containers
+        ])
+
+    def __len__(self):
+        if self._length is None:
+            self._length = sum(_get_container_cardinality(container) for container in self.containers)
+        return self._length
+
+    def __contains__(self, value):
+        container_index = int(np.searchsorted(self.keys, value >> CONTAINER_BITS))
+        if container_index == len(self.keys) or self.keys[container_index] != value >> CONTAINER_BITS:
+            return False
+        container = self.containers[container_index]
+        low_value = np.array([value & CONTAINER_MASK], dtype=ARRAY_CONTAINER_DTYPE)
+        if _is_bitmap_container(container):
+            return bool(_contains_in_bitmap(container, low_value)[0])
+        low_value_index = int(np.searchsorted(container, low_value[0]))
+        return low_value_index < len(container) and container[low_value_index] == low_value[0]
+
+    def __and__(self, other):
+        if not isinstance(other, RoaringBitmap):
+            other = RoaringBitmap.from_values(other)
+        keys, self_indexes, other_indexes = np.intersect1d(self.keys, other.keys, return_indices=True)
+        keys_containers = [
+            (key, _intersect_containers(self.containers[self_index], other.containers[other_index]))
+            for key, self_index, other_index in zip(keys.tolist(), self_indexes.tolist(), other_indexes.tolist())
+        ]
+        keys_containers = [(key, container) for key, container in keys_containers if len(container) > 0]
+        return RoaringBitmap(
+            np.array([key for key, _ in keys_containers], dtype=np.int64),
+            [container for _, container in keys_containers]
+        )
+
+    def __or__(self, other):
+        if not isinstance(other, RoaringBitmap):
+            other = RoaringBitmap.from_values(other)
+        keys_containers = dict(zip(self.keys.tolist(), self.containers))
+        for key, container in zip(other.keys.tolist(), other.containers):
+            keys_containers[key] = (
+                _unite_containers(keys_containers[key], container) if key in keys_containers else container
+            )
+        keys = sorted(keys_containers)
+        return RoaringBitmap(np.array(keys, dtype=np.int64), [keys_containers[key] for key in keys])
+
+    def get_container_values(self, container_index):
+        return (int(self.keys[container_index]) << CONTAINER_BITS) + _get_container_values(
+            self.containers[container_index]
+        ).astype(np.int64)
+
+    def get_range_values(self, start, end):
+        first_index, last_index = np.searchsorted(
+            self.keys, [start >> CONTAINER_BITS, (end - 1) >> CONTAINER_BITS], side="left"
+        ).tolist()
+        range_values = []
+        for container_index in range(first_index, min(last_index + 1, len(self.keys))):
+            container_base = int(self.keys[container_index]) << CONTAINER_BITS
+            container = self.containers[container_index]
+            low_start, low_end = max(start - container_base, 0), min(end - container_base, 1 << CONTAINER_BITS)
+            if low_start >= low_end:
+                continue
+            if _is_bitmap_container(container):
+                first_word, last_word = low_start // 64, -(-low_end // 64)
+                words_bits = np.unpackbits(container[first_word:last_word].view(np.uint8), bitorder="little")
+                low_values = np.flatnonzero(words_bits) + first_word * 64
+                low_values = low_values[(low_values >= low_start) & (low_values < low_end)]
+            else:
+                low_values = container[np.searchsorted(container, low_start):np.searchsorted(container, low_end)]
+            range_values.append(container_base + low_values.astype(np.int64))
+        return np.concatenate(range_values) if len(range_values) > 0 else np.zeros(0, dtype=np.int64)
+
+    def to_array(self):
+        if len(self.containers) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.get_container_values(index) for index in range(len(self.containers))])
+
+    def cursor(self):
+        return RoaringBitmapCursor(self)
+
+
+class RoaringBitmapCursor(object):
+    def __init__(self, bitmap):
+        self.bitmap = bitmap
+        self.keys = bitmap.keys.tolist()
+        self.current = None
+        self._container_index = -1
+        self._container_values = []
+        self._container_position = 0
+        self._load_container(0)
+
+    def __len__(self):
+        return len(self.bitmap)
+
+    def _load_container(self, container_index):
+        self._container_index = container_index
+        self._container_position = 0
+        if container_index >= len(self.keys):
+            self._container_values = []
+            self.current = None
+            return
+        self._container_values = self.bitmap.get_container_values(container_index).tolist()
+        self.current = self._container_values[0]
+
+    def advance(self):
+        if self.current is None:
+            return None
+        self._container_position += 1
+        if self._container_position == len(self._container_values):
+            self._load_container(self._container_index + 1)
+        else:
+            self.current = self._container_values[self._container_position]
+        return self.current
+
+    def skip_to(self, value):
+        if self.current is None or self.current >= value:
+            return self.current
+        if value > self._container_values[-1]:
+            self._load_container(gallop_to(self.keys, value >> CONTAINER_BITS, self._container_index + 1))
+            if self.current is None or self.current >= value:
+                return self.current
+        self._container_position = gallop_to(self._container_values, value, self._container_position)
+        if self._container_position == len(self._container_values):
+            self._load_container(self._container_index + 1)
+        else:
+            self.current = self._container_values[self._container_position]
+        return self.current
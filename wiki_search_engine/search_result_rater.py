@@ -1,58 +1,83 @@
-import itertools
-from collections import defaultdict
-
 import numpy as np
 
+import query_profiler
+
 
 class SearchResultRater(object):
     ID_RATING_FALL_RATE = 1e-5
+    TITLE_TERM_WEIGHT = 30
+    CONTENT_TERM_WEIGHT = 5
+    TITLE_PHRASE_WEIGHT = 100
+    CONTENT_PHRASE_WEIGHT = 10
 
-    def __init__(self, index_storage, terms_identifiers, query_identifiers):
+    def __init__(self, index_storage, query_terms_ids):
         self.index_storage = index_storage
-        self.terms_identifiers = terms_identifiers
-        self.query_identifiers = query_identifiers
-
-    def _get_matching_identifiers(self, text):
-        matching_words = set(text.lower().split(" "))
-        matching_words_base_forms = {
-            word: base_forms if len(base_forms) > 0 else [word]
-            for word, base_forms in self.index_storage.get_words_base_forms(matching_words).items()
-        }
-        matching_base_forms = set(itertools.chain(*matching_words_base_forms.values()))
-        return {self.terms_identifiers[x] for x in matching_base_forms}
-
-    def _get_title_rating(self, title):
-        matching_identifiers = self._get_matching_identifiers(title)
-        return len(matching_identifiers.intersection(self.query_identifiers)) * 30
-
-    def _get_content_rating(self, content):
-        matching_identifiers = self._get_matching_identifiers(content)
-        return len(matching_identifiers.intersection(self.query_identifiers)) * 5
+        self.query_terms_ids = np.array(list(query_terms_ids), dtype=np.int32)
+
+    @staticmethod
+    def _get_runs_lengths(matching_tokens):
+        padded_matching_tokens = np.concatenate(([False], matching_tokens, [False]))
+        runs_bounds = np.flatnonzero(padded_matching_tokens[1:] != padded_matching_tokens[:-1])
+        return runs_bounds[1::2] - runs_bounds[::2]
+
+    @staticmethod
+    def _get_matching_terms_rating(forward_index_entry, matching_entries, text_entries, weight_of_rating):
+        matching_terms_ids = np.unique(forward_index_entry.terms_ids[matching_entries & text_entries])
+        return len(matching_terms_ids) * weight_of_rating
+
+    @staticmethod
+    def _get_phrases_rating(matching_tokens, weight_of_rating):
+        runs_lengths = SearchResultRater._get_runs_lengths(matching_tokens)
+        return float(np.sum(runs_lengths * (runs_lengths - 1) // 2) * weight_of_rating)
+
+    @staticmethod
+    def _get_phrases_rating_upper_bound(matching_tokens_count, weight_of_rating):
+        return matching_tokens_count * (matching_tokens_count - 1) // 2 * weight_of_rating
 
     def _get_article_id_rating(self, article_id):
         return np.exp(-article_id * self.ID_RATING_FALL_RATE)
 
-    def _get_phrases_rating(self, text, weight_of_rating):
-        words_in_text = text.lower().split(" ")
-        words_base_forms = defaultdict(lambda: {}, self.index_storage.get_words_base_forms(words_in_text))
-        last_words_matched_count = 0
-        rating = 0.0
-        for word in words_in_text:
-            word_identifiers = {self.terms_identifiers[base_form] for base_form in words_base_forms[word]}
-            intersected_identifiers = word_identifiers.intersection(self.query_identifiers)
-            if len(intersected_identifiers) > 0:
-                rating += last_words_matched_count * weight_of_rating
-                last_words_matched_count += 1
-            else:
-                last_words_matched_count = 0
-        return rating
+    def _rate_forward_index_entry(self, article_id, forward_index_entry):
+        matching_entries = forward_index_entry.get_matching_entries(self.query_terms_ids)
+        title_entries = forward_index_entry.tokens < forward_index_entry.title_tokens_count
+        title_rating = self._get_matching_terms_rating(
+            forward_index_entry, matching_entries, title_entries, self.TITLE_TERM_WEIGHT
+        )
+        content_rating = self._get_matching_terms_rating(
+            forward_index_entry, matching_entries, ~title_entries, self.CONTENT_TERM_WEIGHT
+        )
+        article_id_rating = self._get_article_id_rating(article_id)
+        phrases_matching_tokens = forward_index_entry.get_entries_tokens(
+            matching_entries & ~forward_index_entry.fallbacks
+        )
+        title_phrases_rating = self._get_phrases_rating(
+            phrases_matching_tokens[:forward_index_entry.title_tokens_count], self.TITLE_PHRASE_WEIGHT
+        )
+        content_phrases_rating = self._get_phrases_rating(
+            phrases_matching_tokens[forward_index_entry.title_tokens_count:], self.CONTENT_PHRASE_WEIGHT
+        )
+        return title_rating + content_rating + article_id_rating + title_phrases_rating + content_phrases_rating
 
-    def rate_wiki_article(self, wiki_article):
-        title_rating = self._get_title_rating(wiki_article.title)
-        content_rating = self._get_content_rating(wiki_article.content)
-        article_id_rating = self._get_article_id_rating(wiki_article.id)
-        title_phrases_rating = self._get_phrases_rating(wiki_article.title, weight_of_rating=100)
-        content_phrases_rating = self._get_phrases_rating(wiki_article.content, weight_of_rating=10)
+    def get_rating_upper_bound(self, article_id, terms_frequencies):
+        title_frequencies = [title_frequency for title_frequency, _ in terms_frequencies]
+        content_frequencies = [content_frequency for _, content_frequency in terms_frequencies]
+        title_rating = sum(1 for x in title_frequencies if x > 0) * self.TITLE_TERM_WEIGHT
+        content_rating = sum(1 for x in content_frequencies if x > 0) * self.CONTENT_TERM_WEIGHT
+        article_id_rating = self._get_article_id_rating(article_id)
+        title_phrases_rating = self._get_phrases_rating_upper_bound(sum(title_frequencies), self.TITLE_PHRASE_WEIGHT)
+        content_phrases_rating = self._get_phrases_rating_upper_bound(
+            sum(content_frequencies), self.CONTENT_PHRASE_WEIGHT
+        )
         return title_rating + content_rating + article_id_rating + title_phrases_rating + content_phrases_rating
 
+    def rate_wiki_articles(self, articles_ids):
+        forward_index_entries = self.index_storage.get_forward_index_entries(articles_ids)
+        query_profiler.add_counter("candidates_rated", len(articles_ids))
+        with query_profiler.profile_stage("rating"):
+            return {
+                article_id: self._rate_forward_index_entry(article_id, forward_index_entries[article_id])
+                for article_id in articles_ids
+            }
 
+    def rate_wiki_article(self, wiki_article):
+        return self.rate_wiki_articles([wiki_article.id])[wiki_article.id]
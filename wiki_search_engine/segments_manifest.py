@@ -0,0 +1,48 @@
+import json
+import os
+
+SEGMENTS_MANIFEST_FILE_SUFFIX = ".segments.json"
+SEGMENT_NAME_PREFIX = "segment_"
+
+
+def get_segments_manifest_path(database_name):
+    return os.path.splitext(database_name)[0] + SEGMENTS_MANIFEST_FILE_SUFFIX
+
+
+def get_segment_database_name(database_name, segment_name):
+    files_prefix, database_extension = os.path.splitext(database_name)
+    return f"{files_prefix}.{segment_name}{database_extension}"
+
+
+def read_segments_names(database_name):
+    segments_manifest_path = get_segments_manifest_path(database_name)
+    if not os.path.exists(segments_manifest_path):
+        return []
+    with open(segments_manifest_path) as stream:
+        return json.load(stream)["segments"]
+
+
+def write_segments_names(database_name, segments_names):
+    segments_manifest_path = get_segments_manifest_path(database_name)
+    with open(segments_manifest_path + ".tmp", "w") as stream:
+        json.dump({"segments": segments_names}, stream)
+    os.replace(segments_manifest_path + ".tmp", segments_manifest_path)
+
+
+def remove_segments(database_name, segments_names):
+    for segment_name in segments_names:
+        segment_database_name = get_segment_database_name(database_name, segment_name)
+        if os.path.exists(segment_database_name):
+            os.remove(segment_database_name)
+
+
+def remove_all_segments(database_name):
+    remove_segments(database_name, read_segments_names(database_name))
+    segments_manifest_path = get_segments_manifest_path(database_name)
+    if os.path.exists(segments_manifest_path):
+        os.remove(segments_manifest_path)
+
+
+def create_segment_name(segments_names):
+    segments_numbers = [int(segment_name[len(SEGMENT_NAME_PREFIX):]) for segment_name in segments_names]
+    return f"{SEGMENT_NAME_PREFIX}{max(segments_numbers, default=0) + 1:06d}"
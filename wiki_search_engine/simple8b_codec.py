@@ -0,0 +1,50 @@
+import numpy as np
+
+SELECTORS = [
+    (240, 0), (120, 0), (60, 1), (30, 2), (20, 3), (15, 4), (12, 5), (10, 6), (8, 7), (7, 8), (6, 10), (5, 12),
+    (4, 15), (3, 20), (2, 30), (1, 60),
+]
+SELECTORS_COUNTS = np.array([count for count, _ in SELECTORS], dtype=np.int64)
+SELECTOR_SHIFT = 60
+
+
+def _select_word(gaps_bit_lengths, start):
+    remaining_count = len(gaps_bit_lengths) - start
+    for selector, (count, bits) in enumerate(SELECTORS):
+        if count <= remaining_count and max(gaps_bit_lengths[start:start + count]) <= bits:
+            return selector
+    raise ValueError(f"Gaps to be encoded must fit in {SELECTORS[-1][1]} bits")
+
+
+def encode_gaps(gaps):
+    gaps = [int(gap) for gap in gaps]
+    if any(gap < 0 for gap in gaps):
+        raise ValueError("Gaps to be encoded must be non-negative")
+    gaps_bit_lengths = [gap.bit_length() for gap in gaps]
+    words = []
+    start = 0
+    while start < len(gaps):
+        selector = _select_word(gaps_bit_lengths, start)
+        count, bits = SELECTORS[selector]
+        word = selector << SELECTOR_SHIFT
+        for gap_index, gap in enumerate(gaps[start:start + count]):
+            word |= gap << (gap_index * bits)
+        words.append(word)
+        start += count
+    return np.array(words, dtype="<u8").tobytes()
+
+
+def decode_gaps(coded_sequence):
+    words = np.frombuffer(coded_sequence, dtype="<u8")
+    selectors = (words >> np.uint64(SELECTOR_SHIFT)).astype(np.int64)
+    words_ends = np.cumsum(SELECTORS_COUNTS[selectors])
+    gaps = np.zeros(int(words_ends[-1]) if len(words_ends) > 0 else 0, dtype=np.int64)
+    for selector in np.unique(selectors).tolist():
+        count, bits = SELECTORS[selector]
+        if bits == 0:
+            continue
+        selector_words_indexes = np.flatnonzero(selectors == selector)
+        shifts = np.arange(count, dtype=np.uint64) * np.uint64(bits)
+        selector_gaps = (words[selector_words_indexes, None] >> shifts) & np.uint64((1 << bits) - 1)
+        gaps[(words_ends[selector_words_indexes] - count)[:, None] + np.arange(count)] = selector_gaps
+    return gaps
@@ -0,0 +1,163 @@
+import argparse
+import array
+import json
+import os
+
+import utils
+from caching_index_storage import get_index_storage_class
+from index_type import IndexType
+from mapped_arrays import EMPTY_SLOT, MappedStrings, get_offsets, load_arrays, write_arrays
+from storage_backend import StorageBackend
+
+SNAPSHOT_MAGIC = b"QSNAP001"
+SNAPSHOT_INDEX_TYPES = (IndexType.TRADITIONAL, IndexType.POSITIONAL)
+DEFAULT_TERM_IDENTIFIER = "0"
+
+
+def get_startup_snapshot_path(use_terms_clusters, storage_backend):
+    terms_suffix = "_clusters" if use_terms_clusters else ""
+    return f"data/startup_snapshot{terms_suffix}_{storage_backend.value.lower()}.snapshot"
+
+
+def _get_source_version(index_versions, use_terms_clusters, terms_clusters_path):
+    clusters_version = None
+    if use_terms_clusters:
+        clusters_stat = os.stat(terms_clusters_path)
+        clusters_version = [os.path.abspath(terms_clusters_path), clusters_stat.st_size, clusters_stat.st_mtime_ns]
+    return json.dumps([index_versions, clusters_version])
+
+
+def _get_snapshot_terms_ids(index_storage):
+    terms_ids = index_storage.get_all_terms_ids()
+    for segment in index_storage.segments:
+        for term, term_id in segment.get_all_terms_ids().items():
+            terms_ids.setdefault(term, term_id)
+    return terms_ids
+
+
+def _get_strings_arrays(prefix, strings):
+    offsets, strings_bytes, hash_slots = MappedStrings.create_arrays(strings)
+    return {f"{prefix}_offsets": offsets, f"{prefix}_bytes": strings_bytes, f"{prefix}_hash_slots": hash_slots}
+
+
+def _get_index_storage_arrays(index_storage):
+    terms_ids = _get_snapshot_terms_ids(index_storage)
+    segments_documents_ids = [segment.get_wiki_articles_ids() for segment in index_storage.segments]
+    prefix = index_storage.index_type.value.lower()
+    named_arrays = _get_strings_arrays(f"{prefix}_terms", list(terms_ids))
+    named_arrays[f"{prefix}_terms_ids"] = array.array("i", terms_ids.values())
+    named_arrays[f"{prefix}_segments_offsets"] = get_offsets(len(x) for x in segments_documents_ids)
+    named_arrays[f"{prefix}_segments_documents_ids"] = array.array(
+        "q", [document_id for documents_ids in segments_documents_ids for document_id in documents_ids]
+    )
+    return named_arrays
+
+
+def _get_terms_clusters_arrays(use_terms_clusters, terms_clusters_path):
+    terms_identifiers = utils.get_terms_identifiers(use_terms_clusters, terms_clusters_path)
+    if not use_terms_clusters:
+        return {}
+    named_arrays = _get_strings_arrays("clusters_terms", list(terms_identifiers))
+    named_arrays.update(_get_strings_arrays("clusters_identifiers", list(terms_identifiers.values())))
+    return named_arrays
+
+
+def create_startup_snapshot(index_storages, use_terms_clusters, snapshot_path,
+                            terms_clusters_path=utils.TERMS_CLUSTERS_PATH):
+    source_version = _get_source_version(
+        [index_storage.index_version for index_storage in index_storages], use_terms_clusters, terms_clusters_path
+    )
+    named_arrays = {"source_version": array.array("B", source_version.encode("utf-8"))}
+    for index_storage in index_storages:
+        named_arrays.update(_get_index_storage_arrays(index_storage))
+    named_arrays.update(_get_terms_clusters_arrays(use_terms_clusters, terms_clusters_path))
+    write_arrays(snapshot_path, SNAPSHOT_MAGIC, named_arrays)
+
+
+class SnapshotTermsIdentifiers(object):
+    def __init__(self, terms, identifiers):
+        self._terms = terms
+        self._identifiers = identifiers
+
+    def __getitem__(self, term):
+        term_index = self._terms.find(term)
+        return self._identifiers[term_index] if term_index != EMPTY_SLOT else DEFAULT_TERM_IDENTIFIER
+
+
+class StartupSnapshot(object):
+    def __init__(self, path):
+        self._arrays = load_arrays(path, SNAPSHOT_MAGIC)
+        self.source_version = str(self._arrays["source_version"], "utf-8")
+
+    def _get_strings(self, prefix):
+        return MappedStrings(
+            self._arrays[f"{prefix}_offsets"], self._arrays[f"{prefix}_bytes"], self._arrays[f"{prefix}_hash_slots"]
+        )
+
+    def get_terms_ids(self, index_type, terms):
+        prefix = index_type.value.lower()
+        snapshot_terms, snapshot_terms_ids = self._get_strings(f"{prefix}_terms"), self._arrays[f"{prefix}_terms_ids"]
+        terms_ids = {}
+        for term in terms:
+            term_index = snapshot_terms.find(term)
+            if term_index != EMPTY_SLOT:
+                terms_ids[term] = snapshot_terms_ids[term_index]
+        return terms_ids
+
+    def get_segments_documents_ids(self, index_type):
+        prefix = index_type.value.lower()
+        segments_offsets = self._arrays[f"{prefix}_segments_offsets"]
+        documents_ids = self._arrays[f"{prefix}_segments_documents_ids"]
+        return [documents_ids[start:end] for start, end in zip(segments_offsets, segments_offsets[1:])]
+
+    def get_terms_identifiers(self, use_terms_clusters):
+        if not use_terms_clusters:
+            return utils.IdentityDictionary()
+        return SnapshotTermsIdentifiers(self._get_strings("clusters_terms"), self._get_strings("clusters_identifiers"))
+
+
+def _load_valid_snapshot(snapshot_path, source_version):
+    if not os.path.exists(snapshot_path):
+        return None
+    startup_snapshot = StartupSnapshot(snapshot_path)
+    return startup_snapshot if startup_snapshot.source_version == source_version else None
+
+
+def load_startup_snapshot(index_storages, use_terms_clusters, snapshot_path,
+                          terms_clusters_path=utils.TERMS_CLUSTERS_PATH):
+    source_version = _get_source_version(
+        [index_storage.index_version for index_storage in index_storages], use_terms_clusters, terms_clusters_path
+    )
+    startup_snapshot = _load_valid_snapshot(snapshot_path, source_version)
+    if startup_snapshot is None:
+        create_startup_snapshot(index_storages, use_terms_clusters, snapshot_path, terms_clusters_path)
+        startup_snapshot = StartupSnapshot(snapshot_path)
+    for index_storage in index_storages:
+        index_storage.use_startup_snapshot(startup_snapshot)
+    return startup_snapshot
+
+
+def _parse_input_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--use_terms_clusters", type=bool, default=False)
+    parser.add_argument(
+        "--storage_backend", type=StorageBackend, choices=list(StorageBackend), default=StorageBackend.SQLITE
+    )
+    return vars(parser.parse_args())
+
+
+def run_create_startup_snapshot(use_terms_clusters, storage_backend=StorageBackend.SQLITE):
+    index_storage_class = get_index_storage_class(storage_backend)
+    index_storages = [
+        index_storage_class(index_type, use_terms_clusters, truncate_old=False, read_only=True)
+        for index_type in SNAPSHOT_INDEX_TYPES
+    ]
+    create_startup_snapshot(
+        index_storages, use_terms_clusters, get_startup_snapshot_path(use_terms_clusters, storage_backend)
+    )
+    for index_storage in index_storages:
+        index_storage.close()
+
+
+if __name__ == "__main__":
+    run_create_startup_snapshot(**_parse_input_arguments())
@@ -0,0 +1,51 @@
+import heapq
+
+RATING_BOUND_TOLERANCE = 1e-6
+RATING_BATCH_SIZE = 1024
+
+
+def _get_document_terms_frequencies(terms_cursors, document_id):
+    return [cursor.frequencies() for cursor in terms_cursors if cursor.skip_to(document_id) == document_id]
+
+
+def _cannot_enter_top_k(top_k_heap, k, rating_upper_bound):
+    return len(top_k_heap) == k and rating_upper_bound + RATING_BOUND_TOLERANCE <= top_k_heap[0][0]
+
+
+def _push_rated_documents(top_k_heap, k, search_result_rater, documents_ids):
+    if len(documents_ids) == 0:
+        return
+    documents_ratings = search_result_rater.rate_wiki_articles(documents_ids)
+    for document_id in documents_ids:
+        rated_document = (documents_ratings[document_id], -document_id)
+        if len(top_k_heap) < k:
+            heapq.heappush(top_k_heap, rated_document)
+        elif rated_document > top_k_heap[0]:
+            heapq.heapreplace(top_k_heap, rated_document)
+
+
+def rank_top_k(documents_ids, search_result_rater, terms_posting_lists, k):
+    if k <= 0:
+        return []
+    terms_cursors = [posting_list.cursor() for posting_list in terms_posting_lists]
+    terms_max_frequencies = [
+        (posting_list.max_title_frequency, posting_list.max_content_frequency) for posting_list in terms_posting_lists
+    ]
+    top_k_heap = []
+    candidates_ids = []
+    for document_id in documents_ids:
+        if _cannot_enter_top_k(
+            top_k_heap, k, search_result_rater.get_rating_upper_bound(document_id, terms_max_frequencies)
+        ):
+            break
+        document_terms_frequencies = _get_document_terms_frequencies(terms_cursors, document_id)
+        if _cannot_enter_top_k(
+            top_k_heap, k, search_result_rater.get_rating_upper_bound(document_id, document_terms_frequencies)
+        ):
+            continue
+        candidates_ids.append(document_id)
+        if len(candidates_ids) == RATING_BATCH_SIZE:
+            _push_rated_documents(top_k_heap, k, search_result_rater, candidates_ids)
+            candidates_ids = []
+    _push_rated_documents(top_k_heap, k, search_result_rater, candidates_ids)
+    return [(-negated_document_id, rating) for rating, negated_document_id in sorted(top_k_heap, reverse=True)]
@@ -1,38 +1,48 @@
 import re
 import logging
 from collections import defaultdict
+
+import base_forms_dictionary
 from wiki_article import WikiArticle
 
+TERMS_CLUSTERS_PATH = "data/terms_clusters_10000.txt"
+
 
 class IdentityDictionary(object):
     def __getitem__(self, item):
         return item
 
 
-def _create_wiki_article(article_id, parsed_article):
-    article_parts = parsed_article.split("\n\n")
-    title = re.search("TITLE: (.*)", article_parts[0].strip()).group(1)
-    content = "\n".join(article_parts[1:])
+def _create_wiki_article(article_id, article_lines, is_last_article):
+    title = re.search("TITLE: (.*)", article_lines[0].strip()).group(1)
+    content = "".join(article_lines[1:])
+    if not is_last_article:
+        content = content[:-1]
     return WikiArticle(id=article_id, title=title, content=content)
 
 
-def read_wiki_articles(path="data/wiki_slice.txt"):
+def iter_wiki_articles(path="data/wiki_slice.txt"):
+    article_id = 1
+    article_lines = []
     with open(path) as stream:
-        merged_lines = "\n".join(stream.readlines())
-        parsed_articles = merged_lines.split("\n\n\n")
-        return list(map(
-            lambda index_x: _create_wiki_article(index_x[0] + 1, index_x[1]),
-            enumerate(parsed_articles)
-        ))
+        for line in stream:
+            if line != "\n":
+                article_lines.append(line)
+                continue
+            if len(article_lines) > 0:
+                yield _create_wiki_article(article_id, article_lines, is_last_article=False)
+                article_id += 1
+            article_lines = []
+    if len(article_lines) > 0:
+        yield _create_wiki_article(article_id, article_lines, is_last_article=True)
+
+
+def read_wiki_articles(path="data/wiki_slice.txt"):
+    return list(iter_wiki_articles(path))
 
 
 def read_words_base_forms(path="data/base_forms.txt"):
-    words_base_forms = defaultdict(lambda: [])
-    with open(path, "r") as stream:
-        bases_words = map(lambda x: x.split(";")[0:2], stream.readlines())
-        for base, word in bases_words:
-            words_base_forms[word].append(base)
-    return words_base_forms
+    return base_forms_dictionary.load_base_forms_dictionary(path)
 
 
 def get_default_logger():
@@ -52,7 +62,7 @@ def get_base_forms_from_article(words_base_forms, wiki_article, with_default_wor
     return list_of_base_forms
 
 
-def get_terms_identifiers(use_terms_clusters=False, path="data/terms_clusters_10000.txt"):
+def get_terms_identifiers(use_terms_clusters=False, path=TERMS_CLUSTERS_PATH):
     if not use_terms_clusters:
         return IdentityDictionary()
     with open(path) as file_stream:
@@ -0,0 +1,92 @@
+import numpy as np
+
+SHORT_SEQUENCE_LENGTH = 32
+
+
+def _encode_short_gaps(gaps, coding):
+    coded_sequence = bytearray()
+    for gap in gaps:
+        gap_bytes = [gap % coding + coding]
+        gap //= coding
+        while gap > 0:
+            gap_bytes.append(gap % coding)
+            gap //= coding
+        coded_sequence.extend(reversed(gap_bytes))
+    return bytes(coded_sequence)
+
+
+def _decode_short_gaps(coded_sequence, coding):
+    gaps = []
+    gap = 0
+    for coded_byte in coded_sequence:
+        if coded_byte >= coding:
+            gaps.append(gap * coding + coded_byte - coding)
+            gap = 0
+        else:
+            gap = gap * coding + coded_byte
+    return np.array(gaps, dtype=np.int64)
+
+
+def count_gaps_bytes(gaps, coding=128):
+    gaps = np.asarray(gaps, dtype=np.int64)
+    gaps_bytes = np.ones(len(gaps), dtype=np.int64)
+    remaining_gaps = gaps // coding
+    while np.any(remaining_gaps > 0):
+        gaps_bytes += remaining_gaps > 0
+        remaining_gaps //= coding
+    return gaps_bytes
+
+
+def encode_gaps(gaps, coding=128):
+    if len(gaps) <= SHORT_SEQUENCE_LENGTH:
+        gaps = [int(gap) for gap in gaps]
+        if any(gap < 0 for gap in gaps):
+            raise ValueError("Gaps to be encoded must be non-negative")
+        return _encode_short_gaps(gaps, coding)
+    gaps = np.asarray(gaps, dtype=np.int64)
+    if np.any(gaps < 0):
+        raise ValueError("Gaps to be encoded must be non-negative")
+    gaps_bytes = count_gaps_bytes(gaps, coding)
+    coded_sequence = np.zeros(int(gaps_bytes.sum()), dtype=np.uint8)
+    terminating_indexes = np.cumsum(gaps_bytes) - 1
+    remaining_gaps = gaps.copy()
+    for byte_index in range(int(gaps_bytes.max(initial=0))):
+        encoded_gaps = gaps_bytes > byte_index
+        coded_sequence[terminating_indexes[encoded_gaps] - byte_index] = remaining_gaps[encoded_gaps] % coding
+        remaining_gaps //= coding
+    coded_sequence[terminating_indexes] += coding
+    return coded_sequence.tobytes()
+
+
+def decode_gaps(coded_sequence, coding=128):
+    if len(coded_sequence) <= SHORT_SEQUENCE_LENGTH:
+        return _decode_short_gaps(coded_sequence, coding)
+    coded_bytes = np.frombuffer(coded_sequence, dtype=np.uint8)
+    terminating_indexes = np.flatnonzero(coded_bytes >= coding)
+    if len(terminating_indexes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starting_indexes = np.concatenate(([0], terminating_indexes[:-1] + 1))
+    gaps_bytes = terminating_indexes - starting_indexes + 1
+    digits = coded_bytes.astype(np.int64) % coding
+    gaps = np.zeros(len(terminating_indexes), dtype=np.int64)
+    for byte_index in range(int(gaps_bytes.max())):
+        decoded_gaps = gaps_bytes > byte_index
+        gaps[decoded_gaps] = gaps[decoded_gaps] * coding + digits[starting_indexes[decoded_gaps] + byte_index]
+    return gaps
+
+
+def encode_values(values, coding=128):
+    if len(values) <= SHORT_SEQUENCE_LENGTH:
+        values = [int(value) for value in values]
+        gaps = [value - previous_value for previous_value, value in zip([0] + values, values)]
+        has_non_positive_gaps = any(gap <= 0 for gap in gaps)
+    else:
+        gaps = np.diff(np.asarray(values, dtype=np.int64), prepend=0)
+        has_non_positive_gaps = bool(np.any(gaps <= 0))
+    if has_non_positive_gaps:
+        raise ValueError("Values to be encoded must be positive and strictly increasing")
+    return encode_gaps(gaps, coding)
+
+
+def decode_values(coded_sequence, coding=128):
+    return np.cumsum(decode_gaps(coded_sequence, coding))